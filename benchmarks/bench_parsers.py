@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Benchmark the FCC page parsers against the previous BeautifulSoup/html.parser code.
+
+Runs over the saved fixture pages in benchmarks/fixtures/, a search page
+scaled up to --rows result rows, and optionally every page in the HTTP cache.
+
+    python benchmarks/bench_parsers.py --rows 5000 --repeat 5
+"""
+
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+from src.scraper import parsers
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+KEYWORDS = ['internal', 'int', 'photo', 'inside']
+
+def legacy_search_results(page_source):
+    """SeleniumFCCScraper._parse_search_results before the lxml parsing layer"""
+    soup = BeautifulSoup(page_source, 'html.parser')
+    fcc_ids = []
+    for table in soup.find_all('table'):
+        rows = table.find_all('tr')
+        if len(rows) < 2:
+            continue
+        header_text = rows[0].get_text().lower()
+        if 'fcc' in header_text or 'id' in header_text or 'applicant' in header_text:
+            for row in rows[1:]:
+                cells = row.find_all(['td', 'th'])
+                if len(cells) >= 3:
+                    text = cells[0].get_text(strip=True)
+                    if len(text) > 5 and any(c.isalpha() for c in text):
+                        fcc_ids.append(text)
+            break
+    return fcc_ids
+
+def new_search_results(page_source):
+    fcc_ids = []
+    for cells in parsers.iter_result_rows(page_source):
+        if len(cells) >= 3:
+            text = parsers.text(cells[0])
+            if len(text) > 5 and any(c.isalpha() for c in text):
+                fcc_ids.append(text)
+    return fcc_ids
+
+def legacy_exhibit_links(page_source):
+    soup = BeautifulSoup(page_source, 'html.parser')
+    links = []
+    for link in soup.find_all('a', href=True):
+        href = link.get('href')
+        filename = link.get_text(strip=True)
+        if href and '.pdf' in href.lower() and any(k in filename.lower() for k in KEYWORDS):
+            links.append(href)
+    return links
+
+def new_exhibit_links(page_source):
+    return [href for href, filename in parsers.iter_pdf_links(page_source)
+            if any(k in filename.lower() for k in KEYWORDS)]
+
+def scale_search_page(page_source, rows):
+    """Repeat the fixture's data rows until the results table has the given number of rows"""
+    data_rows = re.findall(r'^<tr><td><a .*</tr>$', page_source, re.MULTILINE)
+    if not data_rows:
+        return page_source
+    repeated = '\n'.join(data_rows[i % len(data_rows)] for i in range(rows))
+    return page_source.replace('\n'.join(data_rows), repeated)
+
+def load_pages(args):
+    pages = []
+    with open(os.path.join(FIXTURES_DIR, 'search_results.html')) as f:
+        search = f.read()
+    with open(os.path.join(FIXTURES_DIR, 'exhibits.html')) as f:
+        exhibits = f.read()
+
+    pages.append(('search fixture', 'search', search))
+    pages.append((f'search x{args.rows} rows', 'search', scale_search_page(search, args.rows)))
+    pages.append(('exhibits fixture', 'exhibits', exhibits))
+
+    if args.cache:
+        from src.scraper.cache import ResponseCache
+        cache = ResponseCache(mode='offline')
+        for entry in cache.iter_entries():
+            if entry['page_type'] in ('search', 'exhibits'):
+                body = cache.read_body(entry).decode('utf-8', errors='replace')
+                pages.append((f"cache {entry['body'][:10]}", entry['page_type'], body))
+    return pages
+
+def timed(func, page_source, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(page_source)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=5000, help='Rows in the scaled-up search page')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per page; the median is reported')
+    parser.add_argument('--cache', action='store_true', help='Also benchmark every page in the HTTP cache')
+    args = parser.parse_args()
+
+    implementations = {
+        'search': (legacy_search_results, new_search_results),
+        'exhibits': (legacy_exhibit_links, new_exhibit_links)
+    }
+
+    print(f"{'page':<24} {'size':>9} {'items':>6} {'legacy':>10} {'lxml':>10} {'speedup':>8}")
+    mismatches = 0
+    for name, page_type, page_source in load_pages(args):
+        legacy, new = implementations[page_type]
+        legacy_time, legacy_result = timed(legacy, page_source, args.repeat)
+        new_time, new_result = timed(new, page_source, args.repeat)
+        if legacy_result != new_result:
+            mismatches += 1
+            name += ' (MISMATCH)'
+        print(f"{name:<24} {len(page_source) // 1024:>7}KB {len(new_result):>6} "
+              f"{legacy_time * 1000:>8.1f}ms {new_time * 1000:>8.1f}ms {legacy_time / new_time:>7.1f}x")
+
+    if mismatches:
+        print(f"\n{mismatches} page(s) parsed differently from the legacy parser")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""End-to-end throughput benchmark: scrape -> save_to_database -> process_unprocessed_pdfs.
+
+Generates an exhibit corpus (see corpus.py), serves it through mock_fcc_server.py
+in a subprocess, and runs the pipeline against a throwaway database and data dir.
+Per-stage wall time, CPU time, peak RSS, disk writes and DB commit counts are reported as JSON:
+
+    python benchmarks/bench_pipeline.py --filings 50 --pages 20 --encodings dct --output bench.json
+
+Without --selenium the scrape stage fetches the mock pages with FCCScraper's
+requests session and parses them with the Selenium scraper's parsers, so no
+browser is needed.
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.corpus import add_spec_arguments, generate_corpus, spec_from_args
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def reset_peak_rss():
+    """Reset the kernel's RSS high-water mark so each stage reports its own peak (Linux only)"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+def peak_rss_mb() -> float:
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Lifetime peak; kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def disk_write_bytes():
+    """Bytes this process has caused to be written to storage (Linux only)"""
+    try:
+        with open('/proc/self/io') as f:
+            for line in f:
+                if line.startswith('write_bytes:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+class StageTimer:
+    """Collects wall/CPU time, peak RSS and DB commits per pipeline stage"""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.stages = {}
+        self.commits = 0
+        event.listen(engine, 'commit', self._on_commit)
+
+    def _on_commit(self, conn):
+        self.commits += 1
+
+    def run(self, name, func, *args):
+        reset_peak_rss()
+        commits, wall, cpu = self.commits, time.perf_counter(), time.process_time()
+        written = disk_write_bytes()
+        result = func(*args)
+        self.stages[name] = {
+            'wall_s': round(time.perf_counter() - wall, 3),
+            'cpu_s': round(time.process_time() - cpu, 3),
+            'peak_rss_mb': round(peak_rss_mb(), 1),
+            'disk_write_mb': round((disk_write_bytes() - written) / 1024 / 1024, 1) if written is not None else None,
+            'db_commits': self.commits - commits
+        }
+        return result
+
+def start_mock_server(port: int, corpus_dir: str, args) -> subprocess.Popen:
+    cmd = [
+        sys.executable, os.path.join(REPO_ROOT, 'mock_fcc_server.py'),
+        '--port', str(port),
+        '--grants', str(args.filings),
+        '--exhibits', str(args.exhibits),
+        '--internal-photo-rate', '1.0',
+        '--latency', str(args.latency),
+        '--error-rate', str(args.error_rate),
+        '--rate-limit-rate', '0',
+        '--pdf-dir', corpus_dir
+    ]
+    process = subprocess.Popen(cmd, cwd=REPO_ROOT, stdout=subprocess.DEVNULL)
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Mock FCC server did not start")
+
+def scrape(args):
+    """Search plus detail lookups; returns filings with their PDFs"""
+    from src.config import Config
+    from src.scraper.fcc_scraper import FCCScraper
+
+    scraper = FCCScraper()
+    if args.selenium:
+        filings = scraper.search_recent_filings()
+        results = []
+        for filing in filings:
+            details = scraper.get_filing_details(filing['fcc_id'], filing)
+            if details and details.get('pdfs'):
+                filing.update(details)
+                results.append(filing)
+        return results
+
+    from src.scraper.selenium_scraper import SeleniumFCCScraper
+    parser = SeleniumFCCScraper(start_driver=False)
+
+    date_str = (datetime.now() - timedelta(days=1)).strftime('%m/%d/%Y')
+    response = scraper.session.post(f"{Config.FCC_BASE_URL}/GenericSearch.cfm",
+                                    data={'grant_date_from': date_str, 'grant_date_to': date_str})
+    response.raise_for_status()
+
+    results = []
+    for filing in parser._parse_search_results(response.content):
+        detail = scraper.session.get(filing['detail_url'])
+        if detail.status_code != 200:
+            continue
+        pdfs = parser._parse_exhibit_links(detail.content, filing['fcc_id'])
+        if pdfs:
+            filing['pdfs'] = pdfs
+            results.append(filing)
+    return results
+
+def save(scraper, filings):
+    return sum(1 for filing in filings if scraper.save_to_database(filing))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filings', type=int, default=20, help='Grants returned by the mock search')
+    parser.add_argument('--exhibits', type=int, default=4, help='Mean exhibits per grant on the mock site')
+    parser.add_argument('--latency', type=float, default=0.0, help='Mock server median latency (seconds)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Mock server 500/503 rate')
+    parser.add_argument('--corpus-dir', help='Reuse an existing corpus instead of generating one')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Corpus generator processes')
+    parser.add_argument('--selenium', action='store_true', help='Scrape through Selenium (needs Chrome)')
+    parser.add_argument('--pdf-retention', choices=('keep', 'compress', 'delete'), default='keep',
+                        help='PDF_RETENTION for the run')
+    parser.add_argument('--pdf-stream', choices=('auto', 'on', 'off'), default='auto', help='PDF_STREAM for the run')
+    parser.add_argument('--work-dir', help='Data dir for the run (default: a temporary directory)')
+    parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='espfinder-bench-')
+    os.makedirs(os.path.join(work_dir, 'database'), exist_ok=True)
+    port = free_port()
+
+    # Config is read at import time, so the environment must be set before importing src
+    os.environ.update({
+        'DATA_DIR': work_dir,
+        'DATABASE_URL': f"sqlite:///{os.path.join(work_dir, 'database', 'bench.db')}",
+        'FCC_BASE_URL': f"http://127.0.0.1:{port}/oetcf/eas/reports",
+        'HTTP_CACHE_MODE': 'off',
+        'DOWNLOAD_DELAY': '0.001',
+        'RATE_LIMIT_MAX': '1000',
+        'RATE_LIMIT_BURST': '100',
+        'CIRCUIT_FAILURE_THRESHOLD': '1000000',
+        'LOG_LEVEL': 'WARNING',
+        'PDF_RETENTION': args.pdf_retention,
+        'PDF_STREAM': args.pdf_stream
+    })
+
+    import logging
+    import structlog
+    logging.basicConfig(level=logging.WARNING)
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+
+    from src.config import Config
+    from src.database.database import db
+    from src.pdf_processor.pdf_processor import PDFProcessor
+    from src.scraper.fcc_scraper import FCCScraper
+
+    spec = spec_from_args(args)
+    corpus_dir = args.corpus_dir or os.path.join(work_dir, 'corpus')
+    corpus_start = time.perf_counter()
+    manifest = None if args.corpus_dir else generate_corpus(corpus_dir, spec, args.workers)
+    if manifest:
+        manifest.pop('documents')
+    corpus_seconds = time.perf_counter() - corpus_start
+
+    Config.ensure_dirs()
+    db.create_tables()
+    timer = StageTimer(db.engine)
+
+    server = start_mock_server(port, corpus_dir, args)
+    try:
+        filings = timer.run('scrape', scrape, args)
+        saved = timer.run('save', save, FCCScraper(), filings)
+        processed = timer.run('process', PDFProcessor().process_unprocessed_pdfs)
+    finally:
+        server.terminate()
+        server.wait()
+
+    from src.database.models import PDF, Photo
+    session = db.get_session()
+    try:
+        pdf_count = session.query(PDF).filter_by(processed=True).count()
+        photo_count = session.query(Photo).count()
+    finally:
+        session.close()
+
+    counts = {'filings': len(filings), 'products_saved': saved, 'pdfs_processed': pdf_count,
+              'pdfs_with_photos': processed, 'photos': photo_count}
+    timer.stages['scrape']['items'] = len(filings)
+    timer.stages['save']['items'] = saved
+    timer.stages['process']['items'] = pdf_count
+
+    total_wall = sum(stage['wall_s'] for stage in timer.stages.values())
+    report = {
+        'timestamp': datetime.utcnow().isoformat() + 'Z',
+        'git_commit': subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                     capture_output=True, text=True).stdout.strip() or None,
+        'python': platform.python_version(),
+        'params': {key: value for key, value in vars(args).items() if key not in ('output', 'work_dir')},
+        'corpus': manifest or {'dir': corpus_dir},
+        'corpus_generation_s': round(corpus_seconds, 3),
+        'stages': timer.stages,
+        'counts': counts,
+        'throughput_per_min': {
+            'filings': round(len(filings) / total_wall * 60, 1) if total_wall else None,
+            'pdfs': round(pdf_count / timer.stages['process']['wall_s'] * 60, 1) if timer.stages['process']['wall_s'] else None,
+            'images': round(photo_count / timer.stages['process']['wall_s'] * 60, 1) if timer.stages['process']['wall_s'] else None
+        }
+    }
+
+    output = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
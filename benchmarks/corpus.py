@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""Generate synthetic exhibit PDF corpora for extraction benchmarks and stress tests.
+
+Real internal-photo exhibits are 10-100 page scans of a few tens of MB: large
+DCT photos, lossless Flate images, bilevel JBIG2 scan pages, the occasional
+CMYK JPEG, logos repeated on every page through one shared xref, tiny
+decorative icons, and text-only pages. Every one of those is a knob here:
+
+    python benchmarks/corpus.py data/corpus --pdfs 2000 --pages 40-80 \\
+        --image-sizes 2000x1500,4000x3000 --encodings dct:6,flate:2,jbig2:1,cmyk:1 \\
+        --duplicate-rate 0.1 --shared-xref-rate 0.05 --decorations 2 --text-page-rate 0.2 --workers 8
+
+Each PDF is seeded from (--seed, index), so output is identical regardless of
+--workers. Duplicates are drawn from a fixed pool of --duplicate-pool images,
+so the same board photo recurs across PDFs the way re-certified modules do.
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import struct
+from dataclasses import dataclass, field, asdict
+from functools import lru_cache
+from multiprocessing import Pool
+from typing import Dict, List, Tuple
+
+import fitz
+import numpy as np
+from PIL import Image, ImageDraw, TiffImagePlugin
+
+ENCODINGS = ('dct', 'flate', 'jbig2', 'cmyk')
+ENCODING_ALIASES = {'jpeg': 'dct', 'raw': 'flate'}
+
+@dataclass
+class CorpusSpec:
+    pdfs: int = 20
+    pages: Tuple[int, int] = (10, 10)               # inclusive range, drawn per PDF
+    images_per_page: int = 1
+    image_sizes: List[Tuple[int, int]] = field(default_factory=lambda: [(1600, 1200)])
+    encodings: Dict[str, float] = field(default_factory=lambda: {'dct': 1.0})   # encoding -> weight
+    duplicate_rate: float = 0.0                     # chance an image comes from the shared duplicate pool
+    duplicate_pool: int = 32
+    shared_xref_rate: float = 0.0                   # chance a slot re-references an image already in the PDF
+    decorations: int = 0                            # tiny (<100 px) images per page, one logo xref shared by all pages
+    text_page_rate: float = 0.0                     # chance a page is text only, like a test report
+    seed: int = 1
+
+def pcb_image(rng: random.Random, size: Tuple[int, int]) -> Image.Image:
+    """Green solder mask with traces, ICs and passives, plus sensor noise so it compresses like a photo"""
+    width, height = size
+    np_rng = np.random.default_rng(rng.getrandbits(32))
+    base = np.array([rng.randint(10, 40), rng.randint(90, 140), rng.randint(40, 70)], dtype=np.int16)
+    pixels = base + np_rng.normal(0, 12, (height, width, 3))
+    img = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8), 'RGB')
+
+    draw = ImageDraw.Draw(img)
+    for _ in range(width // 20):
+        x, y = rng.randrange(width), rng.randrange(height)
+        draw.line([(x, y), (x + rng.randint(-300, 300), y + rng.randint(-300, 300))], fill=(190, 170, 90), width=rng.randint(2, 6))
+    for _ in range(width // 150):
+        x, y = rng.randrange(width), rng.randrange(height)
+        w, h = rng.randint(40, 250), rng.randint(40, 250)
+        draw.rectangle([x, y, x + w, y + h], fill=(20, 20, 22), outline=(200, 200, 200))
+    for _ in range(width // 10):
+        x, y = rng.randrange(width), rng.randrange(height)
+        draw.rectangle([x, y, x + rng.randint(6, 16), y + rng.randint(3, 8)], fill=rng.choice([(150, 110, 60), (230, 230, 225), (60, 60, 60)]))
+    return img
+
+def scan_image(rng: random.Random, size: Tuple[int, int]) -> Image.Image:
+    """Bilevel scanned page: ruled table, text-like strokes and a board outline"""
+    width, height = size
+    img = Image.new('L', size, 255)
+    draw = ImageDraw.Draw(img)
+    for y in range(height // 12, height, height // 12):
+        draw.line([(width // 20, y), (width - width // 20, y)], fill=0, width=2)
+    for _ in range(width // 4):
+        x, y = rng.randrange(width), rng.randrange(height)
+        draw.line([(x, y), (x + rng.randint(4, 30), y)], fill=0, width=rng.randint(1, 3))
+    draw.rectangle([width // 4, height // 4, width * 3 // 4, height * 3 // 4], outline=0, width=6)
+    return img
+
+def encode_dct(img: Image.Image, cmyk: bool = False) -> bytes:
+    buffer = io.BytesIO()
+    (img.convert('CMYK') if cmyk else img).save(buffer, format='JPEG', quality=85)
+    return buffer.getvalue()
+
+def encode_png(img: Image.Image) -> bytes:
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG', compress_level=1)
+    return buffer.getvalue()
+
+def encode_jbig2(img: Image.Image) -> bytes:
+    """Embedded-profile JBIG2 stream: page info + one lossless generic region coded with MMR.
+
+    MMR generic regions carry plain CCITT G4 data, so Pillow's group4 TIFF
+    encoder is enough and no jbig2enc binary is needed.
+    """
+    width, height = img.size
+    # JBIG2 uses 1 = black, the opposite of Pillow's mode '1'
+    bilevel = img.point(lambda v: 255 if v < 128 else 0).convert('1')
+
+    strip_size = TiffImagePlugin.STRIP_SIZE
+    TiffImagePlugin.STRIP_SIZE = 1 << 30   # one strip, so the G4 data is a single run
+    try:
+        buffer = io.BytesIO()
+        bilevel.save(buffer, format='TIFF', compression='group4')
+    finally:
+        TiffImagePlugin.STRIP_SIZE = strip_size
+
+    tiff = Image.open(io.BytesIO(buffer.getvalue()))
+    offset, length = tiff.tag_v2[273], tiff.tag_v2[279]
+    offset = offset[0] if isinstance(offset, tuple) else offset
+    length = length[0] if isinstance(length, tuple) else length
+    g4 = buffer.getvalue()[offset:offset + length]
+
+    def segment(number: int, segment_type: int, data: bytes) -> bytes:
+        return struct.pack('>IBBBI', number, segment_type, 0, 1, len(data)) + data
+
+    page_info = struct.pack('>IIIIBH', width, height, 0, 0, 0, 0)
+    region = struct.pack('>IIIIB', width, height, 0, 0, 0) + bytes([1]) + g4   # flags: MMR=1
+    return segment(0, 48, page_info) + segment(1, 39, region) + segment(2, 49, b'')
+
+def insert_jbig2(doc: fitz.Document, page: fitz.Page, rect: fitz.Rect, data: bytes, size: Tuple[int, int]) -> int:
+    """PyMuPDF can't write JBIG2, so insert a placeholder and swap in the JBIG2 stream and dictionary"""
+    width, height = size
+    placeholder = io.BytesIO()
+    Image.new('L', (8, 8), 255).save(placeholder, format='PNG')
+    xref = page.insert_image(rect, stream=placeholder.getvalue())
+    doc.update_stream(xref, data, compress=False)
+    doc.update_object(xref, f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} "
+                            f"/ColorSpace /DeviceGray /BitsPerComponent 1 /Filter /JBIG2Decode /Length {len(data)} >>")
+    return xref
+
+def make_image(rng: random.Random, encoding: str, size: Tuple[int, int]) -> bytes:
+    if encoding == 'jbig2':
+        return encode_jbig2(scan_image(rng, size))
+    img = pcb_image(rng, size)
+    if encoding == 'flate':
+        return encode_png(img)
+    return encode_dct(img, cmyk=encoding == 'cmyk')
+
+@lru_cache(maxsize=64)
+def pool_image(seed: int, index: int, encoding: str, size: Tuple[int, int]) -> bytes:
+    return make_image(random.Random(f"{seed}|pool|{index}"), encoding, size)
+
+def decoration_image(rng: random.Random) -> bytes:
+    size = rng.randint(12, 64)
+    img = Image.new('RGB', (size, size), (rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    ImageDraw.Draw(img).ellipse([2, 2, size - 3, size - 3], fill=(255, 255, 255))
+    return encode_png(img)
+
+def write_text_page(page: fitz.Page, rng: random.Random, label: str):
+    y = 80
+    page.insert_text((50, 50), f"{label} - Test Report", fontsize=14)
+    for line in range(rng.randint(30, 45)):
+        page.insert_text((50, y), f"{line + 1}. Measured {rng.uniform(20, 80):.2f} dBuV/m at {rng.uniform(30, 6000):.1f} MHz: PASS", fontsize=10)
+        y += 15
+
+def generate_pdf(args) -> Dict:
+    spec, out_dir, index = args
+    rng = random.Random(f"{spec.seed}|pdf|{index}")
+    encodings, weights = zip(*spec.encodings.items())
+    label = f"Exhibit {index + 1}"
+    stats = {'pages': rng.randint(*spec.pages), 'text_pages': 0, 'images': 0, 'duplicates': 0,
+             'shared_refs': 0, 'decorations': 0, 'encodings': {}}
+
+    doc = fitz.open()
+    placed = []            # (xref, size) of large images already in this PDF
+    logo_xref = 0
+
+    for page_num in range(stats['pages']):
+        page = doc.new_page(width=612, height=792)
+
+        if rng.random() < spec.text_page_rate:
+            write_text_page(page, rng, label)
+            stats['text_pages'] += 1
+        else:
+            page.insert_text((50, 50), f"Internal Photos - {label} - Page {page_num + 1}", fontsize=14)
+            slot_height = 660 / spec.images_per_page
+            for slot in range(spec.images_per_page):
+                rect = fitz.Rect(50, 90 + slot * slot_height, 562, 80 + (slot + 1) * slot_height)
+
+                if placed and rng.random() < spec.shared_xref_rate:
+                    page.insert_image(rect, xref=rng.choice(placed))
+                    stats['shared_refs'] += 1
+                    continue
+
+                encoding = rng.choices(encodings, weights)[0]
+                size = rng.choice(spec.image_sizes)
+                if rng.random() < spec.duplicate_rate:
+                    data = pool_image(spec.seed, rng.randrange(spec.duplicate_pool), encoding, size)
+                    stats['duplicates'] += 1
+                else:
+                    data = make_image(rng, encoding, size)
+
+                if encoding == 'jbig2':
+                    xref = insert_jbig2(doc, page, rect, data, size)
+                else:
+                    xref = page.insert_image(rect, stream=data)
+                placed.append(xref)
+                stats['images'] += 1
+                stats['encodings'][encoding] = stats['encodings'].get(encoding, 0) + 1
+
+        for decoration in range(spec.decorations):
+            rect = fitz.Rect(520 - decoration * 40, 20, 552 - decoration * 40, 52)
+            if decoration == 0:
+                # The applicant's logo: one xref referenced from every page
+                if logo_xref:
+                    page.insert_image(rect, xref=logo_xref)
+                else:
+                    logo_xref = page.insert_image(rect, stream=decoration_image(rng))
+            else:
+                page.insert_image(rect, stream=decoration_image(rng))
+            stats['decorations'] += 1
+
+    filename = f"corpus_{index + 1:05d}_Internal_Photos.pdf"
+    path = os.path.join(out_dir, filename)
+    doc.save(path, garbage=0, deflate=True)
+    doc.close()
+
+    stats['filename'] = filename
+    stats['bytes'] = os.path.getsize(path)
+    return stats
+
+def generate_corpus(out_dir: str, spec: CorpusSpec, workers: int = 1) -> Dict:
+    """Write spec.pdfs PDFs into out_dir and return a manifest (also saved as manifest.json)"""
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = [(spec, out_dir, index) for index in range(spec.pdfs)]
+
+    if workers > 1:
+        with Pool(workers) as pool:
+            documents = pool.map(generate_pdf, jobs, chunksize=max(1, len(jobs) // (workers * 8)))
+    else:
+        documents = [generate_pdf(job) for job in jobs]
+
+    totals = {'pages': 0, 'text_pages': 0, 'images': 0, 'duplicates': 0, 'shared_refs': 0, 'decorations': 0, 'bytes': 0}
+    encodings = {}
+    for document in documents:
+        for key in totals:
+            totals[key] += document[key]
+        for encoding, count in document['encodings'].items():
+            encodings[encoding] = encodings.get(encoding, 0) + count
+
+    manifest = {'spec': asdict(spec), 'pdfs': len(documents), **totals, 'encodings': encodings, 'documents': documents}
+    with open(os.path.join(out_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def parse_size(value: str) -> Tuple[int, int]:
+    width, height = value.lower().split('x')
+    return int(width), int(height)
+
+def parse_sizes(value: str) -> List[Tuple[int, int]]:
+    return [parse_size(size) for size in value.split(',')]
+
+def parse_range(value: str) -> Tuple[int, int]:
+    low, _, high = value.partition('-')
+    return int(low), int(high or low)
+
+def parse_encodings(value: str) -> Dict[str, float]:
+    """'dct:6,flate:2,jbig2' -> {'dct': 6.0, 'flate': 2.0, 'jbig2': 1.0}"""
+    weights = {}
+    for item in value.split(','):
+        name, _, weight = item.partition(':')
+        name = ENCODING_ALIASES.get(name.strip().lower(), name.strip().lower())
+        if name not in ENCODINGS:
+            raise argparse.ArgumentTypeError(f"unknown encoding {name!r}, expected one of {', '.join(ENCODINGS)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+def add_spec_arguments(parser: argparse.ArgumentParser):
+    defaults = CorpusSpec()
+    parser.add_argument('--pdfs', type=int, default=defaults.pdfs, help='Number of PDFs')
+    parser.add_argument('--pages', type=parse_range, default=defaults.pages, help='Pages per PDF, N or MIN-MAX')
+    parser.add_argument('--images-per-page', type=int, default=defaults.images_per_page)
+    parser.add_argument('--image-sizes', '--image-size', type=parse_sizes, default=defaults.image_sizes,
+                        help='Comma-separated WIDTHxHEIGHT choices')
+    parser.add_argument('--encodings', '--encoding', type=parse_encodings, default=defaults.encodings,
+                        help='Comma-separated dct, flate, jbig2, cmyk with optional :weight (jpeg/raw accepted)')
+    parser.add_argument('--duplicate-rate', type=float, default=defaults.duplicate_rate)
+    parser.add_argument('--duplicate-pool', type=int, default=defaults.duplicate_pool)
+    parser.add_argument('--shared-xref-rate', type=float, default=defaults.shared_xref_rate)
+    parser.add_argument('--decorations', type=int, default=defaults.decorations, help='Tiny images per page')
+    parser.add_argument('--text-page-rate', type=float, default=defaults.text_page_rate)
+    parser.add_argument('--seed', type=int, default=defaults.seed)
+
+def spec_from_args(args) -> CorpusSpec:
+    return CorpusSpec(
+        pdfs=args.pdfs,
+        pages=args.pages,
+        images_per_page=args.images_per_page,
+        image_sizes=args.image_sizes,
+        encodings=args.encodings,
+        duplicate_rate=args.duplicate_rate,
+        duplicate_pool=args.duplicate_pool,
+        shared_xref_rate=args.shared_xref_rate,
+        decorations=args.decorations,
+        text_page_rate=args.text_page_rate,
+        seed=args.seed
+    )
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('out_dir')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Parallel generator processes')
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+    manifest = generate_corpus(args.out_dir, spec_from_args(args), args.workers)
+    manifest.pop('documents')
+    print(json.dumps(manifest, indent=2))
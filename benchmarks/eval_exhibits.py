@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Measure exhibit selection against the labeled exhibits in fixtures/exhibit_labels.csv.
+
+Each row is one exhibit of an FCC filing (exhibit type, link text, file name,
+size, and whether it really is an internal-photos PDF). Reports precision,
+recall and the megabytes of irrelevant PDFs that would be downloaded for the
+previous selectors and for src/scraper/exhibits.py with and without the
+'Exhibit Type' column.
+
+    python benchmarks/eval_exhibits.py [--labels path.csv] [--show-errors]
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.scraper import exhibits
+
+LABELS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'exhibit_labels.csv')
+
+# FCCScraper._is_internal_photo_pdf before exhibits.py, matched on the link text
+LEGACY_PATTERNS = [
+    r'.*internal.*photo.*\.pdf',
+    r'.*int.*photo.*\.pdf',
+    r'.*inside.*\.pdf',
+    r'.*pcb.*\.pdf',
+    r'.*internal.*\.pdf'
+]
+# SeleniumFCCScraper._parse_exhibit_links before exhibits.py
+LEGACY_KEYWORDS = ['internal', 'int', 'photo', 'inside']
+
+def href(row):
+    return f"/eas/GetApplicationAttachment.html?id=1&file={row['file']}"
+
+SELECTORS = {
+    'legacy_patterns': lambda row: any(re.search(p, row['description'], re.IGNORECASE) for p in LEGACY_PATTERNS),
+    'legacy_keywords': lambda row: any(k in row['description'].lower() for k in LEGACY_KEYWORDS),
+    'exhibits_type_column': lambda row: exhibits.is_internal_photos(row['description'], href(row), row['exhibit_type']),
+    'exhibits_text_only': lambda row: exhibits.is_internal_photos(row['description'], href(row))
+}
+
+def evaluate(rows, select):
+    tp = fp = fn = 0
+    wasted_kb = 0
+    errors = []
+    for row in rows:
+        predicted = select(row)
+        actual = row['internal'] == '1'
+        if predicted and actual:
+            tp += 1
+        elif predicted:
+            fp += 1
+            wasted_kb += int(row['size_kb'])
+        elif actual:
+            fn += 1
+        if predicted != actual:
+            errors.append(f"{'FP' if predicted else 'FN'} {row['exhibit_type']!r} {row['description']!r} {row['file']}")
+    return {
+        'selected': tp + fp,
+        'precision': round(tp / (tp + fp), 3) if tp + fp else 0.0,
+        'recall': round(tp / (tp + fn), 3) if tp + fn else 0.0,
+        'irrelevant_mb': round(wasted_kb / 1024, 1),
+        'errors': errors
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--labels', default=LABELS, help='Labeled exhibits CSV')
+    parser.add_argument('--show-errors', action='store_true', help='List false positives/negatives per selector')
+    args = parser.parse_args()
+
+    with open(args.labels, newline='') as f:
+        rows = list(csv.DictReader(f))
+
+    report = {'exhibits': len(rows), 'internal': sum(row['internal'] == '1' for row in rows)}
+    for name, select in SELECTORS.items():
+        result = evaluate(rows, select)
+        errors = result.pop('errors')
+        if args.show_errors:
+            result['errors'] = errors
+        report[name] = result
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
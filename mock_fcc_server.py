@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""Local stand-in for the FCC EAS site, for load and regression testing without apps.fcc.gov.
+
+Serves the pages the scrapers use, with the same markup as the real site:
+
+    /oetcf/eas/reports/GenericSearch.cfm        GET: search form, POST: grant results for the dates
+    /oetcf/eas/reports/ViewExhibitReport.cfm    exhibit list for ?application_id=
+    /eas/GetApplicationAttachment.html          exhibit PDFs (built with create_sample_pdfs.py)
+
+Grants and exhibits are generated deterministically from --seed and the search
+date, so runs are repeatable. Latency, error rate, 429s and page size are configurable.
+Point the scraper at it with:
+
+    FCC_BASE_URL=http://localhost:8080/oetcf/eas/reports python -m src.main
+"""
+
+import argparse
+import hashlib
+import html
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+REPORTS_PATH = '/oetcf/eas/reports'
+ATTACHMENT_PATH = '/eas/GetApplicationAttachment.html'
+
+APPLICANTS = [
+    'Espressif Systems (Shanghai) Co., Ltd.', 'Apple Inc.', 'Samsung Electronics Co Ltd', 'Google LLC',
+    'Shenzhen Anxinke Technology CO;LTD', 'Tuya Inc.', 'NETGEAR Inc', 'Realtek Semiconductor Corp.',
+    'Sony Corporation', 'Winner Micro', 'Amazon.com Services LLC', 'Nordic Semiconductor ASA'
+]
+PRODUCTS = [
+    'Wi-Fi Module', 'Smart Plug', 'Wireless Router', 'Mobile Phone', 'Smart Watch', 'BLE Module',
+    'Development Board', 'Wireless Headphones', 'Smart Speaker', 'Thermostat', 'Camera', 'Tablet'
+]
+# (link description, exhibit type) as they appear on ViewExhibitReport.cfm
+EXHIBITS = [
+    ('Internal Photos', 'Internal Photos'),
+    ('External Photos', 'External Photos'),
+    ('Test Report', 'Test Report'),
+    ('User Manual', 'Users Manual'),
+    ('Label and Location', 'ID Label/Location Info'),
+    ('Test Setup Photos', 'Test Setup Photos'),
+    ('RF Exposure Info', 'RF Exposure Info'),
+    ('Cover Letter(s)', 'Cover Letter(s)'),
+    ('Schematics', 'Schematics'),
+    ('Block Diagram', 'Block Diagram'),
+    ('Operational Description', 'Operational Description'),
+    ('Test Report DFS', 'Test Report')
+]
+
+class MockFCC:
+    """Deterministic grant/exhibit generator plus the fault model shared by all requests"""
+
+    def __init__(self, args):
+        self.args = args
+        self.pdf_dir = args.pdf_dir or os.path.join('data', 'mock_fcc', 'pdfs')
+        self.supplied_pdfs = sorted(f for f in os.listdir(args.pdf_dir) if f.endswith('.pdf')) if args.pdf_dir else []
+        self._pdf_lock = threading.Lock()
+        self.stats = {'requests': 0, 'errors': 0, 'throttled': 0}
+
+    def _rng(self, *parts) -> random.Random:
+        digest = hashlib.sha256('|'.join(str(p) for p in (self.args.seed,) + parts).encode()).digest()
+        return random.Random(int.from_bytes(digest[:8], 'big'))
+
+    def grants_for(self, date_str: str):
+        rng = self._rng('grants', date_str)
+        grants = []
+        for i in range(self.args.grants):
+            grantee = '2A' + ''.join(rng.choice('ABCDEFGHJKLMNPQRSTUVWXYZ0123456789') for _ in range(3))
+            product = ''.join(rng.choice('ABCDEFGHJKLMNPQRSTUVWXYZ0123456789') for _ in range(rng.randint(4, 10)))
+            grants.append({
+                'fcc_id': f"{grantee}-{product}",
+                'applicant': rng.choice(APPLICANTS),
+                'product_name': rng.choice(PRODUCTS),
+                'grant_date': date_str
+            })
+        return grants
+
+    def exhibits_for(self, fcc_id: str):
+        rng = self._rng('exhibits', fcc_id)
+        count = max(1, min(len(EXHIBITS), int(rng.gauss(self.args.exhibits, self.args.exhibits / 3))))
+        chosen = rng.sample(EXHIBITS, count)
+        if rng.random() < self.args.internal_photo_rate and EXHIBITS[0] not in chosen:
+            chosen[0] = EXHIBITS[0]
+        return [{
+            'id': int(hashlib.sha256(f"{fcc_id}|{desc}".encode()).hexdigest()[:7], 16),
+            'description': desc,
+            'exhibit_type': exhibit_type,
+            'file': f"{fcc_id}_{desc.replace(' ', '_').replace('(', '').replace(')', '')}.pdf"
+        } for desc, exhibit_type in chosen]
+
+    def pdf_for(self, attachment_id: int, filename: str) -> str:
+        """Path of the PDF served for an attachment, from --pdf-dir or generated on first use"""
+        supplied = self.supplied_pdfs
+        if supplied:
+            photos = [f for f in supplied if 'photo' in f.lower()] or supplied
+            others = [f for f in supplied if 'photo' not in f.lower()] or supplied
+            pool = photos if 'photo' in filename.lower() else others
+            return os.path.join(self.pdf_dir, pool[attachment_id % len(pool)])
+
+        kind = 'photos' if 'photo' in filename.lower() else 'report'
+        path = os.path.join(self.pdf_dir, f"mock_{kind}.pdf")
+        with self._pdf_lock:
+            if not os.path.exists(path):
+                os.makedirs(self.pdf_dir, exist_ok=True)
+                self._build_pdf(path, kind)
+        return path
+
+    def _build_pdf(self, path: str, kind: str):
+        from reportlab.pdfgen import canvas
+        from reportlab.lib.pagesizes import letter
+        from create_sample_pdfs import create_sample_pdf_with_images
+
+        if kind == 'photos':
+            create_sample_pdf_with_images(path, "Mock FCC Internal Photos")
+            return
+
+        c = canvas.Canvas(path, pagesize=letter)
+        c.setFont("Helvetica", 12)
+        for page in range(5):
+            y = 740
+            for line in range(40):
+                c.drawString(50, y, f"Test data, page {page + 1}, line {line + 1}: Radiated Emissions PASS")
+                y -= 17
+            c.showPage()
+        c.save()
+
+    def delay(self):
+        if self.args.latency > 0:
+            # Log-normal around the median, like a slow backend with a long tail
+            time.sleep(random.lognormvariate(0, self.args.latency_jitter) * self.args.latency)
+
+    def fault(self):
+        """None, or (status, headers) for an injected error response"""
+        roll = random.random()
+        if roll < self.args.rate_limit_rate:
+            return 429, {'Retry-After': str(self.args.retry_after)}
+        if roll < self.args.rate_limit_rate + self.args.error_rate:
+            return random.choice([(500, {}), (503, {'Retry-After': str(self.args.retry_after)})])
+        return None
+
+    def padding(self) -> str:
+        if self.args.page_kb <= 0:
+            return ''
+        filler = 'Federal Communications Commission, Office of Engineering and Technology. '
+        return '<div style="display:none">' + filler * (self.args.page_kb * 1024 // len(filler)) + '</div>\n'
+
+def _page(title: str, body: str, padding: str = '') -> str:
+    return (
+        '<!DOCTYPE HTML PUBLIC "-//W3C//DTD HTML 4.01 Transitional//EN">\n'
+        f'<html><head><title>{title}</title>\n'
+        '<script type="text/javascript">function popUp(URL) { window.open(URL, "Report"); }</script></head><body>\n'
+        '<table width="100%" border="0"><tr><td><img src="/images/fcc_logo.gif" alt="FCC"></td>'
+        '<td>Office of Engineering and Technology</td></tr></table>\n'
+        f'{padding}{body}</body></html>\n'
+    )
+
+def render_search_form() -> str:
+    return _page('OET Generic Search', (
+        '<form name="GenericSearch" method="post" action="GenericSearch.cfm">\n'
+        '<table><tr><td>Final Action Date Range</td>'
+        '<td><input type="text" name="grant_date_from"> to <input type="text" name="grant_date_to"></td></tr>\n'
+        '<tr><td>Grantee Code</td><td><input type="text" name="grantee_code"></td></tr>\n'
+        '<tr><td colspan="2"><input type="submit" name="Submit" value="Start Search"></td></tr></table>\n'
+        '</form>\n'
+    ))
+
+def render_search_results(grants, padding: str = '') -> str:
+    rows = ['<table border="1" cellpadding="2" cellspacing="0" width="100%" id="rsTable">',
+            '<tr><th>Grantee Code / FCC ID</th><th>Applicant Name</th><th>Product Description</th>'
+            '<th>Final Action Date</th><th>Display</th></tr>']
+    for grant in grants:
+        fcc_id = html.escape(grant['fcc_id'])
+        rows.append(
+            f'<tr><td><a href="ViewExhibitReport.cfm?mode=Exhibits&amp;RequestTimeout=500&amp;calledFromFrame=N&amp;application_id={fcc_id}">{fcc_id}</a></td>'
+            f'<td>{html.escape(grant["applicant"])}</td><td>{html.escape(grant["product_name"])}</td>'
+            f'<td>{grant["grant_date"]}</td><td><a href="javascript:popUp(\'ViewGrant.cfm?id={fcc_id}\')">Grant</a></td></tr>'
+        )
+    rows.append('</table>')
+    return _page('OET List Exhibits Report', '<form name="results" method="post" action="GenericSearch.cfm">\n'
+                 + '\n'.join(rows) + f'\n</form>\n<p>{len(grants)} records found.</p>\n', padding)
+
+def render_exhibits(fcc_id: str, exhibits, padding: str = '') -> str:
+    rows = ['<table border="1" cellpadding="2" cellspacing="0" width="100%">',
+            '<tr><th>Exhibit Type</th><th>Description</th><th>Date Submitted</th><th>Display Type</th></tr>']
+    for exhibit in exhibits:
+        rows.append(
+            f'<tr><td>{html.escape(exhibit["exhibit_type"])}</td>'
+            f'<td><a href="{ATTACHMENT_PATH}?id={exhibit["id"]}&amp;file={html.escape(exhibit["file"])}">{html.escape(exhibit["description"])}</a></td>'
+            f'<td>09/02/2026</td><td>pdf</td></tr>'
+        )
+    rows.append('</table>')
+    return _page('OET Exhibits List', f'<table width="100%"><tr><td>FCC ID: {html.escape(fcc_id)}</td></tr></table>\n'
+                 + '\n'.join(rows) + '\n', padding)
+
+def parse_range(header, size: int):
+    """(start, end) of a single 'bytes=' range, or None to send the whole body"""
+    if not header or not header.startswith('bytes=') or ',' in header or not size:
+        return None
+    first, _, last = header[len('bytes='):].strip().partition('-')
+    try:
+        if not first:  # suffix range: the last N bytes
+            return max(0, size - int(last)), size - 1
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None
+    return (start, end) if start <= end else None
+
+class MockFCCHandler(BaseHTTPRequestHandler):
+    mock: MockFCC = None
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def _handle(self, method: str):
+        mock = self.mock
+        mock.stats['requests'] += 1
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+
+        form = {}
+        if method == 'POST':
+            length = int(self.headers.get('Content-Length') or 0)
+            form = parse_qs(self.rfile.read(length).decode('utf-8', errors='replace'))
+
+        mock.delay()
+        fault = mock.fault()
+        if fault:
+            status, headers = fault
+            mock.stats['throttled' if status == 429 else 'errors'] += 1
+            self._send(status, b'<html><body>Service temporarily unavailable</body></html>', 'text/html', headers)
+            return
+
+        if url.path == f"{REPORTS_PATH}/GenericSearch.cfm":
+            if method == 'POST':
+                default = (datetime.now() - timedelta(days=1)).strftime('%m/%d/%Y')
+                date_str = form.get('grant_date_from', [default])[0]
+                page = render_search_results(mock.grants_for(date_str), mock.padding())
+            else:
+                page = render_search_form()
+            self._send(200, page.encode('utf-8'), 'text/html; charset=utf-8')
+
+        elif url.path == f"{REPORTS_PATH}/ViewExhibitReport.cfm":
+            fcc_id = query.get('application_id', [''])[0]
+            page = render_exhibits(fcc_id, mock.exhibits_for(fcc_id), mock.padding())
+            self._send(200, page.encode('utf-8'), 'text/html; charset=utf-8')
+
+        elif url.path == ATTACHMENT_PATH:
+            try:
+                attachment_id = int(query.get('id', ['0'])[0])
+            except ValueError:
+                attachment_id = 0
+            path = mock.pdf_for(attachment_id, query.get('file', [''])[0])
+            with open(path, 'rb') as f:
+                body = f.read()
+            span = None if mock.args.no_ranges else parse_range(self.headers.get('Range'), len(body))
+            if span:
+                start, end = span
+                self._send(206, body[start:end + 1], 'application/pdf', {
+                    'Accept-Ranges': 'bytes',
+                    'Content-Range': f'bytes {start}-{end}/{len(body)}'
+                })
+            else:
+                self._send(200, body, 'application/pdf', None if mock.args.no_ranges else {'Accept-Ranges': 'bytes'})
+
+        else:
+            self._send(404, b'Not found', 'text/plain')
+
+    def _send(self, status: int, body: bytes, content_type: str, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        self._handle('HEAD')
+
+    def log_message(self, format, *args):
+        if self.mock.args.verbose:
+            super().log_message(format, *args)
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--seed', type=int, default=1, help='Seed for generated grants and exhibits')
+    parser.add_argument('--grants', type=int, default=50, help='Grants returned per search date')
+    parser.add_argument('--exhibits', type=int, default=8, help='Mean exhibits per grant')
+    parser.add_argument('--internal-photo-rate', type=float, default=0.7, help='Fraction of grants with internal photos')
+    parser.add_argument('--latency', type=float, default=0.5, help='Median response latency (seconds)')
+    parser.add_argument('--latency-jitter', type=float, default=0.6, help='Log-normal sigma of the latency')
+    parser.add_argument('--error-rate', type=float, default=0.02, help='Fraction of requests answered with 500/503')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.01, help='Fraction of requests answered with 429')
+    parser.add_argument('--retry-after', type=int, default=5, help='Retry-After seconds on 429/503')
+    parser.add_argument('--page-kb', type=int, default=40, help='Extra markup per HTML page, in KB')
+    parser.add_argument('--pdf-dir', help='Serve PDFs from this directory (e.g. a generated corpus) instead of the built-in samples')
+    parser.add_argument('--no-ranges', action='store_true', help='Ignore Range headers on exhibit PDFs')
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    return parser
+
+def start_mock_server(args) -> ThreadingHTTPServer:
+    """Start the server in a background thread and return it (call shutdown() to stop)"""
+    handler = type('BoundMockFCCHandler', (MockFCCHandler,), {'mock': MockFCC(args)})
+    httpd = ThreadingHTTPServer(('', args.port), handler)
+    server_thread = threading.Thread(target=httpd.serve_forever)
+    server_thread.daemon = True
+    server_thread.start()
+    return httpd
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    server = start_mock_server(args)
+    print(f"✅ Mock FCC server at http://localhost:{server.server_address[1]}{REPORTS_PATH}")
+    print(f"   FCC_BASE_URL=http://localhost:{server.server_address[1]}{REPORTS_PATH}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping mock FCC server...")
+        server.shutdown()
+        print(f"✅ Served {server.RequestHandlerClass.mock.stats}")
@@ -8,26 +8,152 @@ class Config:
     
     DATA_DIR = os.getenv('DATA_DIR', 'data')
     IMAGES_DIR = os.path.join(DATA_DIR, 'images')
+    # Content-addressed photo blobs ({root}/ab/cd/<sha256>.png) and their thumbnails
+    IMAGE_STORE_DIR = os.getenv('IMAGE_STORE_DIR', os.path.join(DATA_DIR, 'store'))
+    THUMBNAILS_DIR = os.path.join(DATA_DIR, 'thumbnails')
+    
+    # 'blobs' (one file per image) or 'packs' (images up to PACK_MAX_IMAGE_BYTES are
+    # appended to per-day pack files under PACK_DIR, larger ones still go to blobs)
+    IMAGE_STORAGE = os.getenv('IMAGE_STORAGE', 'blobs')
+    PACK_DIR = os.getenv('PACK_DIR', os.path.join(DATA_DIR, 'packs'))
+    PACK_MAX_BYTES = int(os.getenv('PACK_MAX_BYTES', str(1024 * 1024 * 1024)))
+    PACK_MAX_IMAGE_BYTES = int(os.getenv('PACK_MAX_IMAGE_BYTES', str(1024 * 1024)))
     DATABASE_DIR = os.path.join(DATA_DIR, 'database')
+    HTTP_CACHE_DIR = os.getenv('HTTP_CACHE_DIR', os.path.join(DATA_DIR, 'http_cache'))
     
-    FCC_BASE_URL = "https://apps.fcc.gov/oetcf/eas/reports"
+    # Point at a local stand-in (see mock_fcc_server.py) for offline load/regression testing
+    FCC_BASE_URL = os.getenv('FCC_BASE_URL', "https://apps.fcc.gov/oetcf/eas/reports").rstrip('/')
     
     DOWNLOAD_DELAY = float(os.getenv('DOWNLOAD_DELAY', '1.0'))
+    
+    # Adaptive per-host rate limiting (requests/second); DOWNLOAD_DELAY sets the starting rate
+    RATE_LIMIT_MIN = float(os.getenv('RATE_LIMIT_MIN', '0.1'))
+    RATE_LIMIT_MAX = float(os.getenv('RATE_LIMIT_MAX', '4.0'))
+    RATE_LIMIT_BURST = float(os.getenv('RATE_LIMIT_BURST', '2'))
+    RATE_LIMIT_INCREASE = float(os.getenv('RATE_LIMIT_INCREASE', '0.05'))
+    RATE_LIMIT_DECREASE = float(os.getenv('RATE_LIMIT_DECREASE', '0.5'))
+    RATE_LIMIT_TARGET_LATENCY = float(os.getenv('RATE_LIMIT_TARGET_LATENCY', '10.0'))
+    CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '5'))
+    CIRCUIT_RESET_TIMEOUT = float(os.getenv('CIRCUIT_RESET_TIMEOUT', '300'))
+    
+    # FCC HTML response cache: off, on, or offline (replay from cache only)
+    HTTP_CACHE_MODE = os.getenv('HTTP_CACHE_MODE', 'on')
+    HTTP_CACHE_TTLS = {
+        'search': float(os.getenv('HTTP_CACHE_TTL_SEARCH', '3600')),
+        'exhibits': float(os.getenv('HTTP_CACHE_TTL_EXHIBITS', '21600'))
+    }
     MAX_RETRIES = int(os.getenv('MAX_RETRIES', '3'))
     
-    PDF_FILENAME_PATTERNS = [
-        r'.*internal.*photo.*\.pdf',
-        r'.*int.*photo.*\.pdf',
-        r'.*inside.*\.pdf',
-        r'.*pcb.*\.pdf',
-        r'.*internal.*\.pdf'
+    PDF_BATCH_SIZE = int(os.getenv('PDF_BATCH_SIZE', '100'))
+    
+    # What to do with a source PDF once its images are extracted: keep, compress (gzip) or delete.
+    # The URL and SHA-256 are kept either way so it can be re-fetched and verified.
+    PDF_RETENTION = os.getenv('PDF_RETENTION', 'keep')
+    # Extract straight from the downloaded bytes without saving the PDF: auto (when
+    # PDF_RETENTION=delete), on or off. PDFs over PDF_STREAM_MAX_MB go to a temp file instead.
+    PDF_STREAM = os.getenv('PDF_STREAM', 'auto')
+    PDF_STREAM_MAX_MB = float(os.getenv('PDF_STREAM_MAX_MB', '64'))
+    # Disk budget for source PDFs (MB, 0 = unlimited); least recently used processed PDFs are evicted
+    PDF_DISK_BUDGET_MB = float(os.getenv('PDF_DISK_BUDGET_MB', '0'))
+    RECLAIM_INTERVAL = float(os.getenv('RECLAIM_INTERVAL', '300'))
+    
+    # Pre-download probe (pdf_processor/probe.py): ranged GETs of the first and last
+    # PROBE_BYTES of each exhibit. Exhibits over the size budget for their type
+    # (MB, 0 = unlimited) or with more than PROBE_MAX_PAGES pages are deferred.
+    PROBE_DOWNLOADS = os.getenv('PROBE_DOWNLOADS', 'true').lower() in ('1', 'true', 'yes')
+    PROBE_BYTES = int(os.getenv('PROBE_BYTES', '2048'))
+    PDF_SIZE_BUDGET_MB = {
+        'internal_photos': float(os.getenv('PDF_SIZE_BUDGET_INTERNAL_PHOTOS_MB', '300')),
+        'default': float(os.getenv('PDF_SIZE_BUDGET_MB', '75'))
+    }
+    PROBE_MAX_PAGES = int(os.getenv('PROBE_MAX_PAGES', '400'))
+    
+    # Opt-in extraction profiling: per-phase timings per PDF/image, plus
+    # cProfile (or pyinstrument) dumps for the slowest PROFILE_TOP_N PDFs of a run
+    PROFILE_EXTRACTION = os.getenv('PROFILE_EXTRACTION', 'false').lower() in ('1', 'true', 'yes')
+    PROFILE_TOP_N = int(os.getenv('PROFILE_TOP_N', '10'))
+    PROFILE_BACKEND = os.getenv('PROFILE_BACKEND', 'cprofile')
+    PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(DATA_DIR, 'profiles'))
+    
+    # PCB photo classifier (pdf_processor/classifier.py): photos scoring at least
+    # PCB_THRESHOLD are marked is_pcb_photo
+    PCB_THRESHOLD = float(os.getenv('PCB_THRESHOLD', '0.5'))
+    CLASSIFY_BATCH_SIZE = int(os.getenv('CLASSIFY_BATCH_SIZE', '256'))
+    CLASSIFY_WORKERS = int(os.getenv('CLASSIFY_WORKERS', str(os.cpu_count() or 1)))
+    
+    # Page pre-filter: skip pages whose usable images cover less than PAGE_MIN_IMAGE_COVERAGE
+    # of the page when they hold at least PAGE_TEXT_CHARS of text (test-report pages with logos)
+    PAGE_FILTER = os.getenv('PAGE_FILTER', 'true').lower() in ('1', 'true', 'yes')
+    PAGE_MIN_IMAGE_COVERAGE = float(os.getenv('PAGE_MIN_IMAGE_COVERAGE', '0.05'))
+    PAGE_TEXT_CHARS = int(os.getenv('PAGE_TEXT_CHARS', '800'))
+    
+    # Images whose quality score (0-1, see pdf_processor/quality.py) is below this
+    # are dropped during extraction as blurry or blank; 0 keeps everything
+    QUALITY_THRESHOLD = float(os.getenv('QUALITY_THRESHOLD', '0.25'))
+    
+    # Near-duplicate photo search: maximum pHash bit distance, and how often the
+    # web app's in-memory hash index picks up newly hashed photos (seconds)
+    SIMILAR_MAX_DISTANCE = int(os.getenv('SIMILAR_MAX_DISTANCE', '10'))
+    HASH_INDEX_REFRESH = float(os.getenv('HASH_INDEX_REFRESH', '60'))
+    
+    # Per-item retry: exponential backoff between attempts, dead letter after the limit
+    MAX_ITEM_ATTEMPTS = int(os.getenv('MAX_ITEM_ATTEMPTS', '6'))
+    RETRY_BASE_DELAY = float(os.getenv('RETRY_BASE_DELAY', '300'))
+    RETRY_MAX_DELAY = float(os.getenv('RETRY_MAX_DELAY', '86400'))
+    
+    # Exhibit selection (scraper/exhibits.py). The FCC 'Exhibit Type' column decides when
+    # present; otherwise link text and file name must match an include pattern and no
+    # exclude pattern. Separators (_ - .) are turned into spaces before matching.
+    INTERNAL_PHOTO_EXHIBIT_TYPES = [
+        r'\binternal\s+photo'
+    ]
+    EXHIBIT_INCLUDE_PATTERNS = [
+        r'\binternal\b',
+        r'\bint\s*photo',
+        r'\binside\b',
+        r'\bpcba?\b',
+        r'\bteardown\b'
     ]
+    EXHIBIT_EXCLUDE_PATTERNS = [
+        r'\bexternal\b',
+        r'\bset\s*up\b',
+        r'\blabel',
+        r'\breport\b',
+        r'\bmanual\b',
+        r'\bschematic',
+        r'\bdiagram\b',
+        r'\bantenna\b',
+        r'\bspec',
+        r'\bletter',
+        r'\bexposure\b'
+    ]
+    
+    # Products per keyset batch in catalog exports (src/export.py)
+    EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '500'))
+    
+    # Deep-zoom tile pyramids for the photo viewer (src/storage/tiles.py), built on first view.
+    # Least recently viewed pyramids are evicted past TILE_CACHE_MB (0 = unlimited).
+    TILE_CACHE_DIR = os.getenv('TILE_CACHE_DIR', os.path.join(DATA_DIR, 'tiles'))
+    TILE_CACHE_MB = float(os.getenv('TILE_CACHE_MB', '2048'))
+    TILE_SIZE = int(os.getenv('TILE_SIZE', '254'))
+    TILE_JPEG_QUALITY = int(os.getenv('TILE_JPEG_QUALITY', '85'))
     
     REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
     
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_DIR = os.getenv('LOG_DIR', os.path.join(DATA_DIR, 'logs'))
+    LOG_FILE_MAX_BYTES = int(os.getenv('LOG_FILE_MAX_BYTES', str(10 * 1024 * 1024)))
+    LOG_FILE_BACKUPS = int(os.getenv('LOG_FILE_BACKUPS', '5'))
+    
+    # Prometheus endpoint served by the scraper process while a run is in progress; 0 disables it
+    METRICS_PORT = int(os.getenv('METRICS_PORT', '9108'))
+    # Each run's final metrics are also written here (served by the web app at /metrics/scraper,
+    # or read by node_exporter's textfile collector) and, if set, pushed to a Pushgateway
+    METRICS_TEXTFILE = os.getenv('METRICS_TEXTFILE', os.path.join(DATA_DIR, 'metrics', 'scraper.prom'))
+    METRICS_PUSHGATEWAY = os.getenv('METRICS_PUSHGATEWAY', '')
     
     @classmethod
     def ensure_dirs(cls):
         os.makedirs(cls.IMAGES_DIR, exist_ok=True)
+        os.makedirs(cls.IMAGE_STORE_DIR, exist_ok=True)
         os.makedirs(cls.DATABASE_DIR, exist_ok=True)
\ No newline at end of file
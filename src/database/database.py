@@ -1,15 +1,50 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, literal, text
 from sqlalchemy.orm import sessionmaker
 from .models import Base
 from ..config import Config
+from ..metrics import instrument_sessions
 
 class Database:
     def __init__(self):
         self.engine = create_engine(Config.DATABASE_URL)
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        instrument_sessions(self.SessionLocal)
         
     def create_tables(self):
         Base.metadata.create_all(bind=self.engine)
+        self._add_missing_columns()
+        
+    def _add_missing_columns(self):
+        """Add columns and indexes introduced after a table was first created.
+        
+        create_all() only creates missing tables, so existing databases would
+        otherwise never see new nullable/defaulted columns or indexes. Scalar
+        defaults are applied to existing rows via the column DEFAULT clause.
+        """
+        inspector = inspect(self.engine)
+        existing_tables = set(inspector.get_table_names())
+        
+        with self.engine.begin() as conn:
+            for table in Base.metadata.sorted_tables:
+                if table.name not in existing_tables:
+                    continue
+                
+                existing = {col['name'] for col in inspector.get_columns(table.name)}
+                added = [col for col in table.columns if col.name not in existing]
+                
+                for column in added:
+                    ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=self.engine.dialect)}"
+                    if column.default is not None and column.default.is_scalar:
+                        default = literal(column.default.arg, type_=column.type).compile(
+                            dialect=self.engine.dialect, compile_kwargs={'literal_binds': True}
+                        )
+                        ddl += f" DEFAULT {default}"
+                    conn.execute(text(ddl))
+                
+                existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+                for index in table.indexes:
+                    if index.name not in existing_indexes:
+                        index.create(bind=conn, checkfirst=True)
         
     def get_session(self):
         return self.SessionLocal()
@@ -17,4 +52,4 @@ class Database:
     def close(self):
         self.engine.dispose()
 
-db = Database()
\ No newline at end of file
+db = Database()
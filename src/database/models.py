@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean, Float, BigInteger
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -16,7 +16,7 @@ class Product(Base):
     filing_date = Column(DateTime)
     grant_date = Column(DateTime)
     equipment_class = Column(String(100))
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     photos = relationship("Photo", back_populates="product", cascade="all, delete-orphan")
@@ -26,14 +26,29 @@ class PDF(Base):
     __tablename__ = 'pdfs'
     
     id = Column(Integer, primary_key=True)
-    product_id = Column(Integer, ForeignKey('products.id'), nullable=False)
+    product_id = Column(Integer, ForeignKey('products.id'), nullable=False, index=True)
     filename = Column(String(255), nullable=False)
     url = Column(String(500), nullable=False)
+    exhibit_type = Column(String(100))  # FCC 'Exhibit Type' column, when the exhibit list has one
     local_path = Column(String(500))
     downloaded = Column(Boolean, default=False)
     processed = Column(Boolean, default=False)
     file_size = Column(Integer)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    stored_size = Column(Integer)  # bytes at local_path (less than file_size once compressed)
+    sha256 = Column(String(64))
+    content_type = Column(String(100))  # from the pre-download probe
+    content_length = Column(Integer)
+    probed_at = Column(DateTime)
+    deferred = Column(Boolean, default=False, index=True)  # too large to fetch until released
+    last_accessed_at = Column(DateTime)
+    evicted_at = Column(DateTime)
+    page_count = Column(Integer)
+    skipped_pages = Column(Text)  # JSON list of {page, reason} from the page pre-filter
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, index=True)
+    last_error = Column(Text)
+    dead_letter = Column(Boolean, default=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     
     product = relationship("Product", back_populates="pdfs")
     photos = relationship("Photo", back_populates="pdf", cascade="all, delete-orphan")
@@ -43,15 +58,79 @@ class Photo(Base):
     
     id = Column(Integer, primary_key=True)
     product_id = Column(Integer, ForeignKey('products.id'), nullable=False)
-    pdf_id = Column(Integer, ForeignKey('pdfs.id'), nullable=True)
+    pdf_id = Column(Integer, ForeignKey('pdfs.id'), nullable=True, index=True)
     filename = Column(String(255), nullable=False)
     local_path = Column(String(500), nullable=False)
+    sha256 = Column(String(64), index=True)
     width = Column(Integer)
     height = Column(Integer)
     file_size = Column(Integer)
     page_number = Column(Integer)
     is_pcb_photo = Column(Boolean, default=None)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    pcb_score = Column(Float)
+    phash = Column(BigInteger, index=True)  # 64-bit perceptual hashes stored signed, see similarity.py
+    dhash = Column(BigInteger)
+    hashed_at = Column(DateTime, index=True)  # when phash was set, so HashIndex picks up backfilled photos
+    sharpness = Column(Float)
+    entropy = Column(Float)
+    blank_fraction = Column(Float)
+    clipped_fraction = Column(Float)
+    quality_score = Column(Float, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     
     product = relationship("Product", back_populates="photos")
-    pdf = relationship("PDF", back_populates="photos")
\ No newline at end of file
+    pdf = relationship("PDF", back_populates="photos")
+
+class FilingAttempt(Base):
+    """Retry state for FCC IDs whose filing details could not be fetched"""
+    __tablename__ = 'filing_attempts'
+    
+    id = Column(Integer, primary_key=True)
+    fcc_id = Column(String(50), unique=True, nullable=False, index=True)
+    applicant = Column(String(255))
+    product_name = Column(String(255))
+    filing_date = Column(DateTime)
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, index=True)
+    last_error = Column(Text)
+    dead_letter = Column(Boolean, default=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class PackEntry(Base):
+    """Location of an image appended to a pack file (see storage/packs.py)"""
+    __tablename__ = 'pack_entries'
+    
+    id = Column(Integer, primary_key=True)
+    sha256 = Column(String(64), unique=True, nullable=False, index=True)
+    pack = Column(String(100), nullable=False, index=True)
+    offset = Column(BigInteger, nullable=False)
+    length = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class ExtractionProfile(Base):
+    """Per-PDF phase timings recorded when extraction profiling is enabled"""
+    __tablename__ = 'extraction_profiles'
+    
+    id = Column(Integer, primary_key=True)
+    pdf_id = Column(Integer, ForeignKey('pdfs.id'), nullable=False, index=True)
+    fcc_id = Column(String(50))
+    filename = Column(String(255))
+    total_seconds = Column(Float, index=True)
+    pages = Column(Integer)
+    images = Column(Integer)
+    photos = Column(Integer)
+    open_seconds = Column(Float)
+    page_scan_seconds = Column(Float)
+    pixmap_seconds = Column(Float)
+    png_encode_seconds = Column(Float)
+    write_seconds = Column(Float)
+    pil_reopen_seconds = Column(Float)
+    validate_seconds = Column(Float)
+    quality_seconds = Column(Float)
+    hash_seconds = Column(Float)
+    db_commit_seconds = Column(Float)
+    other_seconds = Column(Float)
+    image_timings = Column(Text)  # JSON list of per-image phase timings
+    profile_path = Column(String(500))
+    created_at = Column(DateTime, default=datetime.utcnow)
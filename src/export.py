@@ -0,0 +1,227 @@
+"""Bulk export of the catalog as JSONL or Parquet.
+
+    python -m src.export --output catalog.parquet [--format parquet] [--since 2024-05-01] [--include hashes quality]
+
+Products, their PDFs and the PDFs' photos are joined into one row per photo,
+one per PDF without photos and one per product without PDFs. Each row carries
+the product_id, pdf_id and photo_id keys. `--include` adds the perceptual
+hashes (phash/dhash, signed 64-bit as stored, see similarity.py) and the
+quality scores.
+
+The rows are read in keyset batches of EXPORT_BATCH_SIZE products, each in
+its own short session. A single long-lived cursor would hold SQLite's read
+lock for the whole export and block the scraper's commits. Batches are
+encoded as they are read, so memory stays bounded by one batch.
+
+With `--since`, only rows where the product, PDF or photo was created at or
+after that time are exported. Downstream jobs can then append them, replacing
+earlier rows with the same keys. The keyset query itself skips products with
+nothing new (the created_at columns are indexed), so an incremental export
+reads only the batches it writes.
+
+Parquet is written with pyarrow (in requirements.txt).
+"""
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from sqlalchemy import or_
+
+from .config import Config
+from .database.database import db
+from .database.models import PDF, Photo, Product
+
+FORMATS = ('jsonl', 'parquet')
+MIMETYPES = {'jsonl': 'application/x-ndjson', 'parquet': 'application/vnd.apache.parquet'}
+
+# (output name, column, Parquet type)
+COLUMNS = [
+    ('product_id', Product.id, 'int64'),
+    ('fcc_id', Product.fcc_id, 'string'),
+    ('applicant', Product.applicant, 'string'),
+    ('product_name', Product.product_name, 'string'),
+    ('equipment_class', Product.equipment_class, 'string'),
+    ('filing_date', Product.filing_date, 'timestamp'),
+    ('grant_date', Product.grant_date, 'timestamp'),
+    ('product_created_at', Product.created_at, 'timestamp'),
+    ('pdf_id', PDF.id, 'int64'),
+    ('pdf_filename', PDF.filename, 'string'),
+    ('pdf_url', PDF.url, 'string'),
+    ('exhibit_type', PDF.exhibit_type, 'string'),
+    ('pdf_sha256', PDF.sha256, 'string'),
+    ('pdf_file_size', PDF.file_size, 'int64'),
+    ('pdf_page_count', PDF.page_count, 'int32'),
+    ('pdf_processed', PDF.processed, 'bool'),
+    ('pdf_created_at', PDF.created_at, 'timestamp'),
+    ('photo_id', Photo.id, 'int64'),
+    ('photo_filename', Photo.filename, 'string'),
+    ('photo_sha256', Photo.sha256, 'string'),
+    ('width', Photo.width, 'int32'),
+    ('height', Photo.height, 'int32'),
+    ('photo_file_size', Photo.file_size, 'int64'),
+    ('page_number', Photo.page_number, 'int32'),
+    ('is_pcb_photo', Photo.is_pcb_photo, 'bool'),
+    ('pcb_score', Photo.pcb_score, 'float64'),
+    ('photo_created_at', Photo.created_at, 'timestamp')
+]
+OPTIONAL_COLUMNS = {
+    'hashes': [
+        ('phash', Photo.phash, 'int64'),
+        ('dhash', Photo.dhash, 'int64')
+    ],
+    'quality': [
+        ('sharpness', Photo.sharpness, 'float64'),
+        ('entropy', Photo.entropy, 'float64'),
+        ('blank_fraction', Photo.blank_fraction, 'float64'),
+        ('clipped_fraction', Photo.clipped_fraction, 'float64'),
+        ('quality_score', Photo.quality_score, 'float64')
+    ]
+}
+
+def columns_for(include: Sequence[str] = ()) -> List[tuple]:
+    unknown = set(include) - set(OPTIONAL_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown export column groups: {', '.join(sorted(unknown))}")
+    columns = list(COLUMNS)
+    for group in OPTIONAL_COLUMNS:
+        if group in include:
+            columns += OPTIONAL_COLUMNS[group]
+    return columns
+
+def iter_batches(columns: List[tuple], since: Optional[datetime] = None,
+                 batch_size: Optional[int] = None) -> Iterator[List[Dict]]:
+    """Yield lists of joined row dicts, EXPORT_BATCH_SIZE products at a time"""
+    batch_size = batch_size or Config.EXPORT_BATCH_SIZE
+    last_id = 0
+
+    while True:
+        session = db.get_session()
+        try:
+            id_query = session.query(Product.id).filter(Product.id > last_id)
+            if since:
+                # Page only through products with something new, so each batch is full
+                id_query = id_query.filter(or_(
+                    Product.created_at >= since,
+                    Product.id.in_(session.query(PDF.product_id).filter(PDF.created_at >= since)),
+                    Product.id.in_(session.query(Photo.product_id).filter(Photo.created_at >= since))
+                ))
+            ids = [product_id for (product_id,) in id_query.order_by(Product.id).limit(batch_size)]
+            if not ids:
+                return
+
+            query = session.query(*[column.label(name) for name, column, _ in columns]).select_from(Product).outerjoin(
+                PDF, PDF.product_id == Product.id
+            ).outerjoin(
+                Photo, Photo.pdf_id == PDF.id
+            ).filter(Product.id.in_(ids))
+            if since:
+                query = query.filter(or_(
+                    Product.created_at >= since, PDF.created_at >= since, Photo.created_at >= since
+                ))
+            rows = [dict(row._mapping) for row in query.order_by(Product.id, PDF.id, Photo.id)]
+        finally:
+            session.close()
+
+        last_id = ids[-1]
+        if rows:
+            yield rows
+
+def _jsonl_chunks(batches: Iterator[List[Dict]]) -> Iterator[bytes]:
+    for rows in batches:
+        yield ''.join(json.dumps(row, default=_json_default) + '\n' for row in rows).encode('utf-8')
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+class _ChunkSink:
+    """Write-only file object that hands what Parquet wrote back out in chunks"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def _parquet_chunks(batches: Iterator[List[Dict]], columns: List[tuple]) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {
+        'int32': pa.int32(), 'int64': pa.int64(), 'float64': pa.float64(),
+        'bool': pa.bool_(), 'string': pa.string(), 'timestamp': pa.timestamp('us')
+    }
+    schema = pa.schema([(name, types[kind]) for name, _, kind in columns])
+    sink = _ChunkSink()
+    # One row group per batch, written as soon as it is read
+    writer = pq.ParquetWriter(sink, schema, compression='zstd')
+    try:
+        for rows in batches:
+            writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+def export(fmt: str = 'jsonl', since: Optional[datetime] = None, include: Sequence[str] = (),
+           batch_size: Optional[int] = None) -> Iterator[bytes]:
+    """Encoded export in chunks, one per batch of products"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if fmt == 'parquet':
+        # Checked up front so a streamed response fails before any bytes are sent
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+    columns = columns_for(include)
+    batches = iter_batches(columns, since, batch_size)
+    if fmt == 'parquet':
+        return _parquet_chunks(batches, columns)
+    return _jsonl_chunks(batches)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', required=True, help="Output file, or '-' for stdout")
+    parser.add_argument('--format', choices=FORMATS, help='Default: from the output extension, else jsonl')
+    parser.add_argument('--since', type=datetime.fromisoformat, help='Only rows created at or after this (ISO date/time, UTC)')
+    parser.add_argument('--include', nargs='+', choices=sorted(OPTIONAL_COLUMNS), default=[], help='Optional column groups')
+    parser.add_argument('--batch-size', type=int, help='Products per batch')
+    args = parser.parse_args()
+
+    fmt = args.format or ('parquet' if args.output.endswith('.parquet') else 'jsonl')
+    start = time.time()
+    written = 0
+    out = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+    try:
+        for chunk in export(fmt, args.since, args.include, args.batch_size):
+            out.write(chunk)
+            written += len(chunk)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+    print(f"Exported {written / 1024 / 1024:.1f} MB of {fmt} in {time.time() - start:.1f}s", file=sys.stderr)
@@ -0,0 +1,185 @@
+import json
+import logging
+import os
+import sys
+import time
+from logging.handlers import RotatingFileHandler
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import structlog
+
+from .config import Config
+
+COMPONENTS = ('scraper', 'web')
+
+LEVELS = {'debug': 10, 'info': 20, 'warning': 30, 'error': 40, 'critical': 50}
+
+# Upper bound on bytes read per request when tailing forward from an offset
+MAX_READ_BYTES = 1024 * 1024
+
+def configure_logging(component: str):
+    """Send structlog JSON lines to stdout and to a rotating file under LOG_DIR"""
+    os.makedirs(Config.LOG_DIR, exist_ok=True)
+
+    formatter = logging.Formatter('%(message)s')
+    file_handler = RotatingFileHandler(log_path(component), maxBytes=Config.LOG_FILE_MAX_BYTES,
+                                       backupCount=Config.LOG_FILE_BACKUPS, encoding='utf-8')
+    stream_handler = logging.StreamHandler(sys.stdout)
+
+    root = logging.getLogger()
+    root.setLevel(Config.LOG_LEVEL.upper())
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+        root.addHandler(handler)
+
+    structlog.configure(
+        processors=[
+            structlog.stdlib.filter_by_level,
+            structlog.stdlib.add_logger_name,
+            structlog.stdlib.add_log_level,
+            structlog.stdlib.PositionalArgumentsFormatter(),
+            structlog.processors.TimeStamper(fmt="iso"),
+            structlog.processors.StackInfoRenderer(),
+            structlog.processors.format_exc_info,
+            structlog.processors.UnicodeDecoder(),
+            structlog.processors.JSONRenderer()
+        ],
+        context_class=dict,
+        logger_factory=structlog.stdlib.LoggerFactory(),
+        cache_logger_on_first_use=True,
+    )
+
+def log_path(component: str) -> str:
+    if component not in COMPONENTS:
+        raise ValueError(f"Unknown log component: {component}")
+    return os.path.join(Config.LOG_DIR, f"{component}.log")
+
+def parse_line(line: str) -> Dict:
+    try:
+        entry = json.loads(line)
+        if isinstance(entry, dict):
+            return entry
+    except ValueError:
+        pass
+    return {'event': line, 'level': 'info'}
+
+def format_entry(entry: Dict) -> str:
+    return f"{entry.get('timestamp', '')} [{entry.get('level', 'info'):<7}] {entry.get('event', '')}".strip()
+
+class LogFilter:
+    """Server-side filter: minimum level and/or an FCC ID mentioned in the entry"""
+
+    def __init__(self, level: Optional[str] = None, fcc_id: Optional[str] = None):
+        self.min_level = LEVELS.get((level or '').lower(), 0)
+        self.fcc_id = (fcc_id or '').strip().upper()
+
+    @property
+    def active(self) -> bool:
+        return bool(self.min_level or self.fcc_id)
+
+    def __call__(self, entry: Dict) -> bool:
+        if LEVELS.get(str(entry.get('level', 'info')).lower(), 20) < self.min_level:
+            return False
+        if self.fcc_id:
+            fields = (str(entry.get('fcc_id', '')), str(entry.get('event', '')))
+            return any(self.fcc_id in field.upper() for field in fields)
+        return True
+
+def read_logs(component: str, offset: Optional[int] = None, file_id: Optional[int] = None,
+              lines: int = 100, log_filter: Optional[LogFilter] = None) -> Tuple[List[Dict], int, int]:
+    """Read log entries and return them with the (file_id, offset) to resume from.
+
+    Without an offset the last `lines` matching entries are returned. With one,
+    entries written since that byte offset are returned (up to MAX_READ_BYTES;
+    a single line longer than that comes back truncated, the rest following
+    as further entries).
+    file_id is the log file's inode; when it no longer matches (or the file is
+    shorter than the offset) the file was rotated and reading restarts at 0.
+    """
+    log_filter = log_filter or LogFilter()
+    path = log_path(component)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return [], 0, 0
+
+    with open(path, 'rb') as f:
+        if offset is None:
+            entries, end = _tail(f, stat.st_size, lines, log_filter)
+            return entries, stat.st_ino, end
+
+        if (file_id is not None and file_id != stat.st_ino) or offset > stat.st_size:
+            offset = 0
+
+        f.seek(offset)
+        data = f.read(min(stat.st_size - offset, MAX_READ_BYTES))
+        end = data.rfind(b'\n') + 1  # only hand out complete lines
+        if end == 0 and len(data) == MAX_READ_BYTES:
+            end = len(data)  # a line longer than a whole read would never complete; hand it out in pieces
+        entries = [parse_line(line) for line in data[:end].decode('utf-8', errors='replace').splitlines() if line]
+        return [entry for entry in entries if log_filter(entry)], stat.st_ino, offset + end
+
+def _tail(f, size: int, lines: int, log_filter: LogFilter, block_size: int = 65536) -> Tuple[List[Dict], int]:
+    """Read backwards in blocks until `lines` matching entries are found.
+
+    Returns the entries and the offset just past the last complete line, so a
+    line still being written is picked up by the next forward read.
+    """
+    matched = []
+    position = size
+    remainder = b''
+    end = None
+    while position > 0 and len(matched) < lines:
+        read_size = min(block_size, position)
+        position -= read_size
+        f.seek(position)
+        chunk = f.read(read_size) + remainder
+        parts = chunk.split(b'\n')
+        if end is None:
+            end = size - len(parts.pop())
+        # The first part may be the tail of an earlier line; keep it for the next block
+        remainder = parts.pop(0) if position > 0 else b''
+        for raw in reversed(parts):
+            if raw.strip():
+                entry = parse_line(raw.decode('utf-8', errors='replace'))
+                if log_filter(entry):
+                    matched.append(entry)
+                    if len(matched) == lines:
+                        break
+    matched.reverse()
+    return matched, size if end is None else end
+
+def follow_logs(component: str, offset: Optional[int] = None, file_id: Optional[int] = None,
+                log_filter: Optional[LogFilter] = None, poll_interval: float = 1.0,
+                heartbeat: float = 15.0) -> Iterator[Tuple[List[Dict], int, int]]:
+    """Yield batches of new entries as they are written; an empty batch is a heartbeat"""
+    if offset is None:
+        try:
+            stat = os.stat(log_path(component))
+            file_id, offset = stat.st_ino, stat.st_size
+        except FileNotFoundError:
+            file_id, offset = 0, 0
+
+    idle_since = time.monotonic()
+    while True:
+        entries, file_id, offset = read_logs(component, offset, file_id, log_filter=log_filter)
+        if entries:
+            idle_since = time.monotonic()
+            yield entries, file_id, offset
+            continue
+        if time.monotonic() - idle_since >= heartbeat:
+            idle_since = time.monotonic()
+            yield [], file_id, offset
+        time.sleep(poll_interval)
+
+def log_files() -> List[Dict]:
+    """Current and rotated log files with their sizes, for status pages"""
+    files = []
+    if not os.path.isdir(Config.LOG_DIR):
+        return files
+    for name in sorted(os.listdir(Config.LOG_DIR)):
+        path = os.path.join(Config.LOG_DIR, name)
+        if '.log' in name and os.path.isfile(path):
+            stat = os.stat(path)
+            files.append({'name': name, 'size': stat.st_size, 'modified': stat.st_mtime})
+    return files
@@ -1,34 +1,30 @@
 #!/usr/bin/env python3
 
+import argparse
 import structlog
 import sys
 from datetime import datetime
 
+from . import metrics
 from .config import Config
 from .database.database import db
+from .logs import configure_logging
 from .scraper.fcc_scraper import FCCScraper
+from .pdf_processor.classifier import PCBClassifier
 from .pdf_processor.pdf_processor import PDFProcessor
-
-structlog.configure(
-    processors=[
-        structlog.stdlib.filter_by_level,
-        structlog.stdlib.add_logger_name,
-        structlog.stdlib.add_log_level,
-        structlog.stdlib.PositionalArgumentsFormatter(),
-        structlog.processors.TimeStamper(fmt="iso"),
-        structlog.processors.StackInfoRenderer(),
-        structlog.processors.format_exc_info,
-        structlog.processors.UnicodeDecoder(),
-        structlog.processors.JSONRenderer()
-    ],
-    context_class=dict,
-    logger_factory=structlog.stdlib.LoggerFactory(),
-    cache_logger_on_first_use=True,
-)
+from .pdf_processor.retention import Reclaimer, reclaim
 
 logger = structlog.get_logger()
 
 def main():
+    parser = argparse.ArgumentParser(description='Scrape recent FCC filings and extract internal photos')
+    parser.add_argument('--profile', action='store_true',
+                        help='Record per-phase extraction timings and keep profiles of the slowest PDFs')
+    args = parser.parse_args()
+    if args.profile:
+        Config.PROFILE_EXTRACTION = True
+    
+    configure_logging('scraper')
     logger.info("Starting ESPFinder")
     
     Config.ensure_dirs()
@@ -36,64 +32,73 @@ def main():
     db.create_tables()
     logger.info("Database initialized")
     
+    if Config.METRICS_PORT:
+        metrics.start_metrics_server(Config.METRICS_PORT)
+    
     scraper = FCCScraper()
     processor = PDFProcessor()
     
-    max_retries = 3
-    retry_count = 0
+    if Config.PDF_DISK_BUDGET_MB > 0:
+        Reclaimer().start()
     
-    while retry_count < max_retries:
-        try:
-            logger.info(f"Searching for recent FCC filings (attempt {retry_count + 1}/{max_retries})...")
-            filings = scraper.search_recent_filings(days_back=7)
+    # Failures are retried per FCC ID / per PDF with backoff on later runs,
+    # so a single pass never re-fetches items that are still backing off.
+    success = False
+    try:
+        logger.info("Searching for recent FCC filings...")
+        filings = scraper.search_recent_filings(days_back=7)
+        
+        if not filings:
+            logger.warning("No filings found. FCC website may be unavailable.")
+        
+        seen = {filing['fcc_id'] for filing in filings}
+        retries = [filing for filing in scraper.get_due_filing_retries() if filing['fcc_id'] not in seen]
+        if retries:
+            logger.info(f"Retrying {len(retries)} previously failed filings")
+            filings.extend(retries)
+        
+        backed_off = scraper.get_backed_off_fcc_ids()
+        
+        logger.info(f"Found {len(filings)} filings to process")
+        
+        for filing in filings:
+            if filing['fcc_id'] in backed_off:
+                logger.info(f"Skipping filing {filing['fcc_id']}: backing off after earlier failures")
+                continue
             
-            if not filings:
-                logger.warning("No filings found. FCC website may be unavailable.")
-                if retry_count < max_retries - 1:
-                    import time
-                    wait_time = (retry_count + 1) * 60  # Wait 1, 2, 3 minutes
-                    logger.info(f"Waiting {wait_time} seconds before retry...")
-                    time.sleep(wait_time)
-                    retry_count += 1
-                    continue
-                else:
-                    logger.error("Max retries reached. Exiting.")
-                    break
+            logger.info(f"Processing filing: {filing['fcc_id']}")
             
-            logger.info(f"Found {len(filings)} filings to process")
-            
-            for filing in filings:
-                logger.info(f"Processing filing: {filing['fcc_id']}")
+            details = scraper.get_filing_details(filing['fcc_id'], filing)
+            if details and details.get('pdfs'):
+                filing.update(details)
+                product = scraper.save_to_database(filing)
                 
-                details = scraper.get_filing_details(filing['fcc_id'])
-                if details and details.get('pdfs'):
-                    filing.update(details)
-                    product = scraper.save_to_database(filing)
+                if product:
+                    logger.info(f"Saved product {product.fcc_id}, processing PDFs...")
                     
-                    if product:
-                        logger.info(f"Saved product {product.fcc_id}, processing PDFs...")
-                        
-            logger.info("Processing unprocessed PDFs...")
-            processed_count = processor.process_unprocessed_pdfs()
-            logger.info(f"Processed {processed_count} PDFs")
-            
-            logger.info("ESPFinder completed successfully")
-            break  # Success, exit retry loop
-            
-        except KeyboardInterrupt:
-            logger.info("Interrupted by user")
-            sys.exit(0)
-        except Exception as e:
-            logger.error(f"Unexpected error: {e}")
-            retry_count += 1
-            if retry_count < max_retries:
-                import time
-                wait_time = retry_count * 30  # Wait 30, 60 seconds
-                logger.info(f"Retrying in {wait_time} seconds...")
-                time.sleep(wait_time)
-            else:
-                logger.error("Max retries reached. Exiting gracefully.")
-                sys.exit(1)
+        logger.info("Processing unprocessed PDFs...")
+        processed_count = processor.process_unprocessed_pdfs()
+        logger.info(f"Processed {processed_count} PDFs")
+        
+        classifier = PCBClassifier()
+        try:
+            classifier.classify_photos()
+        finally:
+            classifier.close()
+        
+        reclaim()
+        
+        logger.info("ESPFinder completed successfully")
+        success = True
+        
+    except KeyboardInterrupt:
+        logger.info("Interrupted by user")
+        sys.exit(0)
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        sys.exit(1)
+    finally:
+        metrics.publish_run(success, Config.METRICS_TEXTFILE, Config.METRICS_PUSHGATEWAY)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
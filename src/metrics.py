@@ -0,0 +1,122 @@
+import os
+import time
+from urllib.parse import urlparse
+
+import structlog
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram, push_to_gateway, start_http_server, write_to_textfile
+from sqlalchemy import event
+
+logger = structlog.get_logger()
+
+NETWORK_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    'espfinder_http_request_seconds', 'FCC HTTP request latency', ['page_type', 'status'],
+    buckets=NETWORK_BUCKETS
+)
+HTTP_RESPONSE_BYTES = Counter(
+    'espfinder_http_response_bytes_total', 'Bytes downloaded from the FCC site', ['page_type']
+)
+SELENIUM_PAGE_LOAD_SECONDS = Histogram(
+    'espfinder_selenium_page_load_seconds', 'Selenium navigation time, including the wait for the page', ['page_type', 'status'],
+    buckets=NETWORK_BUCKETS
+)
+
+PDFS_EXTRACTED = Counter('espfinder_pdfs_extracted_total', 'PDFs whose images were extracted')
+PDF_FAILURES = Counter('espfinder_pdf_failures_total', 'Failed PDF download/extraction attempts', ['stage'])
+PDF_PROBES = Counter(
+    'espfinder_pdf_probes_total', 'Pre-download probe outcomes (ok, not_pdf, over_budget, too_many_pages)', ['outcome']
+)
+IMAGES = Counter(
+    'espfinder_images_total', 'Embedded images seen during extraction, by outcome '
+    '(kept, rejected by size/aspect checks, low_quality, unsupported colorspace, error)', ['outcome']
+)
+PDF_PAGES = Counter(
+    'espfinder_pdf_pages_total', 'PDF pages seen during extraction: extracted, or the page filter\'s skip reason '
+    '(no_images, small_images, text_page)', ['outcome']
+)
+IMAGE_EXTRACTION_SECONDS = Histogram(
+    'espfinder_image_extraction_seconds', 'Time to extract, write and record one embedded image',
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+
+SCRAPER_LAST_RUN = Gauge(
+    'espfinder_scraper_last_run_timestamp_seconds', 'When the last scraper run finished, by result', ['result']
+)
+
+UNPROCESSED_PDFS = Gauge('espfinder_unprocessed_pdfs', 'PDFs waiting to be processed (excluding dead letters and deferred PDFs)')
+DB_COMMIT_SECONDS = Histogram(
+    'espfinder_db_commit_seconds', 'Session commit latency, including the flush',
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+
+def page_type(url: str) -> str:
+    """Coarse FCC URL category used as a metric label"""
+    path = urlparse(url).path
+    if path.endswith('GenericSearch.cfm'):
+        return 'search'
+    if path.endswith('ViewExhibitReport.cfm'):
+        return 'exhibits'
+    if 'Attachment' in path or path.lower().endswith('.pdf'):
+        return 'pdf'
+    return 'other'
+
+def instrument_sessions(session_factory):
+    """Time every commit made through sessions from the given sessionmaker"""
+
+    @event.listens_for(session_factory, 'before_commit')
+    def _before_commit(session):
+        session.info['commit_started'] = time.perf_counter()
+
+    @event.listens_for(session_factory, 'after_commit')
+    def _after_commit(session):
+        started = session.info.pop('commit_started', None)
+        if started is not None:
+            DB_COMMIT_SECONDS.observe(time.perf_counter() - started)
+
+    @event.listens_for(session_factory, 'after_rollback')
+    def _after_rollback(session):
+        session.info.pop('commit_started', None)
+
+def _count_unprocessed_pdfs() -> float:
+    from .database.database import db
+    from .database.models import PDF
+
+    session = db.get_session()
+    try:
+        return session.query(PDF).filter(PDF.processed == False, PDF.dead_letter == False, PDF.deferred == False).count()
+    except Exception as e:
+        logger.warning(f"Could not count unprocessed PDFs for metrics: {e}")
+        return float('nan')
+    finally:
+        session.close()
+
+def track_queue_depth():
+    """Report the unprocessed PDF count, queried on each scrape"""
+    UNPROCESSED_PDFS.set_function(_count_unprocessed_pdfs)
+
+def start_metrics_server(port: int):
+    """Serve /metrics from a background thread (used by the scraper process)"""
+    track_queue_depth()
+    start_http_server(port)
+    logger.info(f"Metrics available on port {port}")
+
+def publish_run(success: bool, textfile: str = '', gateway: str = ''):
+    """Keep a finished run's metrics after the scraper process exits.
+
+    The scraper runs once and exits, so its METRICS_PORT endpoint is only up
+    during a run. The final values are written to a textfile (atomically) and
+    optionally pushed to a Pushgateway.
+    """
+    SCRAPER_LAST_RUN.labels('success' if success else 'failure').set_to_current_time()
+    if textfile:
+        try:
+            os.makedirs(os.path.dirname(textfile) or '.', exist_ok=True)
+            write_to_textfile(textfile, REGISTRY)
+        except OSError as e:
+            logger.warning(f"Could not write metrics to {textfile}: {e}")
+    if gateway:
+        try:
+            push_to_gateway(gateway, job='espfinder_scraper', registry=REGISTRY)
+        except Exception as e:
+            logger.warning(f"Could not push metrics to {gateway}: {e}")
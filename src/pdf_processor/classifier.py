@@ -0,0 +1,186 @@
+"""CPU-only PCB photo classifier that fills Photo.is_pcb_photo and Photo.pcb_score.
+
+    python -m src.pdf_processor.classifier [--reclassify] [--batch-size 256] [--workers 8]
+
+Photos are decoded in parallel (OpenCV releases the GIL), downscaled and
+stacked into one uint8 array per batch. Every feature is then computed for
+the whole batch at once:
+
+  mask      fraction of saturated green/blue pixels (solder mask)
+  dominance share of the most common hue among saturated pixels
+  edges     Canny edge density (traces, pads, silkscreen)
+  blobs     small connected components off the solder mask (parts, vias, pads)
+  white     fraction of bright, unsaturated pixels (labels, paper, bare enclosures)
+
+A logistic over these features gives a 0-1 confidence. Photos at or above
+PCB_THRESHOLD are marked as PCB photos. The weights were hand-tuned on
+internal-photo exhibits and are not a trained model.
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+import structlog
+
+from ..config import Config
+from ..database.database import db
+from ..database.models import Photo
+from ..storage.images import ImageStorage
+
+logger = structlog.get_logger()
+
+SIZE = 128
+# OpenCV hue is 0-179
+GREEN_HUES = (35, 85)
+BLUE_HUES = (90, 130)
+MIN_SATURATION = 60
+MIN_VALUE = 40
+BLOB_AREA = (3, 120)  # component-sized at SIZE x SIZE
+
+FEATURES = ('mask', 'dominance', 'edges', 'blobs', 'white')
+WEIGHTS = np.array([5.0, 1.5, 12.0, 2.5, -4.0], dtype=np.float32)
+BIAS = -4.5
+
+def decode(data: bytes) -> Optional[np.ndarray]:
+    """Decode image bytes to a SIZE x SIZE BGR array, or None if unreadable"""
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        return None
+    return cv2.resize(img, (SIZE, SIZE), interpolation=cv2.INTER_AREA)
+
+def features(batch: np.ndarray) -> np.ndarray:
+    """(N, len(FEATURES)) feature matrix for an (N, SIZE, SIZE, 3) BGR batch"""
+    n = len(batch)
+    # OpenCV works on 2-D images, so the batch is processed as one tall image
+    tall = batch.reshape(n * SIZE, SIZE, 3)
+    hsv = cv2.cvtColor(tall, cv2.COLOR_BGR2HSV).reshape(n, SIZE, SIZE, 3)
+    hue, sat, val = hsv[..., 0], hsv[..., 1], hsv[..., 2]
+
+    saturated = (sat >= MIN_SATURATION) & (val >= MIN_VALUE)
+    green = saturated & (hue >= GREEN_HUES[0]) & (hue <= GREEN_HUES[1])
+    blue = saturated & (hue >= BLUE_HUES[0]) & (hue <= BLUE_HUES[1])
+    mask = green | blue
+    mask_fraction = mask.mean(axis=(1, 2))
+
+    # Per-image hue histograms in one bincount: offset each image's bins by 18 * index
+    bins = (hue // 10).astype(np.int64) + (np.arange(n) * 18)[:, None, None]
+    histogram = np.bincount(bins[saturated], minlength=n * 18).reshape(n, 18)
+    dominance = histogram.max(axis=1) / np.maximum(histogram.sum(axis=1), 1)
+
+    gray = cv2.cvtColor(tall, cv2.COLOR_BGR2GRAY)
+    edges = cv2.Canny(gray, 80, 160).reshape(n, SIZE, SIZE)
+    # Ignore edges along the seams between stacked images
+    edge_density = (edges[:, 2:-2, :] > 0).mean(axis=(1, 2))
+
+    white = ((sat < 40) & (val > 200)).mean(axis=(1, 2))
+
+    return np.stack([mask_fraction, dominance, edge_density, _blob_density(mask), white], axis=1).astype(np.float32)
+
+def _blob_density(mask: np.ndarray) -> np.ndarray:
+    """Small off-mask components next to solder mask, per 100 mask pixels"""
+    n = len(mask)
+    # A blank row after each image keeps components from joining across the seam
+    padded = np.zeros((n, SIZE + 1, SIZE), dtype=np.uint8)
+    padded[:, :SIZE] = ~mask & cv2.dilate(mask.astype(np.uint8).reshape(n * SIZE, SIZE),
+                                          np.ones((5, 5), np.uint8)).reshape(n, SIZE, SIZE).astype(bool)
+    _, _, stats, centroids = cv2.connectedComponentsWithStats(padded.reshape(n * (SIZE + 1), SIZE), connectivity=8)
+    areas = stats[1:, cv2.CC_STAT_AREA]
+    owners = (centroids[1:, 1] // (SIZE + 1)).astype(np.int64)
+    small = (areas >= BLOB_AREA[0]) & (areas <= BLOB_AREA[1])
+    blobs = np.bincount(owners[small], minlength=n)
+    return blobs * 100 / np.maximum(mask.sum(axis=(1, 2)), 1)
+
+def score(feature_matrix: np.ndarray) -> np.ndarray:
+    """PCB confidence in [0, 1] per row"""
+    clipped = np.minimum(feature_matrix, [1.0, 1.0, 0.3, 1.0, 1.0])
+    return 1.0 / (1.0 + np.exp(-(clipped @ WEIGHTS + BIAS)))
+
+class PCBClassifier:
+    def __init__(self, threshold: Optional[float] = None, workers: Optional[int] = None):
+        self.threshold = Config.PCB_THRESHOLD if threshold is None else threshold
+        self.workers = workers or Config.CLASSIFY_WORKERS
+        self.storage = ImageStorage()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers)
+
+    def _load(self, local_path: str) -> Optional[np.ndarray]:
+        data = self.storage.read(local_path)
+        return decode(data) if data else None
+
+    def classify(self, local_paths: List[str]) -> List[Optional[float]]:
+        """Confidence per path; None for images that are missing or cannot be decoded"""
+        images = list(self._pool.map(self._load, local_paths))
+        present = [i for i, img in enumerate(images) if img is not None]
+        scores: List[Optional[float]] = [None] * len(local_paths)
+        if present:
+            batch = np.stack([images[i] for i in present])
+            for i, value in zip(present, score(features(batch))):
+                scores[i] = float(value)
+        return scores
+
+    def classify_photos(self, reclassify: bool = False, batch_size: Optional[int] = None) -> Dict[str, int]:
+        """Score photos in id-keyset batches and record is_pcb_photo and pcb_score"""
+        batch_size = batch_size or Config.CLASSIFY_BATCH_SIZE
+        stats = {'photos': 0, 'pcb': 0, 'unreadable': 0}
+        last_id = 0
+        while True:
+            session = db.get_session()
+            try:
+                query = session.query(Photo.id, Photo.local_path).filter(Photo.id > last_id)
+                if not reclassify:
+                    query = query.filter(Photo.pcb_score == None)
+                rows = query.order_by(Photo.id).limit(batch_size).all()
+            finally:
+                session.close()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            scores = self.classify([local_path for _, local_path in rows])
+            updates = [{'id': photo_id, 'pcb_score': value, 'is_pcb_photo': value >= self.threshold}
+                       for (photo_id, _), value in zip(rows, scores) if value is not None]
+
+            session = db.get_session()
+            try:
+                if updates:
+                    session.bulk_update_mappings(Photo, updates)
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                session.close()
+
+            stats['photos'] += len(updates)
+            stats['pcb'] += sum(1 for update in updates if update['is_pcb_photo'])
+            stats['unreadable'] += len(rows) - len(updates)
+
+        if stats['photos']:
+            logger.info(f"Classified {stats['photos']} photos: {stats['pcb']} PCB, "
+                        f"{stats['unreadable']} unreadable")
+        return stats
+
+    def close(self):
+        self._pool.shutdown()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reclassify', action='store_true', help='Re-score photos that already have a score')
+    parser.add_argument('--batch-size', type=int, default=Config.CLASSIFY_BATCH_SIZE, help='Photos per batch')
+    parser.add_argument('--workers', type=int, default=Config.CLASSIFY_WORKERS, help='Decoder threads')
+    parser.add_argument('--threshold', type=float, default=Config.PCB_THRESHOLD, help='Minimum score for a PCB photo')
+    args = parser.parse_args()
+
+    db.create_tables()
+    classifier = PCBClassifier(args.threshold, args.workers)
+    start = time.time()
+    try:
+        stats = classifier.classify_photos(args.reclassify, args.batch_size)
+    finally:
+        classifier.close()
+    elapsed = time.time() - start
+    print(f"Classified {stats['photos']} photos ({stats['pcb']} PCB, {stats['unreadable']} unreadable) "
+          f"in {elapsed:.1f}s ({stats['photos'] / max(elapsed, 1e-9) * 60:.0f}/min)")
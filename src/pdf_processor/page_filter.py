@@ -0,0 +1,48 @@
+"""Cheap per-page pre-pass that decides which exhibit pages are worth extracting.
+
+Test-report style exhibits are mostly text pages with small logos. Decoding
+their images only to reject them dominates extraction time. Before any
+pixmap is created, a page is skipped when:
+
+  no_images     it has no images at all
+  small_images  none of its images could pass the size/aspect checks
+  text_page     its usable images cover less than PAGE_MIN_IMAGE_COVERAGE of the page
+                and it carries at least PAGE_TEXT_CHARS characters of text
+
+The first two are exact, since those images would be rejected anyway. Only
+text_page is a heuristic, and PAGE_FILTER=false turns it off.
+"""
+
+from typing import Callable, List, Optional, Tuple
+
+import fitz
+
+from ..config import Config
+
+SKIP_REASONS = ('no_images', 'small_images', 'text_page')
+
+def image_coverage(page: fitz.Page, is_valid_size: Callable[[int, int], bool]) -> float:
+    """Share of the page area covered by images whose native size passes is_valid_size"""
+    page_rect = page.rect
+    page_area = abs(page_rect) or 1.0
+    covered = 0.0
+    # Without hashes/xrefs this only walks the display list; no image is decoded
+    for info in page.get_image_info():
+        if is_valid_size(info['width'], info['height']):
+            covered += abs(fitz.Rect(info['bbox']) & page_rect)
+    return min(1.0, covered / page_area)
+
+def select_images(page: fitz.Page, images: List[tuple],
+                  is_valid_size: Callable[[int, int], bool]) -> Tuple[List[Tuple[int, tuple]], Optional[str]]:
+    """([(index, image)] worth extracting, skip reason or None) for one page's get_images() list"""
+    if not images:
+        return [], 'no_images'
+    # get_images() entries are (xref, smask, width, height, ...)
+    candidates = [(index, img) for index, img in enumerate(images) if is_valid_size(img[2], img[3])]
+    if not candidates:
+        return [], 'small_images'
+
+    if Config.PAGE_FILTER and image_coverage(page, is_valid_size) < Config.PAGE_MIN_IMAGE_COVERAGE:
+        if len(page.get_text('text').strip()) >= Config.PAGE_TEXT_CHARS:
+            return [], 'text_page'
+    return candidates, None
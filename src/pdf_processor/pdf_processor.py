@@ -1,20 +1,35 @@
+import gzip
+import hashlib
+import io
+import json
 import os
-import requests
 import fitz
+import tempfile
 import time
+from contextlib import contextmanager
+from datetime import datetime
 from PIL import Image
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterator, Union
 import structlog
+from sqlalchemy import or_
+from sqlalchemy.orm import joinedload
 
+from .. import metrics, retry, similarity
 from ..config import Config
 from ..database.database import db
 from ..database.models import PDF, Photo
+from ..scraper.throttle import ThrottledSession, CircuitOpenError
+from ..storage.images import ImageStorage
+from . import page_filter, probe, quality, retention
+from .profiling import get_profiler
 
 logger = structlog.get_logger()
 
 class PDFProcessor:
     def __init__(self):
-        self.session = requests.Session()
+        self.profiler = get_profiler()
+        self.store = ImageStorage()
+        self.session = ThrottledSession()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
@@ -24,6 +39,9 @@ class PDFProcessor:
             return True
             
         try:
+            if Config.PROBE_DOWNLOADS and pdf.probed_at is None and not probe.check(self.session, pdf):
+                return False
+            
             response = self.session.get(pdf.url, timeout=60)
             response.raise_for_status()
             
@@ -36,44 +54,155 @@ class PDFProcessor:
             with open(local_path, 'wb') as f:
                 f.write(response.content)
             
-            session = db.get_session()
-            try:
-                pdf.local_path = local_path
-                pdf.downloaded = True
-                pdf.file_size = len(response.content)
-                session.commit()
-                
-                logger.info(f"Downloaded PDF: {pdf.filename} ({pdf.file_size} bytes)")
-                return True
-                
-            except Exception as e:
-                session.rollback()
-                logger.error(f"Error updating PDF record: {e}")
+            sha256 = hashlib.sha256(response.content).hexdigest()
+            if not self._record_download(pdf, {
+                'local_path': local_path,
+                'downloaded': True,
+                'file_size': len(response.content),
+                'stored_size': len(response.content),
+                'sha256': sha256
+            }):
                 return False
-            finally:
-                session.close()
-                
-            time.sleep(Config.DOWNLOAD_DELAY)
+            logger.info(f"Downloaded PDF: {pdf.filename} ({pdf.file_size} bytes)")
+            return True
+            
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            logger.error(f"Error downloading PDF {pdf.filename}: {e}")
+            metrics.PDF_FAILURES.labels('download').inc()
+            self._record_failure(pdf, e)
+            return False
+    
+    @contextmanager
+    def fetch_pdf(self, pdf: PDF) -> Iterator[Union[bytearray, str, None]]:
+        """Download a PDF without keeping it, for extract_images_from_pdf(pdf, source).
+        
+        Yields the PDF's bytes, or the path of a temporary file for PDFs over
+        PDF_STREAM_MAX_MB (removed on exit), or None if it wasn't fetched.
+        Only the size and SHA-256 are recorded; the row stays downloaded=False,
+        as after PDF_RETENTION=delete, so it is fetched again to re-extract.
+        """
+        spill_path = None
+        try:
+            source = self._fetch(pdf)
+            if isinstance(source, str):
+                spill_path = source
+            yield source
+        finally:
+            if spill_path:
+                os.remove(spill_path)
+    
+    def _fetch(self, pdf: PDF) -> Union[bytearray, str, None]:
+        spill = None
+        try:
+            if Config.PROBE_DOWNLOADS and pdf.probed_at is None and not probe.check(self.session, pdf):
+                return None
+            
+            response = self.session.get(pdf.url, timeout=60, stream=True)
+            response.raise_for_status()
+            
+            limit = Config.PDF_STREAM_MAX_MB * 1024 * 1024
+            digest = hashlib.sha256()
+            buffer = bytearray()
+            size = 0
+            for chunk in response.iter_content(chunk_size=1024 * 1024):
+                digest.update(chunk)
+                size += len(chunk)
+                if spill is None and size > limit:
+                    spill = tempfile.NamedTemporaryFile(suffix='.pdf', delete=False)
+                    spill.write(buffer)
+                    buffer = None
+                if spill is not None:
+                    spill.write(chunk)
+                else:
+                    buffer.extend(chunk)
+            metrics.HTTP_RESPONSE_BYTES.labels('pdf').inc(size)
+            if spill is not None:
+                spill.close()
+            
+            if not self._record_download(pdf, {'file_size': size, 'sha256': digest.hexdigest()}):
+                raise RuntimeError('could not record the download')
+            logger.info(f"Fetched PDF: {pdf.filename} ({size} bytes{', spilled to disk' if spill else ''})")
+            return spill.name if spill is not None else buffer
             
+        except CircuitOpenError:
+            raise
         except Exception as e:
+            if spill is not None:
+                spill.close()
+                os.remove(spill.name)
             logger.error(f"Error downloading PDF {pdf.filename}: {e}")
+            metrics.PDF_FAILURES.labels('download').inc()
+            self._record_failure(pdf, e)
+            return None
+    
+    def _record_download(self, pdf: PDF, values: Dict) -> bool:
+        if pdf.sha256 and pdf.sha256 != values['sha256']:
+            logger.warning(f"Re-fetched PDF {pdf.filename} differs from the copy first downloaded")
+        
+        session = db.get_session()
+        try:
+            session.query(PDF).filter_by(id=pdf.id).update(values)
+            session.commit()
+            for key, value in values.items():
+                setattr(pdf, key, value)
+            return True
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error updating PDF record: {e}")
             return False
+        finally:
+            session.close()
+    
+    def _stream_pdfs(self) -> bool:
+        """Whether source PDFs are extracted from memory instead of being saved first"""
+        return Config.PDF_STREAM == 'on' or (Config.PDF_STREAM == 'auto' and Config.PDF_RETENTION == 'delete')
     
-    def extract_images_from_pdf(self, pdf: PDF) -> List[Photo]:
+    def extract_images_from_pdf(self, pdf: PDF, source: Union[bytearray, str, None] = None) -> List[Photo]:
+        """Extract from source (bytes or a file path from fetch_pdf) or else the downloaded copy"""
+        if source is not None:
+            with self.profiler.document(pdf):
+                return self._extract_images(pdf, source)
+        
         if not pdf.local_path or not os.path.exists(pdf.local_path):
             logger.error(f"PDF file not found: {pdf.local_path}")
+            metrics.PDF_FAILURES.labels('extract').inc()
+            self._record_failure(pdf, FileNotFoundError(pdf.local_path))
             return []
         
+        with self.profiler.document(pdf):
+            return self._extract_images(pdf)
+    
+    def _extract_images(self, pdf: PDF, source: Union[bytearray, str, None] = None) -> List[Photo]:
+        profiler = self.profiler
         try:
-            doc = fitz.open(pdf.local_path)
+            if isinstance(source, (bytes, bytearray)):
+                doc = fitz.open(stream=source, filetype='pdf')
+            else:
+                doc = self._open_document(source or pdf.local_path)
+            page_count = len(doc)
             extracted_photos = []
+            skipped_pages = []
+            profiler.lap('open')
             
-            for page_num in range(len(doc)):
+            for page_num in range(page_count):
                 page = doc.load_page(page_num)
                 image_list = page.get_images()
+                candidates, skip_reason = page_filter.select_images(page, image_list, self._is_valid_size)
+                profiler.lap('page_scan')
+                metrics.PDF_PAGES.labels(skip_reason or 'extracted').inc()
+                if skip_reason:
+                    skipped_pages.append({'page': page_num + 1, 'reason': skip_reason})
+                    continue
+                # Images too small to pass _is_valid_image are never decoded
+                metrics.IMAGES.labels('rejected').inc(len(image_list) - len(candidates))
                 
-                for img_index, img in enumerate(image_list):
-                    photo = self._extract_image(doc, img, pdf, page_num, img_index)
+                for img_index, img in candidates:
+                    profiler.start_image(page_num, img_index, img[0])
+                    with metrics.IMAGE_EXTRACTION_SECONDS.time():
+                        photo = self._extract_image(doc, img, pdf, page_num, img_index)
+                    profiler.end_image()
                     if photo:
                         extracted_photos.append(photo)
             
@@ -81,84 +210,159 @@ class PDFProcessor:
             
             session = db.get_session()
             try:
-                pdf.processed = True
+                session.query(PDF).filter_by(id=pdf.id).update({
+                    'processed': True,
+                    'last_accessed_at': datetime.utcnow(),
+                    'page_count': page_count,
+                    'skipped_pages': json.dumps(skipped_pages)
+                })
                 session.commit()
-                logger.info(f"Extracted {len(extracted_photos)} images from {pdf.filename}")
+                pdf.processed = True
+                metrics.PDFS_EXTRACTED.inc()
+                logger.info(f"Extracted {len(extracted_photos)} images from {pdf.filename} "
+                            f"({len(skipped_pages)} of {page_count} pages skipped)")
             except Exception as e:
                 session.rollback()
                 logger.error(f"Error updating PDF processed status: {e}")
             finally:
                 session.close()
             
+            if pdf.processed:
+                try:
+                    retention.apply_retention(pdf)
+                except Exception as e:
+                    logger.error(f"Error applying retention to {pdf.filename}: {e}")
+            
             return extracted_photos
             
         except Exception as e:
             logger.error(f"Error extracting images from PDF {pdf.filename}: {e}")
+            metrics.PDF_FAILURES.labels('extract').inc()
+            self._record_failure(pdf, e)
             return []
     
+    def _open_document(self, path: str) -> fitz.Document:
+        if path.endswith('.gz'):  # compressed by the retention policy
+            with gzip.open(path, 'rb') as f:
+                return fitz.open(stream=f.read(), filetype='pdf')
+        return fitz.open(path)
+    
+    def _record_failure(self, pdf: PDF, error: Exception):
+        """Count a failed attempt and schedule the next one, or dead-letter the PDF"""
+        attempts = (pdf.attempts or 0) + 1
+        dead_letter = retry.is_exhausted(attempts)
+        values = {
+            'attempts': attempts,
+            'last_error': str(error)[:1000],
+            'next_attempt_at': None if dead_letter else retry.next_attempt_at(attempts),
+            'dead_letter': dead_letter
+        }
+        
+        session = db.get_session()
+        try:
+            session.query(PDF).filter_by(id=pdf.id).update(values)
+            session.commit()
+            for key, value in values.items():
+                setattr(pdf, key, value)
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error recording failure for PDF {pdf.filename}: {e}")
+            return
+        finally:
+            session.close()
+        
+        if dead_letter:
+            logger.warning(f"PDF {pdf.filename} moved to dead letter after {attempts} attempts: {error}")
+        else:
+            logger.info(f"PDF {pdf.filename} failed attempt {attempts}, next attempt at {values['next_attempt_at'].isoformat()}")
+    
     def _extract_image(self, doc: fitz.Document, img, pdf: PDF, page_num: int, img_index: int) -> Optional[Photo]:
         try:
+            profiler = self.profiler
             xref = img[0]
             pix = fitz.Pixmap(doc, xref)
+            profiler.lap('pixmap')
             
             if pix.n - pix.alpha < 4:  # Skip if not RGB/RGBA
                 img_data = pix.tobytes("png")
-                pix = None
-                
-                image_dir = os.path.join(Config.IMAGES_DIR, pdf.product.fcc_id)
-                os.makedirs(image_dir, exist_ok=True)
+                profiler.lap('png_encode')
                 
                 filename = f"page_{page_num+1}_img_{img_index+1}.png"
-                image_path = os.path.join(image_dir, filename)
-                
-                with open(image_path, "wb") as img_file:
-                    img_file.write(img_data)
                 
-                pil_img = Image.open(image_path)
+                pil_img = Image.open(io.BytesIO(img_data))
                 width, height = pil_img.size
-                file_size = os.path.getsize(image_path)
+                profiler.lap('pil_reopen')
                 
-                if self._is_valid_image(pil_img):
+                valid = self._is_valid_image(pil_img)
+                profiler.lap('validate')
+                if valid:
+                    # Scored and hashed from the raw pixmap samples, so the PNG is not decoded again
+                    gray = similarity.gray_from_pixmap(pix)
+                    scores = quality.score(gray)
+                    profiler.lap('quality')
+                    if not quality.is_acceptable(scores):
+                        metrics.IMAGES.labels('low_quality').inc()
+                        return None
+                    
+                    phash, dhash = similarity.hash_gray(gray)
+                    gray = pix = None
+                    profiler.lap('hash')
+                    
+                    # Rejected images are never written; kept ones go to the content-addressed store or a pack
+                    sha256, image_path = self.store.put(img_data)
+                    profiler.lap('write')
+                    
                     photo = Photo(
                         product_id=pdf.product_id,
                         pdf_id=pdf.id,
                         filename=filename,
                         local_path=image_path,
+                        sha256=sha256,
                         width=width,
                         height=height,
-                        file_size=file_size,
-                        page_number=page_num + 1
+                        file_size=len(img_data),
+                        page_number=page_num + 1,
+                        phash=phash,
+                        dhash=dhash,
+                        hashed_at=datetime.utcnow(),
+                        **scores
                     )
                     
                     session = db.get_session()
                     try:
                         session.add(photo)
                         session.commit()
+                        profiler.lap('db_commit')
+                        metrics.IMAGES.labels('kept').inc()
                         return photo
                     except Exception as e:
                         session.rollback()
                         logger.error(f"Error saving photo to database: {e}")
+                        metrics.IMAGES.labels('error').inc()
                         return None
                     finally:
                         session.close()
                 else:
-                    os.remove(image_path)
+                    metrics.IMAGES.labels('rejected').inc()
                     return None
             else:
                 if pix:
                     pix = None
+                metrics.IMAGES.labels('unsupported').inc()
                 return None
                 
         except Exception as e:
             logger.error(f"Error extracting image {img_index} from page {page_num}: {e}")
+            metrics.IMAGES.labels('error').inc()
             return None
     
     def _is_valid_image(self, img: Image.Image) -> bool:
+        return self._is_valid_size(*img.size)
+    
+    def _is_valid_size(self, width: int, height: int) -> bool:
         min_width, min_height = 100, 100
         max_width, max_height = 5000, 5000
         
-        width, height = img.size
-        
         if width < min_width or height < min_height:
             return False
         if width > max_width or height > max_height:
@@ -176,18 +380,53 @@ class PDFProcessor:
         return filename[:200]  # Limit filename length
     
     def process_unprocessed_pdfs(self) -> int:
-        session = db.get_session()
+        processed_count = 0
+        
         try:
-            unprocessed_pdfs = session.query(PDF).filter_by(processed=False).all()
-            processed_count = 0
-            
-            for pdf in unprocessed_pdfs:
-                if self.download_pdf(pdf):
-                    photos = self.extract_images_from_pdf(pdf)
+            stream = self._stream_pdfs()
+            for batch in self._iter_unprocessed_batches():
+                for pdf in batch:
+                    if stream and not (pdf.downloaded and pdf.local_path and os.path.exists(pdf.local_path)):
+                        with self.fetch_pdf(pdf) as source:
+                            photos = self.extract_images_from_pdf(pdf, source) if source is not None else []
+                    elif self.download_pdf(pdf):
+                        photos = self.extract_images_from_pdf(pdf)
+                    else:
+                        continue
                     if photos:
                         processed_count += 1
+        except CircuitOpenError as e:
+            # Not the PDF's fault, so don't spend its retry budget; resume next run
+            logger.warning(f"Stopping PDF processing: {e}")
                         
-            return processed_count
+        return processed_count
+    
+    def _iter_unprocessed_batches(self, batch_size: Optional[int] = None) -> Iterator[List[PDF]]:
+        """Yield detached batches of unprocessed PDFs in id order with their product preloaded.
+        
+        Each batch is read in its own short-lived session and paged by id (keyset),
+        so memory stays bounded by the batch size however large the backlog is.
+        Dead-lettered PDFs and PDFs still backing off after a failure are skipped.
+        """
+        batch_size = batch_size or Config.PDF_BATCH_SIZE
+        last_id = 0
+        now = datetime.utcnow()
+        
+        while True:
+            session = db.get_session()
+            try:
+                batch = session.query(PDF).options(joinedload(PDF.product)).filter(
+                    PDF.processed == False,
+                    PDF.dead_letter == False,
+                    PDF.deferred == False,
+                    or_(PDF.next_attempt_at == None, PDF.next_attempt_at <= now),
+                    PDF.id > last_id
+                ).order_by(PDF.id).limit(batch_size).all()
+            finally:
+                session.close()
             
-        finally:
-            session.close()
\ No newline at end of file
+            if not batch:
+                return
+            
+            last_id = batch[-1].id
+            yield batch
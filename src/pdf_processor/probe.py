@@ -0,0 +1,220 @@
+"""Cheap checks on an exhibit before downloading it.
+
+    python -m src.pdf_processor.probe deferred
+    python -m src.pdf_processor.probe release --ids 12 34 | --max-mb 500 | --all
+
+One ranged GET reads the first PROBE_BYTES of the file. It returns the
+Content-Type, the total size (from Content-Range or Content-Length) and the
+%PDF header. A linearized PDF also gives its page count and length there.
+When the server honours ranges, a second GET reads the last PROBE_BYTES to
+get the trailer: /Size (object count) and whether the file is encrypted.
+Servers that ignore Range get their connection closed after the first
+PROBE_BYTES.
+
+From that, an exhibit is:
+
+  rejected  the response is not a PDF (HTML error page, ...); counted as a failed attempt
+  deferred  it is larger than the size budget for its exhibit type, or has more than
+            PROBE_MAX_PAGES pages; left alone until released with the CLI above
+  download  anything else, including exhibits whose size could not be determined
+"""
+
+import argparse
+import re
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import requests
+import structlog
+from sqlalchemy.orm import joinedload
+
+from .. import metrics
+from ..config import Config
+from ..database.database import db
+from ..database.models import PDF
+from ..scraper import exhibits
+
+logger = structlog.get_logger()
+
+PDF_MAGIC = b'%PDF-'
+LINEARIZED = re.compile(rb'/Linearized\s')
+LINEARIZED_PAGES = re.compile(rb'/N\s+(\d+)')
+LINEARIZED_LENGTH = re.compile(rb'/L\s+(\d+)')
+TRAILER_SIZE = re.compile(rb'/Size\s+(\d+)')
+CONTENT_RANGE_TOTAL = re.compile(r'/\s*(\d+)\s*$')
+
+class NotAPDFError(Exception):
+    pass
+
+def _read_prefix(response: requests.Response, limit: int) -> bytes:
+    """Up to limit bytes of a streamed body; the rest is never read"""
+    data = b''
+    for chunk in response.iter_content(chunk_size=limit):
+        data += chunk
+        if len(data) >= limit:
+            break
+    response.close()
+    metrics.HTTP_RESPONSE_BYTES.labels('pdf').inc(len(data))
+    return data[:limit]
+
+def probe(http: requests.Session, url: str) -> Dict:
+    """What can be learned about a PDF from its first and last PROBE_BYTES"""
+    limit = Config.PROBE_BYTES
+    result = {
+        'content_type': None,
+        'content_length': None,
+        'ranges': False,
+        'is_pdf': False,
+        'page_count': None,
+        'object_count': None,
+        'encrypted': False
+    }
+
+    # Closed on every path, including an error status, so the connection goes back to the pool
+    with http.get(url, headers={'Range': f'bytes=0-{limit - 1}'}, stream=True, timeout=30) as response:
+        response.raise_for_status()
+        result['content_type'] = response.headers.get('Content-Type', '').split(';')[0].strip().lower() or None
+        result['ranges'] = response.status_code == 206
+        if result['ranges']:
+            total = CONTENT_RANGE_TOTAL.search(response.headers.get('Content-Range', ''))
+            result['content_length'] = int(total.group(1)) if total else None
+        elif response.headers.get('Content-Length', '').isdigit():
+            result['content_length'] = int(response.headers['Content-Length'])
+        head = _read_prefix(response, limit)
+
+    # The header may follow a little junk; readers accept it within the first 1 KB
+    result['is_pdf'] = PDF_MAGIC in head[:1024]
+    if not result['is_pdf']:
+        return result
+
+    linearized = LINEARIZED.search(head)
+    if linearized:
+        # /N and /L are looked up in the linearization dictionary only
+        params = head[linearized.start():head.find(b'>>', linearized.start())]
+        pages = LINEARIZED_PAGES.search(params)
+        length = LINEARIZED_LENGTH.search(params)
+        result['page_count'] = int(pages.group(1)) if pages else None
+        if result['content_length'] is None and length:
+            result['content_length'] = int(length.group(1))
+
+    if result['ranges'] and (result['content_length'] or 0) > limit:
+        with http.get(url, headers={'Range': f'bytes=-{limit}'}, stream=True, timeout=30) as response:
+            if response.status_code == 206:
+                tail = _read_prefix(response, limit)
+                size = TRAILER_SIZE.findall(tail)
+                result['object_count'] = int(size[-1]) if size else None
+                result['encrypted'] = b'/Encrypt' in tail
+    return result
+
+def size_budget(exhibit_type: Optional[str]) -> float:
+    """Size budget in bytes (0 = unlimited) for an exhibit of the given FCC type"""
+    if exhibit_type and exhibits.INTERNAL_PHOTO_TYPE.search(exhibit_type):
+        budget = Config.PDF_SIZE_BUDGET_MB['internal_photos']
+    else:
+        # Untyped exhibits were picked from link text alone, so are less certain
+        budget = Config.PDF_SIZE_BUDGET_MB['default']
+    return budget * 1024 * 1024
+
+def decide(result: Dict, exhibit_type: Optional[str] = None) -> Tuple[str, str]:
+    """(download|defer|reject, reason) for a probe result"""
+    if not result['is_pdf']:
+        return 'reject', 'not_pdf'
+    budget = size_budget(exhibit_type)
+    if budget and result['content_length'] and result['content_length'] > budget:
+        return 'defer', 'over_budget'
+    if Config.PROBE_MAX_PAGES and result['page_count'] and result['page_count'] > Config.PROBE_MAX_PAGES:
+        return 'defer', 'too_many_pages'
+    return 'download', 'ok'
+
+def check(http: requests.Session, pdf: PDF) -> bool:
+    """Probe a PDF and record the outcome; True if it should be downloaded now.
+
+    Raises NotAPDFError for responses that aren't PDFs, so the caller
+    counts a failed attempt.
+    """
+    result = probe(http, pdf.url)
+    decision, reason = decide(result, pdf.exhibit_type)
+    metrics.PDF_PROBES.labels(reason).inc()
+    if decision == 'reject':
+        # Not marked as probed, so the next attempt probes again
+        raise NotAPDFError(f"{pdf.url} returned {result['content_type'] or 'unknown content'}, not a PDF")
+
+    values = {
+        'content_type': result['content_type'],
+        'content_length': result['content_length'],
+        'probed_at': datetime.utcnow(),
+        'deferred': decision == 'defer'
+    }
+    if result['page_count']:
+        values['page_count'] = result['page_count']
+
+    session = db.get_session()
+    try:
+        session.query(PDF).filter_by(id=pdf.id).update(values)
+        session.commit()
+        for key, value in values.items():
+            setattr(pdf, key, value)
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error recording probe of PDF {pdf.filename}: {e}")
+    finally:
+        session.close()
+
+    size = f"{result['content_length'] / 1024 / 1024:.1f} MB" if result['content_length'] else 'unknown size'
+    pages = f", {result['page_count']} pages" if result['page_count'] else ''
+    if decision == 'defer':
+        logger.info(f"Deferred PDF {pdf.filename} ({size}{pages}): {reason}")
+        return False
+    logger.debug(f"Probed PDF {pdf.filename} ({size}{pages}, objects={result['object_count']}, "
+                 f"ranges={result['ranges']}, encrypted={result['encrypted']})")
+    return True
+
+def list_deferred():
+    session = db.get_session()
+    try:
+        pdfs = session.query(PDF).options(joinedload(PDF.product)).filter(
+            PDF.deferred == True
+        ).order_by(PDF.content_length.desc()).all()
+    finally:
+        session.close()
+
+    for pdf in pdfs:
+        size = f"{pdf.content_length / 1024 / 1024:.1f} MB" if pdf.content_length else '?'
+        print(f"{pdf.id}\t{pdf.product.fcc_id}\t{pdf.exhibit_type or '-'}\t{size}\t"
+              f"{pdf.page_count or '?'} pages\t{pdf.filename}")
+    print(f"{len(pdfs)} deferred PDFs")
+
+def release(ids=None, max_mb: Optional[float] = None) -> int:
+    """Queue deferred PDFs for download; they are not probed again"""
+    session = db.get_session()
+    try:
+        query = session.query(PDF).filter(PDF.deferred == True)
+        if ids:
+            query = query.filter(PDF.id.in_(ids))
+        if max_mb is not None:
+            query = query.filter(PDF.content_length <= max_mb * 1024 * 1024)
+        count = query.update({'deferred': False}, synchronize_session=False)
+        session.commit()
+        return count
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('deferred', help='List deferred PDFs, largest first')
+    release_parser = subparsers.add_parser('release', help='Queue deferred PDFs for download')
+    selection = release_parser.add_mutually_exclusive_group(required=True)
+    selection.add_argument('--ids', type=int, nargs='+', help='PDF ids')
+    selection.add_argument('--max-mb', type=float, help='Every deferred PDF up to this size')
+    selection.add_argument('--all', action='store_true', help='Every deferred PDF')
+    args = parser.parse_args()
+
+    db.create_tables()
+    if args.command == 'deferred':
+        list_deferred()
+    else:
+        print(f"Released {release(args.ids, args.max_mb)} PDFs")
@@ -0,0 +1,238 @@
+import argparse
+import cProfile
+import heapq
+import json
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import structlog
+
+from ..config import Config
+from ..database.database import db
+from ..database.models import PDF, ExtractionProfile
+
+logger = structlog.get_logger()
+
+PHASES = ('open', 'page_scan', 'pixmap', 'png_encode', 'write', 'pil_reopen', 'validate', 'quality', 'hash', 'db_commit', 'other')
+
+# Per-image timings kept on the summary row, slowest first
+MAX_IMAGE_TIMINGS = 100
+
+class NullProfiler:
+    """Stand-in used when profiling is off; every hook is a no-op"""
+
+    enabled = False
+
+    @contextmanager
+    def document(self, pdf: PDF):
+        yield
+
+    def lap(self, phase: str):
+        pass
+
+    def start_image(self, page_num: int, img_index: int, xref: int):
+        pass
+
+    def end_image(self):
+        pass
+
+class ExtractionProfiler:
+    """Records where extraction time goes for each PDF and each embedded image.
+
+    Time is attributed lap-style: lap(phase) charges everything since the
+    previous lap to that phase, so the extraction code only needs one call
+    after each step. One ExtractionProfile row is written per PDF. With
+    top_n > 0 every document also runs under cProfile (or pyinstrument) and
+    the profiles of the top_n slowest documents of the run are kept in
+    output_dir.
+    """
+
+    enabled = True
+
+    def __init__(self, top_n: Optional[int] = None, output_dir: Optional[str] = None,
+                 backend: Optional[str] = None):
+        self.top_n = Config.PROFILE_TOP_N if top_n is None else top_n
+        self.output_dir = output_dir or Config.PROFILE_DIR
+        self.backend = backend or Config.PROFILE_BACKEND
+        if self.backend == 'pyinstrument':
+            try:
+                import pyinstrument  # noqa: F401
+            except ImportError:
+                logger.warning("pyinstrument is not installed, falling back to cProfile")
+                self.backend = 'cprofile'
+
+        self._slowest = []  # min-heap of (seconds, profile row id, profile path)
+        self._doc = None
+        self._image = None
+        self._last = 0.0
+
+    @contextmanager
+    def document(self, pdf: PDF):
+        self._doc = {'phases': defaultdict(float), 'images': [], 'pages': 0}
+        profiler = self._start_profiler() if self.top_n > 0 else None
+        start = self._last = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.lap('other')
+            total = time.perf_counter() - start
+            self._stop_profiler(profiler)
+            try:
+                self._save(pdf, total, profiler)
+            except Exception as e:
+                logger.error(f"Error saving extraction profile for {pdf.filename}: {e}")
+            self._doc = None
+
+    def lap(self, phase: str):
+        now = time.perf_counter()
+        elapsed = now - self._last
+        self._last = now
+        if self._doc is None:
+            return
+        self._doc['phases'][phase] += elapsed
+        if phase == 'page_scan':
+            self._doc['pages'] += 1
+        if self._image is not None:
+            self._image['phases'][phase] = self._image['phases'].get(phase, 0.0) + elapsed
+
+    def start_image(self, page_num: int, img_index: int, xref: int):
+        self.lap('other')
+        self._image = {'page': page_num + 1, 'index': img_index + 1, 'xref': xref, 'phases': {}}
+
+    def end_image(self):
+        if self._image is None:
+            return
+        self.lap('other')
+        image = self._image
+        image['seconds'] = round(sum(image['phases'].values()), 6)
+        image['phases'] = {phase: round(seconds, 6) for phase, seconds in image['phases'].items()}
+        self._doc['images'].append(image)
+        self._image = None
+
+    def _start_profiler(self):
+        if self.backend == 'pyinstrument':
+            from pyinstrument import Profiler
+            profiler = Profiler()
+            profiler.start()
+            return profiler
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def _stop_profiler(self, profiler):
+        if profiler is None:
+            return
+        if self.backend == 'pyinstrument':
+            profiler.stop()
+        else:
+            profiler.disable()
+
+    def _save(self, pdf: PDF, total: float, profiler):
+        phases = self._doc['phases']
+        images = sorted(self._doc['images'], key=lambda image: image['seconds'], reverse=True)
+        row = ExtractionProfile(
+            pdf_id=pdf.id,
+            fcc_id=pdf.product.fcc_id if pdf.product else None,
+            filename=pdf.filename,
+            total_seconds=total,
+            pages=self._doc['pages'],
+            images=len(images),
+            photos=sum(1 for image in images if image['phases'].get('db_commit')),
+            image_timings=json.dumps(images[:MAX_IMAGE_TIMINGS]),
+            **{f"{phase}_seconds": phases.get(phase, 0.0) for phase in PHASES}
+        )
+
+        session = db.get_session()
+        try:
+            session.add(row)
+            session.commit()
+            row_id = row.id
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+        if profiler is not None and self._is_slowest(total):
+            path = self._dump_profile(profiler, pdf, row_id)
+            self._set_profile_path(row_id, path)
+            evicted = self._keep_slowest((total, row_id, path))
+            if evicted:
+                self._set_profile_path(evicted[1], None)
+                if os.path.exists(evicted[2]):
+                    os.remove(evicted[2])
+
+        logger.info(f"Profiled {pdf.filename}: {total:.2f}s, " + ", ".join(
+            f"{phase} {phases[phase]:.2f}s" for phase in PHASES if phases.get(phase, 0) >= 0.005))
+
+    def _is_slowest(self, total: float) -> bool:
+        return len(self._slowest) < self.top_n or total > self._slowest[0][0]
+
+    def _keep_slowest(self, item):
+        if len(self._slowest) < self.top_n:
+            heapq.heappush(self._slowest, item)
+            return None
+        return heapq.heapreplace(self._slowest, item)
+
+    def _dump_profile(self, profiler, pdf: PDF, row_id: int) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, f"{row_id}_pdf{pdf.id}")
+        if self.backend == 'pyinstrument':
+            path = base + '.html'
+            with open(path, 'w') as f:
+                f.write(profiler.output_html())
+        else:
+            path = base + '.prof'
+            profiler.dump_stats(path)
+        return path
+
+    def _set_profile_path(self, row_id: int, path: Optional[str]):
+        session = db.get_session()
+        try:
+            session.query(ExtractionProfile).filter_by(id=row_id).update({'profile_path': path})
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error updating extraction profile {row_id}: {e}")
+        finally:
+            session.close()
+
+def get_profiler():
+    return ExtractionProfiler() if Config.PROFILE_EXTRACTION else NullProfiler()
+
+def slowest_profiles(limit: int = 20) -> List[Dict]:
+    """Slowest recorded extractions, one row per PDF"""
+    session = db.get_session()
+    try:
+        rows = session.query(ExtractionProfile).order_by(ExtractionProfile.total_seconds.desc()).limit(limit * 4).all()
+        seen, results = set(), []
+        for row in rows:
+            if row.pdf_id in seen:
+                continue
+            seen.add(row.pdf_id)
+            result = {'pdf_id': row.pdf_id, 'fcc_id': row.fcc_id, 'filename': row.filename,
+                      'total_seconds': row.total_seconds, 'pages': row.pages, 'images': row.images,
+                      'photos': row.photos, 'profile_path': row.profile_path}
+            result.update({phase: getattr(row, f"{phase}_seconds") or 0.0 for phase in PHASES})
+            results.append(result)
+            if len(results) == limit:
+                break
+        return results
+    finally:
+        session.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Show the slowest profiled PDF extractions')
+    parser.add_argument('--limit', type=int, default=20, help='Number of PDFs to show')
+    args = parser.parse_args()
+
+    columns = ('pixmap', 'png_encode', 'write', 'pil_reopen', 'db_commit')
+    print(f"{'pdf':>6} {'fcc_id':<16} {'total':>8} {'pages':>5} {'imgs':>5} " +
+          " ".join(f"{name:>10}" for name in columns) + "  filename")
+    for row in slowest_profiles(args.limit):
+        print(f"{row['pdf_id']:>6} {(row['fcc_id'] or '')[:16]:<16} {row['total_seconds']:>7.2f}s "
+              f"{row['pages'] or 0:>5} {row['images'] or 0:>5} " +
+              " ".join(f"{row[name]:>9.2f}s" for name in columns) + f"  {row['filename']}")
@@ -0,0 +1,124 @@
+"""Image quality scores used to drop blurry or near-blank exhibit images.
+
+    python -m src.pdf_processor.quality backfill [--workers 8]
+
+Scores are computed on a grayscale copy downscaled to at most SIZE pixels
+on its long side:
+
+  sharpness         variance of the Laplacian (low for blurry shots)
+  entropy           Shannon entropy of the gray histogram in bits (low for blank pages)
+  blank_fraction    share of pixels within a few levels of the most common one (background)
+  clipped_fraction  share of pixels at pure black or white (over/under exposed)
+
+quality_score in [0, 1] combines them. Images below QUALITY_THRESHOLD are
+dropped during extraction, before they reach the store or the DB.
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+import structlog
+
+from ..config import Config
+from ..database.database import db
+from ..database.models import Photo
+
+logger = structlog.get_logger()
+
+SIZE = 512
+SHARP_LAPLACIAN_VARIANCE = 100  # treated as fully sharp
+INFORMATIVE_ENTROPY = 3.0  # bits; treated as fully detailed
+BACKGROUND_LEVELS = 2
+# Uniform areas (a solder mask, a white bench) are fine up to this share of the image
+MAX_BACKGROUND = 0.9
+
+def score(gray: np.ndarray) -> Dict[str, float]:
+    """Quality scores for a 2-D uint8 grayscale image, keyed by Photo column"""
+    height, width = gray.shape
+    scale = SIZE / max(height, width)
+    if scale < 1:
+        gray = cv2.resize(gray, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+
+    sharpness = float(cv2.Laplacian(gray, cv2.CV_32F).var())
+
+    histogram = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    probabilities = histogram / histogram.sum()
+    nonzero = probabilities[probabilities > 0]
+    entropy = max(0.0, float(-(nonzero * np.log2(nonzero)).sum()))
+
+    mode = int(histogram.argmax())
+    blank_fraction = float(probabilities[max(0, mode - BACKGROUND_LEVELS):mode + BACKGROUND_LEVELS + 1].sum())
+    clipped_fraction = float(probabilities[:3].sum() + probabilities[253:].sum())
+
+    sharp = min(1.0, np.log1p(sharpness) / np.log1p(SHARP_LAPLACIAN_VARIANCE))
+    filled = min(1.0, (1.0 - max(blank_fraction, clipped_fraction)) / (1.0 - MAX_BACKGROUND))
+    detail = min(1.0, entropy / INFORMATIVE_ENTROPY) * filled
+    return {
+        'sharpness': round(sharpness, 2),
+        'entropy': round(entropy, 3),
+        'blank_fraction': round(blank_fraction, 4),
+        'clipped_fraction': round(clipped_fraction, 4),
+        'quality_score': round(float(sharp * detail), 4)
+    }
+
+def is_acceptable(scores: Dict[str, float], threshold: Optional[float] = None) -> bool:
+    threshold = Config.QUALITY_THRESHOLD if threshold is None else threshold
+    return scores['quality_score'] >= threshold
+
+def backfill(workers: Optional[int] = None, batch_size: int = 1000) -> int:
+    """Score photos extracted before quality scoring was added (nothing is deleted)"""
+    from ..similarity import gray_from_bytes
+    from ..storage.images import ImageStorage
+
+    storage = ImageStorage()
+
+    def load(local_path: str) -> Optional[Dict[str, float]]:
+        data = storage.read(local_path)
+        gray = gray_from_bytes(data) if data else None
+        return score(gray) if gray is not None else None
+
+    scored = 0
+    last_id = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            session = db.get_session()
+            try:
+                rows = session.query(Photo.id, Photo.local_path).filter(
+                    Photo.id > last_id, Photo.quality_score == None
+                ).order_by(Photo.id).limit(batch_size).all()
+            finally:
+                session.close()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            results = pool.map(load, [local_path for _, local_path in rows])
+            updates = [dict(scores, id=photo_id) for (photo_id, _), scores in zip(rows, results) if scores]
+
+            session = db.get_session()
+            try:
+                session.bulk_update_mappings(Photo, updates)
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                session.close()
+            scored += len(updates)
+            logger.info(f"Scored {scored} photos so far")
+    return scored
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    backfill_parser = subparsers.add_parser('backfill', help='Score photos that have no quality score yet')
+    backfill_parser.add_argument('--workers', type=int, help='Decoder threads')
+    args = parser.parse_args()
+
+    db.create_tables()
+    start = time.time()
+    print(f"Scored {backfill(args.workers)} photos in {time.time() - start:.1f}s")
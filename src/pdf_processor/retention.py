@@ -0,0 +1,169 @@
+"""Source PDF retention after extraction, and a disk-budget reclaimer.
+
+    python -m src.pdf_processor.retention [--budget-mb 2048] [--dry-run]
+
+Once a PDF's images are extracted the source file is only needed to
+re-extract, so depending on PDF_RETENTION it is kept, gzipped, or deleted.
+The URL and SHA-256 stay on the row; an evicted PDF has downloaded=False
+and is simply downloaded again (and verified against its hash) if needed.
+"""
+
+import argparse
+import gzip
+import os
+import shutil
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+import structlog
+from sqlalchemy import and_, func, or_
+
+from ..config import Config
+from ..database.database import db
+from ..database.models import PDF
+
+logger = structlog.get_logger()
+
+RETENTION_MODES = ('keep', 'compress', 'delete')
+
+def apply_retention(pdf: PDF, mode: Optional[str] = None):
+    """Compress or delete a processed PDF's source file according to the retention mode"""
+    mode = mode or Config.PDF_RETENTION
+    if mode not in RETENTION_MODES:
+        raise ValueError(f"Unknown PDF retention mode: {mode}")
+    if mode == 'keep' or not pdf.local_path or not os.path.exists(pdf.local_path):
+        return
+
+    if mode == 'delete':
+        evict(pdf)
+    elif not pdf.local_path.endswith('.gz'):
+        compress(pdf)
+
+def compress(pdf: PDF):
+    source = pdf.local_path
+    target = source + '.gz'
+    tmp_path = target + '.tmp'
+    with open(source, 'rb') as src, gzip.open(tmp_path, 'wb', compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    os.replace(tmp_path, target)
+
+    if _update(pdf, {'local_path': target, 'stored_size': os.path.getsize(target)}):
+        os.remove(source)
+        logger.info(f"Compressed {pdf.filename}: {os.path.getsize(target)} of {pdf.file_size} bytes kept")
+    else:
+        os.remove(target)
+
+def evict(pdf: PDF) -> int:
+    """Delete the source file but keep the row (URL, SHA-256) for re-fetching; returns bytes freed"""
+    path = pdf.local_path
+    size = os.path.getsize(path) if path and os.path.exists(path) else 0
+    if not _update(pdf, {'local_path': None, 'stored_size': None, 'downloaded': False, 'evicted_at': datetime.utcnow()}):
+        return 0
+    if path:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    logger.info(f"Evicted source PDF {pdf.filename} ({size} bytes)")
+    return size
+
+def _update(pdf: PDF, values: Dict) -> bool:
+    session = db.get_session()
+    try:
+        session.query(PDF).filter_by(id=pdf.id).update(values)
+        session.commit()
+        for key, value in values.items():
+            setattr(pdf, key, value)
+        return True
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error updating PDF {pdf.filename}: {e}")
+        return False
+    finally:
+        session.close()
+
+def reclaim(budget_bytes: Optional[float] = None, dry_run: bool = False) -> Dict[str, int]:
+    """Evict least recently used processed source PDFs until usage fits the budget.
+
+    Usage is summed from the recorded sizes (stored_size, else file_size for
+    PDFs stored before it existed). Unprocessed PDFs count toward usage but
+    are never evicted. Candidates are read in keyset batches, least recently
+    used first, only until enough has been freed.
+    """
+    if budget_bytes is None:
+        budget_bytes = Config.PDF_DISK_BUDGET_MB * 1024 * 1024
+    stats = {'usage': 0, 'evicted': 0, 'freed': 0}
+    if budget_bytes <= 0:
+        return stats
+
+    last_used = func.coalesce(PDF.last_accessed_at, PDF.created_at)
+    session = db.get_session()
+    try:
+        stats['usage'] = session.query(func.coalesce(func.sum(func.coalesce(PDF.stored_size, PDF.file_size)), 0)).filter(
+            PDF.local_path != None
+        ).scalar()
+    finally:
+        session.close()
+
+    cursor = None
+    while stats['usage'] - stats['freed'] > budget_bytes:
+        session = db.get_session()
+        try:
+            query = session.query(PDF).filter(PDF.local_path != None, PDF.processed == True)
+            if cursor:
+                query = query.filter(or_(last_used > cursor[0], and_(last_used == cursor[0], PDF.id > cursor[1])))
+            rows = query.order_by(last_used, PDF.id).limit(Config.PDF_BATCH_SIZE).all()
+        finally:
+            session.close()
+        if not rows:
+            break
+        last = rows[-1]
+        cursor = (last.last_accessed_at or last.created_at, last.id)
+
+        for pdf in rows:
+            if stats['usage'] - stats['freed'] <= budget_bytes:
+                break
+            if not os.path.exists(pdf.local_path):
+                # Gone already; clear the row so its recorded size stops counting
+                if not dry_run:
+                    evict(pdf)
+                stats['usage'] -= pdf.stored_size or pdf.file_size or 0
+                continue
+            freed = os.path.getsize(pdf.local_path) if dry_run else evict(pdf)
+            stats['freed'] += freed
+            stats['evicted'] += 1 if freed else 0
+
+    if stats['evicted'] and not dry_run:
+        logger.info(f"Reclaimed {stats['freed'] / 1024 / 1024:.1f} MB from {stats['evicted']} source PDFs "
+                    f"(usage was {stats['usage'] / 1024 / 1024:.1f} MB, budget {budget_bytes / 1024 / 1024:.1f} MB)")
+    return stats
+
+class Reclaimer(threading.Thread):
+    """Daemon thread that enforces the PDF disk budget every RECLAIM_INTERVAL seconds"""
+
+    def __init__(self, interval: Optional[float] = None):
+        super().__init__(name='pdf-reclaimer', daemon=True)
+        self.interval = interval or Config.RECLAIM_INTERVAL
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                reclaim()
+            except Exception as e:
+                logger.error(f"PDF reclaimer failed: {e}")
+
+    def stop(self):
+        self._stop_event.set()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--budget-mb', type=float, default=Config.PDF_DISK_BUDGET_MB, help='Disk budget for source PDFs')
+    parser.add_argument('--dry-run', action='store_true', help='Report what would be evicted')
+    args = parser.parse_args()
+
+    stats = reclaim(args.budget_mb * 1024 * 1024, args.dry_run)
+    print(f"Source PDFs use {stats['usage'] / 1024 / 1024:.1f} MB; "
+          f"{'would evict' if args.dry_run else 'evicted'} {stats['evicted']} "
+          f"({stats['freed'] / 1024 / 1024:.1f} MB)")
@@ -0,0 +1,17 @@
+import random
+from datetime import datetime, timedelta
+from typing import Optional
+
+from .config import Config
+
+def backoff_delay(attempts: int) -> float:
+    """Exponential backoff in seconds for the given attempt count, with equal jitter"""
+    delay = min(Config.RETRY_MAX_DELAY, Config.RETRY_BASE_DELAY * (2 ** max(attempts - 1, 0)))
+    return random.uniform(delay / 2, delay)
+
+def next_attempt_at(attempts: int, now: Optional[datetime] = None) -> datetime:
+    now = now or datetime.utcnow()
+    return now + timedelta(seconds=backoff_delay(attempts))
+
+def is_exhausted(attempts: int) -> bool:
+    return attempts >= Config.MAX_ITEM_ATTEMPTS
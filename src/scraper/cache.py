@@ -0,0 +1,260 @@
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Callable, Dict, Iterator, Optional
+from urllib.parse import urlparse, parse_qs
+
+import requests
+import structlog
+from requests.structures import CaseInsensitiveDict
+
+from .. import metrics
+from ..config import Config
+from . import parsers
+from .throttle import ThrottledSession
+
+logger = structlog.get_logger()
+
+CACHE_MODES = ('off', 'on', 'offline')
+
+def has_result_rows(body) -> bool:
+    return next(parsers.iter_result_rows(body), None) is not None
+
+# A page must parse before it is cached, so an error or maintenance page served
+# with a 200 (or a search that came back empty) isn't replayed until it expires
+PAGE_VALIDATORS = {
+    'search': has_result_rows,
+    'exhibits': parsers.is_exhibit_list
+}
+
+class CacheMissError(Exception):
+    """Raised in offline mode when a page has never been cached"""
+
+class ResponseCache:
+    """Content-addressed on-disk cache for FCC HTML pages.
+
+    Entries are keyed by method, URL and form parameters and point at a body
+    blob named by its SHA-256, so identical pages are stored once:
+
+        {root}/entries/ab/<key>.json   metadata (url, params, status, validators, fetched_at, body hash)
+        {root}/blobs/cd/<sha256>       raw body
+
+    Freshness is decided per page type (search results, exhibit lists); other
+    URLs such as PDFs are never cached. In offline mode every lookup is served
+    from disk regardless of age and a miss raises CacheMissError.
+    """
+
+    def __init__(self, root: Optional[str] = None, mode: Optional[str] = None):
+        self.root = root or Config.HTTP_CACHE_DIR
+        self.mode = mode or Config.HTTP_CACHE_MODE
+        if self.mode not in CACHE_MODES:
+            raise ValueError(f"Unknown HTTP cache mode: {self.mode}")
+
+    @property
+    def offline(self) -> bool:
+        return self.mode == 'offline'
+
+    @staticmethod
+    def page_type(url: str) -> str:
+        return metrics.page_type(url)
+
+    def ttl_for(self, url: str) -> Optional[float]:
+        return Config.HTTP_CACHE_TTLS.get(self.page_type(url))
+
+    def cacheable(self, url: str) -> bool:
+        return self.mode != 'off' and self.ttl_for(url) is not None
+
+    @staticmethod
+    def make_key(method: str, url: str, params: Optional[Dict] = None) -> str:
+        canonical = json.dumps([method.upper(), url, sorted((params or {}).items())], default=str)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def lookup(self, method: str, url: str, params: Optional[Dict] = None) -> Optional[Dict]:
+        """Return entry metadata, fresh or stale; None on a miss (CacheMissError offline)"""
+        path = self._entry_path(self.make_key(method, url, params))
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            if self.offline:
+                raise CacheMissError(f"{method.upper()} {url} {params or ''} not in cache")
+            return None
+
+    def is_fresh(self, entry: Dict) -> bool:
+        if self.offline:
+            return True
+        ttl = self.ttl_for(entry['url'])
+        return ttl is not None and time.time() - entry['fetched_at'] < ttl
+
+    def read_body(self, entry: Dict) -> bytes:
+        with open(self._blob_path(entry['body']), 'rb') as f:
+            return f.read()
+
+    def store(self, method: str, url: str, params: Optional[Dict], body: bytes,
+              status: int = 200, headers: Optional[Dict] = None) -> Dict:
+        digest = hashlib.sha256(body).hexdigest()
+        blob_path = self._blob_path(digest)
+        if not os.path.exists(blob_path):
+            self._atomic_write(blob_path, body)
+
+        headers = CaseInsensitiveDict(headers or {})
+        entry = {
+            'method': method.upper(),
+            'url': url,
+            'params': params or {},
+            'page_type': self.page_type(url),
+            'status': status,
+            'headers': {name: headers[name] for name in ('Content-Type', 'ETag', 'Last-Modified') if name in headers},
+            'fetched_at': time.time(),
+            'body': digest
+        }
+        self._write_entry(entry)
+        return entry
+
+    def revalidated(self, entry: Dict):
+        """Mark a stale entry fresh again after a 304 Not Modified"""
+        entry['fetched_at'] = time.time()
+        self._write_entry(entry)
+
+    def iter_entries(self, page_type: Optional[str] = None) -> Iterator[Dict]:
+        entries_dir = os.path.join(self.root, 'entries')
+        if not os.path.isdir(entries_dir):
+            return
+        for shard in os.scandir(entries_dir):
+            if not shard.is_dir():
+                continue
+            for item in os.scandir(shard.path):
+                if not item.name.endswith('.json'):
+                    continue
+                with open(item.path) as f:
+                    entry = json.load(f)
+                if page_type is None or entry.get('page_type') == page_type:
+                    yield entry
+
+    def get_page(self, url: str, params: Optional[Dict] = None, method: str = 'GET') -> Optional[str]:
+        """Cached HTML for a rendered page (e.g. a Selenium navigation), if fresh"""
+        if not self.cacheable(url):
+            return None
+        entry = self.lookup(method, url, params)
+        if entry and self.is_fresh(entry):
+            logger.info(f"HTTP cache hit for {entry['page_type']} page {url}")
+            return self.read_body(entry).decode('utf-8', errors='replace')
+        return None
+
+    def put_page(self, url: str, html: str, params: Optional[Dict] = None, method: str = 'GET'):
+        if self.cacheable(url) and not self.offline:
+            self.store(method, url, params, html.encode('utf-8'), headers={'Content-Type': 'text/html; charset=utf-8'})
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.root, 'entries', key[:2], f"{key}.json")
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, 'blobs', digest[:2], digest)
+
+    def _write_entry(self, entry: Dict):
+        key = self.make_key(entry['method'], entry['url'], entry['params'])
+        self._atomic_write(self._entry_path(key), json.dumps(entry).encode('utf-8'))
+
+    def _atomic_write(self, path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+class CachingSession(ThrottledSession):
+    """ThrottledSession that answers cacheable FCC page requests from ResponseCache.
+
+    Fresh hits never touch the network (or the rate limiter). Stale entries are
+    revalidated with If-None-Match/If-Modified-Since when the server gave validators.
+    A 200 response is only stored if it passes `validate` (a callable taking the
+    body), by default the PAGE_VALIDATORS check for its page type.
+    """
+
+    def __init__(self, cache: Optional[ResponseCache] = None):
+        super().__init__()
+        self.cache = cache or ResponseCache()
+
+    def request(self, method, url, params=None, data=None, headers=None,
+                validate: Optional[Callable[[bytes], bool]] = None, **kwargs):
+        if not self.cache.cacheable(url) or kwargs.get('stream'):
+            return super().request(method, url, params=params, data=data, headers=headers, **kwargs)
+
+        form = {}
+        for source in (params, data):
+            if isinstance(source, dict):
+                form.update(source)
+
+        entry = self.cache.lookup(method, url, form)
+        if entry and self.cache.is_fresh(entry):
+            return self._cached_response(entry)
+
+        headers = dict(headers or {})
+        if entry:
+            if 'ETag' in entry['headers']:
+                headers['If-None-Match'] = entry['headers']['ETag']
+            if 'Last-Modified' in entry['headers']:
+                headers['If-Modified-Since'] = entry['headers']['Last-Modified']
+
+        response = super().request(method, url, params=params, data=data, headers=headers, **kwargs)
+
+        if response.status_code == 304 and entry:
+            self.cache.revalidated(entry)
+            return self._cached_response(entry)
+        if response.status_code == 200 and self._is_valid(url, response.content, validate):
+            self.cache.store(method, url, form, response.content, response.status_code, response.headers)
+        return response
+
+    def _is_valid(self, url: str, body: bytes, validate: Optional[Callable[[bytes], bool]]) -> bool:
+        page_type = self.cache.page_type(url)
+        validate = validate or PAGE_VALIDATORS.get(page_type)
+        if validate is None or validate(body):
+            return True
+        logger.warning(f"Not caching {page_type} page {url}: it did not parse")
+        return False
+
+    def _cached_response(self, entry: Dict) -> requests.Response:
+        response = requests.Response()
+        response.status_code = entry['status']
+        response._content = self.cache.read_body(entry)
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.url = entry['url']
+        response.from_cache = True
+        return response
+
+def replay(page_type: Optional[str] = None) -> Dict[str, int]:
+    """Re-run the scraper parsers over every cached page without touching the network"""
+    from .selenium_scraper import SeleniumFCCScraper
+
+    cache = ResponseCache(mode='offline')
+    scraper = SeleniumFCCScraper(start_driver=False)
+    counts = {'pages': 0, 'filings': 0, 'pdfs': 0}
+
+    for entry in cache.iter_entries(page_type):
+        body = cache.read_body(entry)
+        counts['pages'] += 1
+        if entry['page_type'] == 'search':
+            counts['filings'] += len(scraper._parse_search_results(body))
+        elif entry['page_type'] == 'exhibits':
+            fcc_id = parse_qs(urlparse(entry['url']).query).get('application_id', [''])[0]
+            counts['pdfs'] += len(scraper._parse_exhibit_links(body, fcc_id))
+
+    return counts
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay cached FCC pages through the scraper parsers')
+    parser.add_argument('--page-type', choices=['search', 'exhibits'], help='Only replay one page type')
+    args = parser.parse_args()
+
+    start = time.time()
+    counts = replay(args.page_type)
+    print(f"Replayed {counts['pages']} pages in {time.time() - start:.2f}s: "
+          f"{counts['filings']} filings, {counts['pdfs']} PDF links")
@@ -0,0 +1,44 @@
+"""Decide which exhibits of a filing are internal-photo PDFs.
+
+Shared by the requests and Selenium scrapers. When the exhibit list has an
+'Exhibit Type' column, that type is authoritative. Otherwise the link text
+and the PDF's file name are matched against EXHIBIT_INCLUDE_PATTERNS, unless
+they also match EXHIBIT_EXCLUDE_PATTERNS (external or test-setup photos,
+reports, manuals...). Each pattern list is compiled into a single regex.
+
+Measure changes against the labeled fixtures with
+benchmarks/eval_exhibits.py.
+"""
+
+import re
+from typing import List, Optional, Tuple, Union
+from urllib.parse import parse_qs, unquote, urlparse
+
+from ..config import Config
+from . import parsers
+
+def _compile(patterns: List[str]) -> re.Pattern:
+    return re.compile('|'.join(f'(?:{pattern})' for pattern in patterns), re.IGNORECASE)
+
+INTERNAL_PHOTO_TYPE = _compile(Config.INTERNAL_PHOTO_EXHIBIT_TYPES)
+INCLUDE = _compile(Config.EXHIBIT_INCLUDE_PATTERNS)
+EXCLUDE = _compile(Config.EXHIBIT_EXCLUDE_PATTERNS)
+# File names use _ - . as word separators; make them spaces so \b works
+SEPARATORS = re.compile(r'[_\-.+]+')
+
+def file_name(href: str) -> str:
+    """PDF file name from an attachment link (?file=... or the last path segment)"""
+    parsed = urlparse(href)
+    names = parse_qs(parsed.query).get('file')
+    return unquote(names[0] if names else parsed.path.rsplit('/', 1)[-1])
+
+def is_internal_photos(description: str, href: str = '', exhibit_type: Optional[str] = None) -> bool:
+    if exhibit_type:
+        return bool(INTERNAL_PHOTO_TYPE.search(exhibit_type))
+    candidate = SEPARATORS.sub(' ', f"{description} {file_name(href) if href else ''}")
+    return bool(INCLUDE.search(candidate)) and not EXCLUDE.search(candidate)
+
+def internal_photo_links(page_source: Union[str, bytes]) -> List[Tuple[str, str, Optional[str]]]:
+    """(href, link text, exhibit type) of the internal-photo PDFs on an exhibit list page"""
+    return [(href, description, exhibit_type) for href, description, exhibit_type in parsers.iter_exhibit_links(page_source)
+            if is_internal_photos(description, href, exhibit_type)]
@@ -1,20 +1,23 @@
-import requests
-import re
 import time
 from datetime import datetime, timedelta
-from bs4 import BeautifulSoup
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Set, Union
+from urllib.parse import urljoin
 import structlog
+from sqlalchemy import or_
 
+from .. import retry
 from ..config import Config
 from ..database.database import db
-from ..database.models import Product, PDF
+from ..database.models import Product, PDF, FilingAttempt
+from . import exhibits, parsers
+from .cache import CachingSession, CacheMissError
+from .throttle import CircuitOpenError
 
 logger = structlog.get_logger()
 
 class FCCScraper:
     def __init__(self):
-        self.session = requests.Session()
+        self.session = CachingSession()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
@@ -36,6 +39,10 @@ class FCCScraper:
             else:
                 logger.warning("Selenium scraper found no filings, falling back to sample data")
                 
+        except CacheMissError as e:
+            # Offline replay reports the miss instead of inventing filings
+            logger.error(f"Search results are not in the HTTP cache: {e}")
+            return []
         except Exception as e:
             logger.error(f"Selenium scraper failed: {e}, falling back to sample data")
         
@@ -96,27 +103,26 @@ class FCCScraper:
             logger.error(f"Error with fccid.io API: {e}")
             return []
     
-    def _parse_generic_search_results(self, soup: BeautifulSoup) -> List[Dict]:
+    def _parse_generic_search_results(self, page_source: Union[str, bytes]) -> List[Dict]:
         """Parse results from FCC GenericSearch.cfm"""
         filings = []
         
         # Look for table rows with FCC data
-        tables = soup.find_all('table')
-        for table in tables:
-            rows = table.find_all('tr')
+        tree = parsers.parse_html(page_source)
+        for table in tree.iter('table'):
+            rows = table.xpath('.//tr')
             for row in rows[1:]:  # Skip header row
-                cells = row.find_all('td')
+                cells = row.xpath('.//td')
                 if len(cells) >= 3:
                     # Extract FCC ID from first cell
-                    fcc_id_cell = cells[0]
-                    fcc_id_link = fcc_id_cell.find('a')
+                    fcc_id_link = cells[0].xpath('.//a')
                     if fcc_id_link:
-                        fcc_id = fcc_id_link.get_text(strip=True)
+                        fcc_id = parsers.text(fcc_id_link[0])
                         if fcc_id and len(fcc_id) > 3:  # Valid FCC ID
                             filing = {
                                 'fcc_id': fcc_id,
-                                'applicant': cells[1].get_text(strip=True) if len(cells) > 1 else '',
-                                'product_name': cells[2].get_text(strip=True) if len(cells) > 2 else '',
+                                'applicant': parsers.text(cells[1]),
+                                'product_name': parsers.text(cells[2]),
                                 'filing_date': datetime.now(),  # Use current date for now
                                 'detail_url': self._build_detail_url(fcc_id)
                             }
@@ -127,40 +133,38 @@ class FCCScraper:
     def _check_for_internal_photos(self, fcc_id: str) -> bool:
         """Check if an FCC ID has internal photos available"""
         try:
-            detail_url = f"https://apps.fcc.gov/oetcf/eas/reports/ViewExhibitReport.cfm?mode=Exhibits&RequestTimeout=500&calledFromFrame=N&application_id={fcc_id}"
+            detail_url = self._build_detail_url(fcc_id)
             
             response = self.session.get(detail_url, timeout=15)
             if response.status_code == 200:
-                # Look for PDF links with internal photo keywords
-                soup = BeautifulSoup(response.content, 'html.parser')
-                for link in soup.find_all('a', href=True):
-                    filename = link.get_text(strip=True).lower()
-                    if any(keyword in filename for keyword in ['internal', 'int', 'photo', 'inside']):
-                        logger.info(f"Found internal photos for {fcc_id}: {filename}")
-                        return True
+                links = exhibits.internal_photo_links(response.content)
+                if links:
+                    logger.info(f"Found internal photos for {fcc_id}: {links[0][1]}")
+                    return True
             return False
         except Exception as e:
             logger.warning(f"Could not check internal photos for {fcc_id}: {e}")
             return False
     
     def _build_detail_url(self, fcc_id: str) -> str:
-        return f"https://apps.fcc.gov/oetcf/eas/reports/ViewExhibitReport.cfm?mode=Exhibits&RequestTimeout=500&calledFromFrame=N&application_id={fcc_id}"
+        return f"{Config.FCC_BASE_URL}/ViewExhibitReport.cfm?mode=Exhibits&RequestTimeout=500&calledFromFrame=N&application_id={fcc_id}"
 
-    def _parse_search_results(self, soup: BeautifulSoup) -> List[Dict]:
+    def _parse_search_results(self, page_source: Union[str, bytes]) -> List[Dict]:
         filings = []
         
-        for row in soup.find_all('tr')[1:]:  # Skip header row
-            cells = row.find_all('td')
+        tree = parsers.parse_html(page_source)
+        for row in tree.xpath('//tr')[1:]:  # Skip header row
+            cells = row.xpath('.//td')
             if len(cells) >= 4:
                 fcc_id_cell = cells[0]
-                fcc_id = fcc_id_cell.get_text(strip=True)
+                fcc_id = parsers.text(fcc_id_cell)
                 
                 if fcc_id:
                     filing = {
                         'fcc_id': fcc_id,
-                        'applicant': cells[1].get_text(strip=True),
-                        'product_name': cells[2].get_text(strip=True),
-                        'filing_date': self._parse_date(cells[3].get_text(strip=True)),
+                        'applicant': parsers.text(cells[1]),
+                        'product_name': parsers.text(cells[2]),
+                        'filing_date': self._parse_date(parsers.text(cells[3])),
                         'detail_url': self._extract_detail_url(fcc_id_cell)
                     }
                     filings.append(filing)
@@ -174,12 +178,12 @@ class FCCScraper:
             return None
     
     def _extract_detail_url(self, cell) -> Optional[str]:
-        link = cell.find('a')
-        if link and link.get('href'):
-            return Config.FCC_BASE_URL + "/" + link['href']
+        href = parsers.first_link(cell)
+        if href:
+            return Config.FCC_BASE_URL + "/" + href
         return None
     
-    def get_filing_details(self, fcc_id: str) -> Optional[Dict]:
+    def get_filing_details(self, fcc_id: str, filing: Optional[Dict] = None) -> Optional[Dict]:
         logger.info(f"Getting filing details for {fcc_id}")
         
         # Handle sample data
@@ -211,8 +215,12 @@ class FCCScraper:
             from .selenium_scraper import SeleniumFCCScraper
             
             selenium_scraper = SeleniumFCCScraper()
-            details = selenium_scraper.get_filing_details(fcc_id)
-            selenium_scraper.close()
+            try:
+                details = selenium_scraper.get_filing_details(fcc_id)
+            finally:
+                selenium_scraper.close()
+            
+            self._clear_filing_failure(fcc_id)
             
             if details:
                 logger.info(f"Found {len(details.get('pdfs', []))} PDFs for {fcc_id} via Selenium")
@@ -221,40 +229,102 @@ class FCCScraper:
                 logger.warning(f"No details found for {fcc_id} via Selenium")
                 return None
                 
+        except (CircuitOpenError, CacheMissError) as e:
+            logger.warning(f"Skipping detail lookup for {fcc_id}: {e}")
+            return None
         except Exception as e:
             logger.error(f"Selenium detail lookup failed for {fcc_id}: {e}")
+            self._record_filing_failure(fcc_id, e, filing)
             return None
     
-    def _extract_pdf_links(self, soup: BeautifulSoup, fcc_id: str) -> List[Dict]:
+    def get_backed_off_fcc_ids(self) -> Set[str]:
+        """FCC IDs that are dead-lettered or still waiting for their next attempt"""
+        session = db.get_session()
+        try:
+            rows = session.query(FilingAttempt.fcc_id).filter(
+                or_(FilingAttempt.dead_letter == True, FilingAttempt.next_attempt_at > datetime.utcnow())
+            ).all()
+            return {row.fcc_id for row in rows}
+        finally:
+            session.close()
+    
+    def get_due_filing_retries(self) -> List[Dict]:
+        """Previously failed filings whose backoff has expired, in search-result form"""
+        session = db.get_session()
+        try:
+            attempts = session.query(FilingAttempt).filter(
+                FilingAttempt.dead_letter == False,
+                FilingAttempt.next_attempt_at <= datetime.utcnow()
+            ).order_by(FilingAttempt.next_attempt_at).all()
+            
+            return [{
+                'fcc_id': attempt.fcc_id,
+                'applicant': attempt.applicant,
+                'product_name': attempt.product_name,
+                'filing_date': attempt.filing_date,
+                'detail_url': self._build_detail_url(attempt.fcc_id)
+            } for attempt in attempts]
+        finally:
+            session.close()
+    
+    def _record_filing_failure(self, fcc_id: str, error: Exception, filing: Optional[Dict] = None):
+        session = db.get_session()
+        try:
+            attempt = session.query(FilingAttempt).filter_by(fcc_id=fcc_id).first()
+            if not attempt:
+                attempt = FilingAttempt(fcc_id=fcc_id, attempts=0)
+                session.add(attempt)
+            
+            # Keep the search metadata so a later retry can still save the product
+            if filing:
+                attempt.applicant = filing.get('applicant') or attempt.applicant
+                attempt.product_name = filing.get('product_name') or attempt.product_name
+                attempt.filing_date = filing.get('filing_date') or attempt.filing_date
+            
+            attempt.attempts = (attempt.attempts or 0) + 1
+            attempt.last_error = str(error)[:1000]
+            attempt.dead_letter = retry.is_exhausted(attempt.attempts)
+            attempt.next_attempt_at = None if attempt.dead_letter else retry.next_attempt_at(attempt.attempts)
+            session.commit()
+            
+            if attempt.dead_letter:
+                logger.warning(f"FCC ID {fcc_id} moved to dead letter after {attempt.attempts} attempts")
+            else:
+                logger.info(f"FCC ID {fcc_id} failed attempt {attempt.attempts}, next attempt at {attempt.next_attempt_at.isoformat()}")
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error recording failure for {fcc_id}: {e}")
+        finally:
+            session.close()
+    
+    def _clear_filing_failure(self, fcc_id: str):
+        session = db.get_session()
+        try:
+            session.query(FilingAttempt).filter_by(fcc_id=fcc_id).delete()
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error clearing retry state for {fcc_id}: {e}")
+        finally:
+            session.close()
+    
+    def _extract_pdf_links(self, page_source: Union[str, bytes], fcc_id: str) -> List[Dict]:
         pdf_links = []
         
-        for link in soup.find_all('a', href=True):
-            href = link['href']
-            filename = link.get_text(strip=True)
-            
-            if href.endswith('.pdf') and self._is_internal_photo_pdf(filename):
-                full_url = self._build_full_url(href)
-                pdf_links.append({
-                    'filename': filename,
-                    'url': full_url,
-                    'fcc_id': fcc_id
-                })
+        for href, filename, exhibit_type in exhibits.internal_photo_links(page_source):
+            full_url = self._build_full_url(href)
+            pdf_links.append({
+                'filename': filename,
+                'url': full_url,
+                'fcc_id': fcc_id,
+                'exhibit_type': exhibit_type
+            })
                 
         return pdf_links
     
-    def _is_internal_photo_pdf(self, filename: str) -> bool:
-        for pattern in Config.PDF_FILENAME_PATTERNS:
-            if re.search(pattern, filename, re.IGNORECASE):
-                return True
-        return False
-    
     def _build_full_url(self, href: str) -> str:
-        if href.startswith('http'):
-            return href
-        elif href.startswith('/'):
-            return 'https://apps.fcc.gov' + href
-        else:
-            return f"{Config.FCC_BASE_URL}/{href}"
+        # Absolute URLs pass through, /paths resolve against the FCC host, the rest against the reports dir
+        return urljoin(Config.FCC_BASE_URL + '/', href)
     
     def save_to_database(self, filing_data: Dict) -> Optional[Product]:
         session = db.get_session()
@@ -279,7 +349,8 @@ class FCCScraper:
                 pdf = PDF(
                     product_id=product.id,
                     filename=pdf_data['filename'],
-                    url=pdf_data['url']
+                    url=pdf_data['url'],
+                    exhibit_type=pdf_data.get('exhibit_type')
                 )
                 session.add(pdf)
             
@@ -0,0 +1,91 @@
+from typing import Iterator, List, Tuple, Union
+
+import lxml.html
+from lxml import etree
+
+# Header words that identify the FCC search results table
+RESULT_HEADER_KEYWORDS = ('fcc', 'id', 'applicant')
+
+# Only anchors whose href mentions .pdf are exhibit candidates
+PDF_LINK_XPATH = "//a[@href][contains(translate(@href, 'PDF', 'pdf'), '.pdf')]"
+
+def parse_html(markup: Union[str, bytes]) -> etree._Element:
+    """Parse a page with lxml and drop script/style so text matches what a browser shows"""
+    tree = lxml.html.fromstring(markup)
+    etree.strip_elements(tree, 'script', 'style', with_tail=False)
+    return tree
+
+def text(element: etree._Element) -> str:
+    """Equivalent of BeautifulSoup's get_text(strip=True)"""
+    return ''.join(part.strip() for part in element.itertext())
+
+def iter_result_rows(markup: Union[str, bytes]) -> Iterator[List[etree._Element]]:
+    """Yield the cells of each data row in the first results-looking table.
+
+    Only the header row of each candidate table is turned into text, and
+    tables are skipped as soon as one matches, instead of stringifying every
+    row of every table on the page.
+    """
+    tree = parse_html(markup)
+
+    for table in tree.iter('table'):
+        rows = table.xpath('.//tr')
+        if len(rows) < 2:
+            continue
+
+        header_text = ''.join(rows[0].itertext()).lower()
+        if not any(keyword in header_text for keyword in RESULT_HEADER_KEYWORDS):
+            continue
+
+        for row in rows[1:]:
+            yield row.xpath('.//td | .//th')
+        return
+
+def first_link(cell: etree._Element) -> Union[str, None]:
+    links = cell.xpath('.//a[@href]')
+    return links[0].get('href') if links else None
+
+def iter_pdf_links(markup: Union[str, bytes]) -> Iterator[Tuple[str, str]]:
+    """Yield (href, link text) for every anchor pointing at a PDF"""
+    tree = parse_html(markup)
+    for link in tree.xpath(PDF_LINK_XPATH):
+        yield link.get('href'), text(link)
+
+def _exhibit_type_column(table: etree._Element) -> Union[int, None]:
+    """Index of the 'Exhibit Type' column in a table's header row, if it has one"""
+    header = table.xpath('.//tr[1]')
+    if not header:
+        return None
+    for index, cell in enumerate(header[0].xpath('./td | ./th')):
+        label = text(cell).lower()
+        if label in ('exhibit type', 'type'):
+            return index
+    return None
+
+def is_exhibit_list(markup: Union[str, bytes]) -> bool:
+    """Whether a page looks like an exhibit list (an 'Exhibit Type' table or PDF links), not an error page"""
+    tree = parse_html(markup)
+    if tree.xpath(PDF_LINK_XPATH):
+        return True
+    return any(_exhibit_type_column(table) is not None for table in tree.iter('table'))
+
+def iter_exhibit_links(markup: Union[str, bytes]) -> Iterator[Tuple[str, str, Union[str, None]]]:
+    """Yield (href, link text, exhibit type) for every PDF link.
+
+    The exhibit type comes from the 'Exhibit Type' column of the row holding
+    the link, and is None for links outside such a table.
+    """
+    tree = parse_html(markup)
+    type_columns = {}
+    for link in tree.xpath(PDF_LINK_XPATH):
+        exhibit_type = None
+        row = next(link.iterancestors('tr'), None)
+        table = next(row.iterancestors('table'), None) if row is not None else None
+        if table is not None:
+            if table not in type_columns:
+                type_columns[table] = _exhibit_type_column(table)
+            column = type_columns[table]
+            cells = row.xpath('./td | ./th')
+            if column is not None and column < len(cells):
+                exhibit_type = text(cells[column]) or None
+        yield link.get('href'), text(link), exhibit_type
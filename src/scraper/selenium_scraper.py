@@ -1,6 +1,7 @@
 import time
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Union
+from urllib.parse import urljoin
 import structlog
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -8,14 +9,22 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from bs4 import BeautifulSoup
+
+from ..config import Config
+from . import exhibits, parsers
+from .cache import ResponseCache
+from .throttle import throttled
 
 logger = structlog.get_logger()
 
 class SeleniumFCCScraper:
-    def __init__(self):
+    def __init__(self, start_driver: bool = True):
         self.driver = None
-        self._setup_driver()
+        self.cache = ResponseCache()
+        
+        # Offline replay serves every page from the HTTP cache, so no browser is needed
+        if start_driver and not self.cache.offline:
+            self._setup_driver()
     
     def _setup_driver(self):
         """Setup headless Chrome driver"""
@@ -36,27 +45,34 @@ class SeleniumFCCScraper:
     
     def search_recent_filings(self, days_back: int = 1) -> List[Dict]:
         """Search FCC database using the GenericSearch form"""
+        # Calculate date range (yesterday)
+        end_date = datetime.now() - timedelta(days=1)
+        start_date = end_date  # Same day
+        
+        date_str = end_date.strftime('%m/%d/%Y')
+        
+        url = f"{Config.FCC_BASE_URL}/GenericSearch.cfm"
+        form = {'grant_date_from': date_str, 'grant_date_to': date_str}
+        
+        cached = self.cache.get_page(url, form, method='POST')
+        if cached:
+            return self._parse_search_results(cached)
+        
         if not self.driver:
             logger.error("Chrome driver not initialized")
             return []
         
         try:
-            # Calculate date range (yesterday)
-            end_date = datetime.now() - timedelta(days=1)
-            start_date = end_date  # Same day
-            
-            date_str = end_date.strftime('%m/%d/%Y')
-            
             logger.info(f"Searching FCC filings for date: {date_str}")
             
             # Navigate to FCC search page
-            url = "https://apps.fcc.gov/oetcf/eas/reports/GenericSearch.cfm"
-            self.driver.get(url)
-            
-            # Wait for page to load (longer timeout for slow government site)
-            WebDriverWait(self.driver, 60).until(
-                EC.presence_of_element_located((By.TAG_NAME, "form"))
-            )
+            with throttled(url):
+                self.driver.get(url)
+                
+                # Wait for page to load (longer timeout for slow government site)
+                WebDriverWait(self.driver, 60).until(
+                    EC.presence_of_element_located((By.TAG_NAME, "form"))
+                )
             
             # Fill in the Final Action Date Range fields
             try:
@@ -74,20 +90,23 @@ class SeleniumFCCScraper:
                 
                 # Submit the form
                 submit_button = self.driver.find_element(By.NAME, "Submit")
-                submit_button.click()
-                
-                # Wait for results to load (longer timeout for slow government site)
-                WebDriverWait(self.driver, 90).until(
-                    EC.presence_of_element_located((By.TAG_NAME, "table"))
-                )
+                with throttled(url):
+                    submit_button.click()
+                    
+                    # Wait for results to load (longer timeout for slow government site)
+                    WebDriverWait(self.driver, 90).until(
+                        EC.presence_of_element_located((By.TAG_NAME, "table"))
+                    )
                 
                 # Parse the results
                 page_source = self.driver.page_source
-                soup = BeautifulSoup(page_source, 'html.parser')
-                
-                filings = self._parse_search_results(soup)
+                filings = self._parse_search_results(page_source)
                 logger.info(f"Found {len(filings)} filings for {date_str}")
                 
+                # Only cache pages that parsed, so a transient error page isn't replayed
+                if filings:
+                    self.cache.put_page(url, page_source, form, method='POST')
+                
                 return filings
                 
             except NoSuchElementException as e:
@@ -105,121 +124,101 @@ class SeleniumFCCScraper:
             logger.error(f"Error searching FCC filings: {e}")
             return []
     
-    def _parse_search_results(self, soup: BeautifulSoup) -> List[Dict]:
+    def _parse_search_results(self, page_source: Union[str, bytes]) -> List[Dict]:
         """Parse FCC search results from HTML"""
         filings = []
         
-        # Look for results table
-        tables = soup.find_all('table')
-        
-        for table in tables:
-            rows = table.find_all('tr')
-            
-            # Skip tables that are too small to contain results
-            if len(rows) < 2:
-                continue
-                
-            # Check if this looks like a results table
-            header_row = rows[0]
-            header_text = header_row.get_text().lower()
-            
-            if 'fcc' in header_text or 'id' in header_text or 'applicant' in header_text:
-                logger.info(f"Found results table with {len(rows)} rows")
-                
-                # Parse data rows
-                for row in rows[1:]:  # Skip header
-                    cells = row.find_all(['td', 'th'])
-                    
-                    if len(cells) >= 3:
-                        # Extract data from cells
-                        fcc_id = ""
-                        applicant = ""
-                        product_name = ""
-                        
-                        # Look for FCC ID in first few cells
-                        for i, cell in enumerate(cells[:3]):
-                            text = cell.get_text(strip=True)
-                            
-                            # FCC ID pattern: letters + numbers, usually with dash
-                            if i == 0 and len(text) > 5 and any(c.isalpha() for c in text):
-                                fcc_id = text
-                            elif i == 1:
-                                applicant = text
-                            elif i == 2:
-                                product_name = text
-                        
-                        if fcc_id:
-                            filing = {
-                                'fcc_id': fcc_id,
-                                'applicant': applicant,
-                                'product_name': product_name,
-                                'filing_date': datetime.now(),
-                                'detail_url': f"https://apps.fcc.gov/oetcf/eas/reports/ViewExhibitReport.cfm?mode=Exhibits&RequestTimeout=500&calledFromFrame=N&application_id={fcc_id}"
-                            }
-                            filings.append(filing)
-                            logger.info(f"Found filing: {fcc_id} - {applicant}")
+        for cells in parsers.iter_result_rows(page_source):
+            if len(cells) >= 3:
+                # FCC ID pattern: letters + numbers, usually with dash
+                fcc_id = parsers.text(cells[0])
+                if len(fcc_id) <= 5 or not any(c.isalpha() for c in fcc_id):
+                    fcc_id = ""
+                applicant = parsers.text(cells[1])
+                product_name = parsers.text(cells[2])
                 
-                break  # Found the results table
+                if fcc_id:
+                    filing = {
+                        'fcc_id': fcc_id,
+                        'applicant': applicant,
+                        'product_name': product_name,
+                        'filing_date': datetime.now(),
+                        'detail_url': self._build_detail_url(fcc_id)
+                    }
+                    filings.append(filing)
+                    logger.info(f"Found filing: {fcc_id} - {applicant}")
         
+        logger.info(f"Found results table with {len(filings)} filings")
         return filings
     
     def get_filing_details(self, fcc_id: str) -> Optional[Dict]:
-        """Get detailed filing information including PDFs"""
-        if not self.driver:
-            return None
+        """Get detailed filing information including PDFs.
         
-        try:
-            detail_url = f"https://apps.fcc.gov/oetcf/eas/reports/ViewExhibitReport.cfm?mode=Exhibits&RequestTimeout=500&calledFromFrame=N&application_id={fcc_id}"
-            
-            logger.info(f"Getting details for {fcc_id}")
-            self.driver.get(detail_url)
-            
-            # Wait for page to load (longer timeout for slow government site)
-            WebDriverWait(self.driver, 60).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
-            
-            page_source = self.driver.page_source
-            soup = BeautifulSoup(page_source, 'html.parser')
-            
-            # Extract PDF links
-            pdfs = []
-            for link in soup.find_all('a', href=True):
-                href = link.get('href')
-                filename = link.get_text(strip=True)
-                
-                if href and '.pdf' in href.lower():
-                    # Check if this looks like an internal photos PDF
-                    if any(keyword in filename.lower() for keyword in ['internal', 'int', 'photo', 'inside']):
-                        full_url = self._build_full_url(href)
-                        pdfs.append({
-                            'filename': filename,
-                            'url': full_url,
-                            'fcc_id': fcc_id
-                        })
-                        logger.info(f"Found internal photos PDF: {filename}")
+        Returns None when the filing has no internal photos; page load errors (and
+        a missing driver) are raised so the caller can count them against the FCC
+        ID's retry budget.
+        """
+        detail_url = self._build_detail_url(fcc_id)
+        
+        page_source = self.cache.get_page(detail_url)
+        
+        if page_source is None:
+            if not self.driver:
+                # Not "no photos": the page was never loaded, so the retry state must be kept
+                raise RuntimeError("Chrome driver not initialized")
             
-            if pdfs:
-                return {
-                    'fcc_id': fcc_id,
-                    'pdfs': pdfs
-                }
-            else:
-                logger.info(f"No internal photos found for {fcc_id}")
-                return None
+            try:
+                logger.info(f"Getting details for {fcc_id}")
+                with throttled(detail_url):
+                    self.driver.get(detail_url)
+                    
+                    # Wait for page to load (longer timeout for slow government site)
+                    WebDriverWait(self.driver, 60).until(
+                        EC.presence_of_element_located((By.TAG_NAME, "body"))
+                    )
                 
-        except Exception as e:
-            logger.error(f"Error getting details for {fcc_id}: {e}")
+                page_source = self.driver.page_source
+                # Only cache exhibit lists, so an error or maintenance page isn't replayed as "no photos"
+                if parsers.is_exhibit_list(page_source):
+                    self.cache.put_page(detail_url, page_source)
+                else:
+                    logger.warning(f"Detail page for {fcc_id} has no exhibit table, not caching it")
+                    
+            except Exception as e:
+                logger.error(f"Error getting details for {fcc_id}: {e}")
+                raise
+        
+        pdfs = self._parse_exhibit_links(page_source, fcc_id)
+        
+        if pdfs:
+            return {
+                'fcc_id': fcc_id,
+                'pdfs': pdfs
+            }
+        else:
+            logger.info(f"No internal photos found for {fcc_id}")
             return None
     
+    def _parse_exhibit_links(self, page_source: Union[str, bytes], fcc_id: str) -> List[Dict]:
+        """Extract internal-photo PDF links from an exhibit list page"""
+        pdfs = []
+        for href, filename, exhibit_type in exhibits.internal_photo_links(page_source):
+            full_url = self._build_full_url(href)
+            pdfs.append({
+                'filename': filename,
+                'url': full_url,
+                'fcc_id': fcc_id,
+                'exhibit_type': exhibit_type
+            })
+            logger.info(f"Found internal photos PDF: {filename}")
+        return pdfs
+    
+    def _build_detail_url(self, fcc_id: str) -> str:
+        return f"{Config.FCC_BASE_URL}/ViewExhibitReport.cfm?mode=Exhibits&RequestTimeout=500&calledFromFrame=N&application_id={fcc_id}"
+    
     def _build_full_url(self, href: str) -> str:
         """Build full URL from relative href"""
-        if href.startswith('http'):
-            return href
-        elif href.startswith('/'):
-            return 'https://apps.fcc.gov' + href
-        else:
-            return f"https://apps.fcc.gov/oetcf/eas/reports/{href}"
+        return urljoin(Config.FCC_BASE_URL + '/', href)
     
     def close(self):
         """Close the browser driver"""
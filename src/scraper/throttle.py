@@ -0,0 +1,208 @@
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+import structlog
+
+from .. import metrics
+from ..config import Config
+
+logger = structlog.get_logger()
+
+class CircuitOpenError(Exception):
+    """Raised when a host's circuit breaker is open and traffic is paused"""
+
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"Circuit open for {host}, retry in {retry_in:.0f}s")
+        self.host = host
+        self.retry_in = retry_in
+
+class HostThrottle:
+    """Adaptive token bucket plus circuit breaker for a single host.
+
+    The refill rate grows additively while responses are fast and healthy and
+    is cut multiplicatively on slow responses, 429/503 and errors. Retry-After
+    blocks the whole host. Consecutive failures open the circuit, which pauses
+    all traffic until a single half-open probe succeeds.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, host: str):
+        self.host = host
+        self.rate = min(max(1.0 / max(Config.DOWNLOAD_DELAY, 0.001), Config.RATE_LIMIT_MIN), Config.RATE_LIMIT_MAX)
+        self.capacity = Config.RATE_LIMIT_BURST
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent; raise CircuitOpenError while paused"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._check_circuit(now)
+                self._refill(now)
+
+                wait = self.blocked_until - now
+                if wait <= 0:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        if self.state == self.HALF_OPEN:
+                            self.probe_in_flight = True
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def record(self, latency: float, status: Optional[int] = None, retry_after: Optional[str] = None, error: bool = False):
+        """Feed back the outcome of a request to adapt the rate and circuit state"""
+        with self._lock:
+            now = time.monotonic()
+            self.probe_in_flight = False
+
+            if status in (429, 503):
+                self.rate = max(Config.RATE_LIMIT_MIN, self.rate * Config.RATE_LIMIT_DECREASE)
+                delay = _parse_retry_after(retry_after)
+                self.blocked_until = max(self.blocked_until, now + (delay if delay is not None else 1.0 / self.rate))
+                logger.warning(f"{self.host} returned {status}, slowing to {self.rate:.2f} req/s")
+
+            if error or (status is not None and status >= 500):
+                self.failures += 1
+                if self.state == self.HALF_OPEN or self.failures >= Config.CIRCUIT_FAILURE_THRESHOLD:
+                    self._open(now)
+                return
+
+            if status == 429:
+                return
+
+            self.failures = 0
+            if self.state != self.CLOSED:
+                self.state = self.CLOSED
+                logger.info(f"Circuit closed for {self.host}")
+
+            if latency > Config.RATE_LIMIT_TARGET_LATENCY:
+                self.rate = max(Config.RATE_LIMIT_MIN, self.rate * Config.RATE_LIMIT_DECREASE)
+            else:
+                self.rate = min(Config.RATE_LIMIT_MAX, self.rate + Config.RATE_LIMIT_INCREASE)
+
+    def release_probe(self):
+        """Let the next probe through after one that ended without an outcome, e.g. on KeyboardInterrupt"""
+        with self._lock:
+            self.probe_in_flight = False
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _check_circuit(self, now: float):
+        if self.state == self.CLOSED:
+            return
+
+        retry_in = self.opened_at + Config.CIRCUIT_RESET_TIMEOUT - now
+        if self.state == self.OPEN and retry_in <= 0:
+            self.state = self.HALF_OPEN
+            logger.info(f"Circuit half-open for {self.host}, sending probe request")
+
+        if self.state == self.OPEN or self.probe_in_flight:
+            raise CircuitOpenError(self.host, max(retry_in, 0))
+
+    def _open(self, now: float):
+        if self.state != self.OPEN:
+            logger.warning(f"Circuit opened for {self.host} after {self.failures} failures, pausing for {Config.CIRCUIT_RESET_TIMEOUT:.0f}s")
+        self.state = self.OPEN
+        self.opened_at = now
+        self.rate = max(Config.RATE_LIMIT_MIN, self.rate * Config.RATE_LIMIT_DECREASE)
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+_throttles: Dict[str, HostThrottle] = {}
+_throttles_lock = threading.Lock()
+
+def get_throttle(url: str) -> HostThrottle:
+    """Shared throttle for the URL's host, created on first use"""
+    host = urlparse(url).netloc.lower()
+    with _throttles_lock:
+        throttle = _throttles.get(host)
+        if throttle is None:
+            throttle = _throttles[host] = HostThrottle(host)
+        return throttle
+
+@contextmanager
+def throttled(url: str):
+    """Wrap a request that has no HTTP status to report, e.g. a Selenium navigation"""
+    throttle = get_throttle(url)
+    throttle.acquire()
+    page_type = metrics.page_type(url)
+    start = time.monotonic()
+    try:
+        yield
+    except Exception:
+        elapsed = time.monotonic() - start
+        throttle.record(elapsed, error=True)
+        metrics.SELENIUM_PAGE_LOAD_SECONDS.labels(page_type, 'error').observe(elapsed)
+        raise
+    except BaseException:
+        throttle.release_probe()
+        raise
+    elapsed = time.monotonic() - start
+    throttle.record(elapsed)
+    metrics.SELENIUM_PAGE_LOAD_SECONDS.labels(page_type, 'ok').observe(elapsed)
+
+class ThrottledSession(requests.Session):
+    """requests.Session that routes every request through the host's throttle"""
+
+    def request(self, method, url, *args, **kwargs):
+        throttle = get_throttle(url)
+        throttle.acquire()
+        page_type = metrics.page_type(url)
+        start = time.monotonic()
+        try:
+            response = super().request(method, url, *args, **kwargs)
+        except requests.RequestException:
+            elapsed = time.monotonic() - start
+            throttle.record(elapsed, error=True)
+            metrics.HTTP_REQUEST_SECONDS.labels(page_type, 'error').observe(elapsed)
+            raise
+        except BaseException:
+            # Not the host's failure, but a half-open circuit must not wait on it forever
+            throttle.release_probe()
+            raise
+
+        elapsed = time.monotonic() - start
+        throttle.record(
+            elapsed,
+            status=response.status_code,
+            retry_after=response.headers.get('Retry-After')
+        )
+        metrics.HTTP_REQUEST_SECONDS.labels(page_type, str(response.status_code)).observe(elapsed)
+        # Streamed bodies haven't been read yet; the caller counts those
+        if not kwargs.get('stream'):
+            metrics.HTTP_RESPONSE_BYTES.labels(page_type).inc(len(response.content))
+        return response
@@ -0,0 +1,262 @@
+"""Perceptual hashes of photos and near-duplicate search over them.
+
+    python -m src.similarity backfill [--workers 8]
+    python -m src.similarity similar <photo_id> [--distance 10]
+
+Every photo gets a 64-bit pHash (DCT of a 32x32 grayscale) and dHash
+(gradient of a 9x8 grayscale), stored signed in Photo.phash/Photo.dhash.
+Near duplicates are photos whose pHash is within a Hamming distance.
+
+HashIndex answers that query without scanning every hash (multi-index
+hashing). Each pHash is split into four 16-bit chunks, each with its own
+sorted table. If two hashes are within distance d, at least one chunk
+differs by at most d // 4 bits. So the lookup probes each table with every
+chunk value that close to the query's, and only the few candidates found
+get their full distance checked.
+"""
+
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from itertools import combinations
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+import structlog
+
+from sqlalchemy import or_
+
+from .config import Config
+from .database.database import db
+from .database.models import Photo
+
+logger = structlog.get_logger()
+
+CHUNKS = 4
+CHUNK_BITS = 16
+# Photos hashed this long before a refresh started are looked at again, in case their
+# transaction committed after it (or another process's clock is a little behind)
+HASHED_AT_OVERLAP = timedelta(minutes=5)
+POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+def phash(gray: np.ndarray) -> int:
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8]
+    return _pack(low > np.median(low))
+
+def dhash(gray: np.ndarray) -> int:
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    return _pack(small[:, 1:] > small[:, :-1])
+
+def _pack(bits: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(bits.flatten()).tobytes(), 'big')
+
+def to_signed(value: int) -> int:
+    """Unsigned 64-bit hash -> value that fits a signed BIGINT column"""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+def to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+def hash_gray(gray: np.ndarray) -> Tuple[int, int]:
+    """(phash, dhash) as stored on Photo"""
+    return to_signed(phash(gray)), to_signed(dhash(gray))
+
+def gray_from_pixmap(pix) -> np.ndarray:
+    """Grayscale view of a gray/RGB(A) PyMuPDF pixmap, without encoding it"""
+    samples = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.h, pix.w, pix.n)
+    if pix.n - pix.alpha == 1:
+        return samples[..., 0]
+    return cv2.cvtColor(np.ascontiguousarray(samples[..., :3]), cv2.COLOR_RGB2GRAY)
+
+def gray_from_bytes(data: bytes) -> Optional[np.ndarray]:
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    # Same conversion as gray_from_pixmap, so stored and backfilled hashes agree
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img is not None else None
+
+def hamming(a: np.ndarray, b: int) -> np.ndarray:
+    """Bit distance between each uint64 in a and b"""
+    return POPCOUNT[(a ^ np.uint64(b)).view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+_masks: Dict[int, np.ndarray] = {}
+
+def _chunk_masks(max_bits: int) -> np.ndarray:
+    """All CHUNK_BITS-bit masks with at most max_bits bits set"""
+    if max_bits not in _masks:
+        masks = [sum(1 << bit for bit in bits)
+                 for k in range(max_bits + 1) for bits in combinations(range(CHUNK_BITS), k)]
+        _masks[max_bits] = np.array(masks, dtype=np.uint16)
+    return _masks[max_bits]
+
+class HashIndex:
+    """In-memory multi-index over Photo.phash, loaded incrementally.
+
+    New photos are found by id. Older photos hashed later (by backfill() or
+    on demand) are found by Photo.hashed_at.
+    """
+
+    def __init__(self, refresh_interval: Optional[float] = None):
+        self.refresh_interval = Config.HASH_INDEX_REFRESH if refresh_interval is None else refresh_interval
+        # (ids, hashes, [(sorted chunk values, positions) per chunk]), swapped as a whole on refresh
+        self._state = (np.empty(0, np.int64), np.empty(0, np.uint64), [])
+        self._last_id = 0
+        self._hashed_since = None
+        self._refreshed_at = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._state[0])
+
+    def refresh(self, force: bool = False):
+        """Add photos hashed since the last refresh (at most every refresh_interval seconds)"""
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._refreshed_at is not None and now - self._refreshed_at < self.refresh_interval:
+                return
+            self._refreshed_at = now
+            started = datetime.utcnow()
+
+            new_ids, new_hashes = [], []
+            last_id = 0
+            while True:
+                session = db.get_session()
+                try:
+                    query = session.query(Photo.id, Photo.phash).filter(Photo.id > last_id, Photo.phash != None)
+                    if self._hashed_since is not None:
+                        query = query.filter(or_(Photo.id > self._last_id, Photo.hashed_at >= self._hashed_since))
+                    rows = query.order_by(Photo.id).limit(100000).all()
+                finally:
+                    session.close()
+                if not rows:
+                    break
+                last_id = rows[-1].id
+                new_ids.append(np.array([row.id for row in rows], dtype=np.int64))
+                new_hashes.append(np.array([to_unsigned(row.phash) for row in rows], dtype=np.uint64))
+
+            self._last_id = max(self._last_id, last_id)
+            self._hashed_since = started - HASHED_AT_OVERLAP
+            if new_ids:
+                self._add(np.concatenate(new_ids), np.concatenate(new_hashes))
+
+    def add(self, photo_id: int, value: int):
+        """Index one photo right away, e.g. one just hashed on demand (value as stored, signed)"""
+        with self._lock:
+            self._add(np.array([photo_id], dtype=np.int64), np.array([to_unsigned(value)], dtype=np.uint64))
+
+    def _add(self, new_ids: np.ndarray, new_hashes: np.ndarray):
+        ids, hashes, _ = self._state
+        # The hashed_at overlap returns some photos again
+        fresh = ~np.isin(new_ids, ids)
+        if not fresh.any():
+            return
+        ids = np.concatenate([ids, new_ids[fresh]])
+        hashes = np.concatenate([hashes, new_hashes[fresh]])
+        tables = []
+        for chunk in range(CHUNKS):
+            values = ((hashes >> np.uint64(chunk * CHUNK_BITS)) & np.uint64(0xFFFF)).astype(np.uint16)
+            positions = np.argsort(values, kind='stable').astype(np.int32)
+            tables.append((values[positions], positions))
+        self._state = (ids, hashes, tables)
+        logger.info(f"Hash index holds {len(ids)} photos")
+
+    def search(self, value: int, max_distance: int, exclude: Optional[int] = None) -> List[Tuple[int, int]]:
+        """(photo id, distance) for indexed photos within max_distance of an unsigned pHash, closest first"""
+        self.refresh()
+        ids, hashes, tables = self._state
+        if not len(ids):
+            return []
+
+        masks = _chunk_masks(max_distance // CHUNKS)
+        candidates = []
+        for chunk, (sorted_values, order) in enumerate(tables):
+            probes = np.uint16((value >> (chunk * CHUNK_BITS)) & 0xFFFF) ^ masks
+            starts = np.searchsorted(sorted_values, probes, side='left')
+            ends = np.searchsorted(sorted_values, probes, side='right')
+            candidates.extend(order[start:end] for start, end in zip(starts, ends) if end > start)
+        if not candidates:
+            return []
+
+        positions = np.unique(np.concatenate(candidates))
+        distances = hamming(hashes[positions], value)
+        keep = distances <= max_distance
+        positions, distances = positions[keep], distances[keep]
+        order = np.argsort(distances, kind='stable')
+        return [(int(ids[p]), int(d)) for p, d in zip(positions[order], distances[order]) if ids[p] != exclude]
+
+def backfill(workers: Optional[int] = None, batch_size: int = 1000) -> int:
+    """Hash photos extracted before hashing was added"""
+    from .storage.images import ImageStorage
+
+    storage = ImageStorage()
+
+    def load(local_path: str) -> Optional[Tuple[int, int]]:
+        data = storage.read(local_path)
+        gray = gray_from_bytes(data) if data else None
+        return hash_gray(gray) if gray is not None else None
+
+    hashed = 0
+    last_id = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            session = db.get_session()
+            try:
+                rows = session.query(Photo.id, Photo.local_path).filter(
+                    Photo.id > last_id, Photo.phash == None
+                ).order_by(Photo.id).limit(batch_size).all()
+            finally:
+                session.close()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            results = pool.map(load, [local_path for _, local_path in rows])
+            hashed_at = datetime.utcnow()
+            updates = [{'id': photo_id, 'phash': hashes[0], 'dhash': hashes[1], 'hashed_at': hashed_at}
+                       for (photo_id, _), hashes in zip(rows, results) if hashes]
+
+            session = db.get_session()
+            try:
+                session.bulk_update_mappings(Photo, updates)
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                session.close()
+            hashed += len(updates)
+            logger.info(f"Hashed {hashed} photos so far")
+    return hashed
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    backfill_parser = subparsers.add_parser('backfill', help='Hash photos that have no perceptual hash yet')
+    backfill_parser.add_argument('--workers', type=int, help='Decoder threads')
+    similar_parser = subparsers.add_parser('similar', help='List near duplicates of a photo')
+    similar_parser.add_argument('photo_id', type=int)
+    similar_parser.add_argument('--distance', type=int, default=Config.SIMILAR_MAX_DISTANCE, help='Maximum pHash bit distance')
+    args = parser.parse_args()
+
+    db.create_tables()
+    if args.command == 'backfill':
+        start = time.time()
+        print(f"Hashed {backfill(args.workers)} photos in {time.time() - start:.1f}s")
+    else:
+        session = db.get_session()
+        try:
+            photo = session.get(Photo, args.photo_id)
+        finally:
+            session.close()
+        if photo is None or photo.phash is None:
+            parser.error(f"Photo {args.photo_id} does not exist or has no hash yet")
+        index = HashIndex()
+        index.refresh(force=True)
+        start = time.perf_counter()
+        matches = index.search(to_unsigned(photo.phash), args.distance, exclude=photo.id)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(json.dumps({'photo_id': photo.id, 'indexed': len(index), 'search_ms': round(elapsed, 2),
+                          'matches': [{'id': photo_id, 'distance': distance} for photo_id, distance in matches]}, indent=2))
@@ -0,0 +1,88 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from typing import Optional, Tuple
+
+from ..config import Config
+
+CHUNK_SIZE = 1024 * 1024
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class BlobStore:
+    """Write-once, content-addressed file store.
+
+    Blobs are named by the SHA-256 of their content and sharded two levels
+    deep so no directory grows past a few hundred entries:
+
+        {root}/ab/cd/abcd...<sha256>.png
+
+    Writes go to a temp file in the shard directory and are linked into place,
+    so readers never see a partial file and an existing blob is never
+    overwritten. Storing identical content twice returns the existing blob.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or Config.IMAGE_STORE_DIR
+
+    def path_for(self, digest: str, ext: str = '.png') -> str:
+        return os.path.join(self.root, digest[:2], digest[2:4], digest + ext)
+
+    def exists(self, digest: str, ext: str = '.png') -> bool:
+        return os.path.exists(self.path_for(digest, ext))
+
+    def put(self, data: bytes, ext: str = '.png') -> Tuple[str, str]:
+        """Store bytes; returns (sha256, path)"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path_for(digest, ext)
+        if not os.path.exists(path):
+            self._write(path, lambda f: f.write(data))
+        return digest, path
+
+    def put_file(self, source: str, ext: Optional[str] = None, digest: Optional[str] = None) -> Tuple[str, str]:
+        """Store a copy of an existing file (hard-linked when possible); returns (sha256, path)"""
+        digest = digest or hash_file(source)
+        if ext is None:
+            ext = os.path.splitext(source)[1].lower() or '.png'
+        path = self.path_for(digest, ext)
+        if os.path.exists(path):
+            return digest, path
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            os.link(source, path)
+            return digest, path
+        except FileExistsError:
+            return digest, path
+        except OSError:
+            pass  # different filesystem or no hard links; fall back to a copy
+
+        def copy(f):
+            with open(source, 'rb') as src:
+                shutil.copyfileobj(src, f, CHUNK_SIZE)
+        self._write(path, copy)
+        return digest, path
+
+    def _write(self, path: str, writer):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                writer(f)
+            os.chmod(tmp_path, 0o444)
+            try:
+                # link() refuses to replace, so a concurrent writer of the same blob wins harmlessly
+                os.link(tmp_path, path)
+            except FileExistsError:
+                pass
+            except OSError:
+                os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
@@ -0,0 +1,80 @@
+import os
+from typing import Optional, Tuple
+
+from ..config import Config
+from .blob_store import BlobStore
+from .packs import PackStore
+
+STORAGE_BACKENDS = ('blobs', 'packs')
+
+class RangeFile:
+    """Read-only view of length bytes at offset in a file.
+
+    fileno() exposes the real descriptor, positioned at the range start, so
+    WSGI servers whose wsgi.file_wrapper uses sendfile (e.g. gunicorn, bounded
+    by Content-Length) send it without copying; others fall back to read().
+    """
+
+    def __init__(self, path: str, offset: int, length: int):
+        self._file = open(path, 'rb')
+        self._file.seek(offset)
+        self.remaining = length
+
+    def read(self, size: int = -1) -> bytes:
+        if self.remaining <= 0:
+            return b''
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        data = self._file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self) -> int:
+        return self._file.fileno()
+
+    def close(self):
+        self._file.close()
+
+class ImageStorage:
+    """Stores extracted images in the configured backend and resolves Photo.local_path.
+
+    local_path is either a regular file path (blob store or the old per-FCC-ID
+    layout) or 'pack:<sha256>' for an image that lives in a pack file.
+    """
+
+    def __init__(self, backend: Optional[str] = None):
+        self.backend = backend or Config.IMAGE_STORAGE
+        if self.backend not in STORAGE_BACKENDS:
+            raise ValueError(f"Unknown image storage backend: {self.backend}")
+        self.blobs = BlobStore()
+        self.packs = PackStore()
+
+    def put(self, data: bytes) -> Tuple[str, str]:
+        """Store image bytes; returns (sha256, local_path)"""
+        if self.backend == 'packs' and len(data) <= Config.PACK_MAX_IMAGE_BYTES:
+            return self.packs.put(data)
+        return self.blobs.put(data)
+
+    def locate(self, local_path: str) -> Optional[Tuple[str, int, int]]:
+        """(file path, offset, length) holding the image, or None if it is missing"""
+        digest = PackStore.digest_from_path(local_path)
+        if digest:
+            return self.packs.locate(digest)
+        if local_path and os.path.exists(local_path):
+            return local_path, 0, os.path.getsize(local_path)
+        return None
+
+    def exists(self, local_path: str) -> bool:
+        return self.locate(local_path) is not None
+
+    def open(self, local_path: str) -> Optional[RangeFile]:
+        location = self.locate(local_path)
+        return RangeFile(*location) if location else None
+
+    def read(self, local_path: str) -> Optional[bytes]:
+        f = self.open(local_path)
+        if f is None:
+            return None
+        try:
+            return f.read()
+        finally:
+            f.close()
@@ -0,0 +1,350 @@
+"""Check that photo/PDF rows and files on disk agree, and optionally repair them.
+
+    python -m src.storage.integrity [--repair] [--workers 16] [--verify-hashes] [--output issues.jsonl]
+
+Rows are read in id-keyset batches and their files checked, while the
+store, image, thumbnail and pack trees are walked shard by shard with
+os.scandir. Walked files are matched against the DB in batched IN lookups.
+Both sides run on one thread pool, so memory stays bounded by the batch
+size and the number of workers.
+
+Issues found:
+  orphan_file     file that no row references (includes stale thumbnails and temp files)
+  missing_file    row whose file (or pack entry) is gone
+  size_mismatch   file size differs from the size recorded on the row
+  corrupt_blob    blob whose content no longer matches its name (--verify-hashes)
+
+--repair deletes orphan files. Photo rows with missing or corrupt files are
+deleted. Processed PDF rows with missing or truncated sources are marked
+evicted, like the retention policy does, since their photos are already
+extracted. Unprocessed ones are queued again with their retry state cleared,
+so the PDF is downloaded. Recorded photo sizes are corrected. Files modified
+within --grace seconds are never treated as orphans, since the extractor may
+still be writing their row.
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+import structlog
+
+from ..config import Config
+from ..database.database import db
+from ..database.models import PDF, PackEntry, Photo
+from .blob_store import hash_file
+from .packs import PATH_PREFIX, PackStore
+
+logger = structlog.get_logger()
+
+ROW_BATCH_SIZE = 5000
+# Keeps IN (...) lookups under SQLite's bound-parameter limit on older builds
+LOOKUP_BATCH_SIZE = 900
+
+class IntegrityChecker:
+    def __init__(self, repair: bool = False, workers: Optional[int] = None, verify_hashes: bool = False,
+                 grace: float = 3600, output: Optional[str] = None):
+        self.repair = repair
+        self.workers = workers or min(32, (os.cpu_count() or 1) * 4)
+        self.verify_hashes = verify_hashes
+        self.cutoff = time.time() - grace
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        self._output = open(output, 'w') if output else None
+        # Bounds the number of row batches queued ahead of the workers
+        self._in_flight = threading.BoundedSemaphore(self.workers * 2)
+
+    def run(self) -> Dict[str, int]:
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [pool.submit(self._scan_tree, root, kind) for root, kind in self._scan_roots()]
+            futures += self._submit_row_batches(pool, Photo, self._check_photo_batch)
+            futures += self._submit_row_batches(pool, PDF, self._check_pdf_batch)
+            for future in futures:
+                future.result()
+
+        if self._output:
+            self._output.close()
+        self.stats['seconds'] = round(time.time() - start, 1)
+        logger.info(f"Integrity check {'and repair ' if self.repair else ''}of {self.stats['files']} files, "
+                    f"{self.stats['photo_rows']} photos and {self.stats['pdf_rows']} PDFs "
+                    f"took {self.stats['seconds']}s")
+        return dict(self.stats)
+
+    # Rows -> files
+
+    def _submit_row_batches(self, pool, model, check) -> List:
+        futures = []
+        last_id = 0
+        while True:
+            session = db.get_session()
+            try:
+                rows = session.query(model).filter(model.id > last_id).order_by(model.id).limit(ROW_BATCH_SIZE).all()
+            finally:
+                session.close()
+            if not rows:
+                return futures
+            last_id = rows[-1].id
+
+            self._in_flight.acquire()
+            future = pool.submit(check, rows)
+            future.add_done_callback(lambda _: self._in_flight.release())
+            futures.append(future)
+
+    def _check_photo_batch(self, photos: List[Photo]):
+        packed = {}
+        for photo in photos:
+            digest = PackStore.digest_from_path(photo.local_path)
+            if digest:
+                packed[digest] = None
+        for chunk in _chunks(list(packed), LOOKUP_BATCH_SIZE):
+            session = db.get_session()
+            try:
+                for entry in session.query(PackEntry).filter(PackEntry.sha256.in_(chunk)):
+                    packed[entry.sha256] = entry
+            finally:
+                session.close()
+
+        packs = PackStore()
+        missing, resized, corrupt = [], {}, []
+        for photo in photos:
+            self._count('photo_rows')
+            digest = PackStore.digest_from_path(photo.local_path)
+            if digest:
+                entry = packed.get(digest)
+                pack_path = packs.pack_path(entry.pack) if entry else None
+                if entry is None or not os.path.exists(pack_path) or os.path.getsize(pack_path) < entry.offset + entry.length:
+                    missing.append(photo)
+                    self._issue('missing_file', 'photos', photo.id, photo.local_path)
+                    continue
+                size = entry.length
+            else:
+                try:
+                    size = os.stat(photo.local_path).st_size
+                except OSError:
+                    missing.append(photo)
+                    self._issue('missing_file', 'photos', photo.id, photo.local_path)
+                    continue
+                if self.verify_hashes and photo.sha256 and hash_file(photo.local_path) != photo.sha256:
+                    corrupt.append(photo)
+                    self._issue('corrupt_blob', 'photos', photo.id, photo.local_path)
+                    continue
+
+            if photo.file_size is not None and photo.file_size != size:
+                resized[photo.id] = size
+                self._issue('size_mismatch', 'photos', photo.id, photo.local_path, expected=photo.file_size, actual=size)
+
+        if self.repair and (missing or resized or corrupt):
+            for photo in corrupt:
+                _remove(photo.local_path)
+            session = db.get_session()
+            try:
+                doomed = [photo.id for photo in missing + corrupt]
+                if doomed:
+                    session.query(Photo).filter(Photo.id.in_(doomed)).delete(synchronize_session=False)
+                for photo_id, size in resized.items():
+                    session.query(Photo).filter_by(id=photo_id).update({'file_size': size})
+                session.commit()
+                self._count('repaired', len(doomed) + len(resized))
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                session.close()
+
+    def _check_pdf_batch(self, pdfs: List[PDF]):
+        reset = []
+        for pdf in pdfs:
+            self._count('pdf_rows')
+            if not pdf.local_path:
+                continue
+            try:
+                size = os.stat(pdf.local_path).st_size
+            except OSError:
+                reset.append(pdf)
+                self._issue('missing_file', 'pdfs', pdf.id, pdf.local_path)
+                continue
+            # Compressed sources (retention policy) are smaller by design
+            if pdf.file_size is not None and size != pdf.file_size and not pdf.local_path.endswith('.gz'):
+                reset.append(pdf)
+                self._issue('size_mismatch', 'pdfs', pdf.id, pdf.local_path, expected=pdf.file_size, actual=size)
+
+        if self.repair and reset:
+            evicted = [pdf.id for pdf in reset if pdf.processed]
+            requeued = [pdf.id for pdf in reset if not pdf.processed]
+            session = db.get_session()
+            try:
+                # Processed PDFs keep their photos, so they are only marked evicted, as retention.evict() does
+                if evicted:
+                    session.query(PDF).filter(PDF.id.in_(evicted)).update({
+                        'local_path': None, 'stored_size': None, 'downloaded': False, 'evicted_at': datetime.utcnow()
+                    }, synchronize_session=False)
+                # The rest are queued again with a fresh retry budget
+                if requeued:
+                    session.query(PDF).filter(PDF.id.in_(requeued)).update({
+                        'local_path': None, 'stored_size': None, 'downloaded': False,
+                        'attempts': 0, 'next_attempt_at': None, 'dead_letter': False
+                    }, synchronize_session=False)
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                session.close()
+            for pdf in reset:
+                _remove(pdf.local_path)
+            self._count('repaired', len(reset))
+
+    # Files -> rows
+
+    def _scan_roots(self) -> Iterator:
+        """(directory, kind) per shard, so each top-level subtree is its own task"""
+        for root, kind in ((Config.IMAGE_STORE_DIR, 'store'), (Config.IMAGES_DIR, 'images'),
+                           (Config.THUMBNAILS_DIR, 'thumbnails')):
+            if not os.path.isdir(root):
+                continue
+            loose = []
+            for entry in os.scandir(root):
+                if entry.is_dir(follow_symlinks=False):
+                    yield entry.path, kind
+                else:
+                    loose.append(entry.path)
+            if loose:
+                self._check_files(loose, kind)
+        if os.path.isdir(Config.PACK_DIR):
+            yield Config.PACK_DIR, 'packs'
+
+    def _scan_tree(self, root: str, kind: str):
+        if kind == 'packs':
+            return self._check_packs(root)
+        batch = []
+        for path in _walk(root):
+            batch.append(path)
+            if len(batch) >= LOOKUP_BATCH_SIZE:
+                self._check_files(batch, kind)
+                batch = []
+        if batch:
+            self._check_files(batch, kind)
+
+    def _check_files(self, paths: List[str], kind: str):
+        self._count('files', len(paths))
+        if kind == 'thumbnails':
+            names = {os.path.splitext(os.path.basename(path))[0]: path for path in paths}
+            known = self._lookup(Photo.sha256, list(names))
+            orphans = [path for name, path in names.items() if name not in known]
+        else:
+            thumbs = {path for path in paths if os.path.basename(os.path.dirname(path)) == 'thumbnails'}
+            files = [path for path in paths if path not in thumbs]
+            known = self._lookup(Photo.local_path, files)
+            if kind == 'images':
+                known |= self._lookup(PDF.local_path, [path for path in files if path not in known])
+            orphans = [path for path in files if path not in known]
+            # Old-layout thumbnails belong to the image next to their directory
+            for thumb in thumbs:
+                source = os.path.join(os.path.dirname(os.path.dirname(thumb)),
+                                      os.path.basename(thumb)[len('thumb_'):])
+                if not os.path.exists(source):
+                    orphans.append(thumb)
+
+        for path in orphans:
+            self._orphan(path)
+
+    def _check_packs(self, root: str):
+        session = db.get_session()
+        try:
+            referenced = {name for (name,) in session.query(PackEntry.pack).distinct()}
+            unreferenced = session.query(PackEntry).filter(
+                ~PackEntry.sha256.in_(session.query(Photo.sha256).filter(Photo.local_path.like(PATH_PREFIX + '%')))
+            ).count()
+        finally:
+            session.close()
+        if unreferenced:
+            # Not repaired here: `python -m src.storage.packs compact` rewrites the packs
+            self._count('dead_pack_entries', unreferenced)
+
+        for entry in os.scandir(root):
+            if entry.is_file(follow_symlinks=False):
+                self._count('files')
+                if entry.name not in referenced:
+                    self._orphan(entry.path)
+
+    def _lookup(self, column, values: List[str]) -> set:
+        if not values:
+            return set()
+        session = db.get_session()
+        try:
+            return {value for (value,) in session.query(column).filter(column.in_(values)).distinct()}
+        finally:
+            session.close()
+
+    def _orphan(self, path: str):
+        try:
+            if os.stat(path).st_mtime > self.cutoff:
+                self._count('skipped_recent')
+                return
+        except FileNotFoundError:
+            return
+        self._issue('orphan_file', None, None, path)
+        if self.repair:
+            _remove(path)
+            self._count('repaired')
+
+    # Reporting
+
+    def _issue(self, kind: str, table: Optional[str], row_id: Optional[int], path: str, **details):
+        with self._lock:
+            self.stats[kind] += 1
+            if self._output:
+                record = {'type': kind, 'table': table, 'id': row_id, 'path': path, 'repaired': self.repair}
+                record.update(details)
+                self._output.write(json.dumps(record) + '\n')
+
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self.stats[key] += amount
+
+def _walk(root: str) -> Iterator[str]:
+    """Depth-first file paths under root, using scandir's cached d_type"""
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield entry.path
+        except FileNotFoundError:
+            continue
+
+def _chunks(values: List, size: int) -> Iterator[List]:
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+def _remove(path: Optional[str]):
+    if not path or path.startswith(PATH_PREFIX):
+        return
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repair', action='store_true', help='Fix what was found (default: report only)')
+    parser.add_argument('--workers', type=int, help='Scanner threads (default: 4x CPUs, max 32)')
+    parser.add_argument('--verify-hashes', action='store_true', help='Re-hash blobs to detect corruption (slow)')
+    parser.add_argument('--grace', type=float, default=3600, help='Ignore files modified within this many seconds')
+    parser.add_argument('--output', help='Write every issue as a JSON line to this file')
+    args = parser.parse_args()
+
+    db.create_tables()
+    stats = IntegrityChecker(args.repair, args.workers, args.verify_hashes, args.grace, args.output).run()
+    print(json.dumps(stats, indent=2, sort_keys=True))
@@ -0,0 +1,133 @@
+"""Move photos from data/images/{fcc_id}/ into the content-addressed store.
+
+    python -m src.storage.migrate --workers 8 [--dry-run] [--keep]
+
+Files are hashed in parallel and linked (or copied) into the store. Identical
+files collapse to one blob, and every Photo row gets the blob path and
+sha256. Originals and their cached thumbnails are removed once the rows are
+committed, unless --keep is given.
+"""
+
+import argparse
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+
+import structlog
+
+from ..config import Config
+from ..database.database import db
+from ..database.models import Photo
+from .blob_store import BlobStore, hash_file
+
+logger = structlog.get_logger()
+
+def _store_file(job: Tuple[str, str, bool]) -> Tuple[str, Optional[str], Optional[str], Optional[str]]:
+    """Worker: hash one file and (unless dry run) add it to the store"""
+    path, store_root, dry_run = job
+    try:
+        if dry_run:
+            digest = hash_file(path)
+            return path, digest, None, None
+        digest, blob_path = BlobStore(store_root).put_file(path)
+        return path, digest, blob_path, None
+    except Exception as e:
+        return path, None, None, str(e)
+
+def _remove_original(path: str):
+    thumb = os.path.join(os.path.dirname(path), 'thumbnails', f"thumb_{os.path.basename(path)}")
+    for target in (path, thumb):
+        try:
+            os.remove(target)
+        except FileNotFoundError:
+            pass
+
+def migrate(workers: Optional[int] = None, batch_size: int = 1000, dry_run: bool = False,
+            keep: bool = False) -> Dict[str, int]:
+    store = BlobStore()
+    stats = defaultdict(int)
+    digests = set()
+    last_id = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            session = db.get_session()
+            try:
+                rows = session.query(Photo.id, Photo.local_path).filter(
+                    Photo.sha256 == None,
+                    Photo.id > last_id
+                ).order_by(Photo.id).limit(batch_size).all()
+            finally:
+                session.close()
+
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            # Photos from different PDFs of a product could share one (overwritten) path
+            ids_by_path = defaultdict(list)
+            for photo_id, local_path in rows:
+                if local_path and os.path.exists(local_path):
+                    ids_by_path[local_path].append(photo_id)
+                else:
+                    stats['missing'] += 1
+
+            jobs = [(path, store.root, dry_run) for path in ids_by_path]
+            results = list(pool.map(_store_file, jobs, chunksize=max(1, len(jobs) // (4 * (workers or os.cpu_count() or 1)))))
+
+            session = db.get_session()
+            try:
+                for path, digest, blob_path, error in results:
+                    if error:
+                        logger.error(f"Could not migrate {path}: {error}")
+                        stats['errors'] += 1
+                        continue
+                    stats['files'] += 1
+                    if digest in digests:
+                        stats['duplicates'] += 1
+                        stats['bytes_saved'] += os.path.getsize(path)
+                    digests.add(digest)
+                    if dry_run:
+                        stats['photos'] += len(ids_by_path[path])
+                    else:
+                        # By path, not by the ids in this batch: photos in later batches can share the
+                        # file, and it is removed below
+                        stats['photos'] += session.query(Photo).filter(
+                            Photo.local_path == path, Photo.sha256 == None
+                        ).update({'local_path': blob_path, 'sha256': digest}, synchronize_session=False)
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                session.close()
+
+            if not dry_run and not keep:
+                for path, digest, blob_path, error in results:
+                    if not error:
+                        _remove_original(path)
+
+            logger.info(f"Migrated {stats['files']} files ({stats['duplicates']} duplicates) so far")
+
+    stats['blobs'] = len(digests)
+    return dict(stats)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Hashing processes')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Photo rows per batch')
+    parser.add_argument('--dry-run', action='store_true', help='Hash and report duplicates without changing anything')
+    parser.add_argument('--keep', action='store_true', help='Keep the original files after migrating')
+    args = parser.parse_args()
+
+    Config.ensure_dirs()
+    db.create_tables()
+
+    start = time.time()
+    stats = migrate(args.workers, args.batch_size, args.dry_run, args.keep)
+    print(f"{'Would migrate' if args.dry_run else 'Migrated'} {stats.get('files', 0)} files "
+          f"for {stats.get('photos', 0)} photos into {stats['blobs']} blobs in {time.time() - start:.1f}s: "
+          f"{stats.get('duplicates', 0)} duplicates ({stats.get('bytes_saved', 0) / 1024 / 1024:.1f} MB saved), "
+          f"{stats.get('missing', 0)} missing, {stats.get('errors', 0)} errors")
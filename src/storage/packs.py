@@ -0,0 +1,317 @@
+"""Append-only pack files for small images.
+
+    python -m src.storage.packs compact [--min-dead-ratio 0.25]
+    python -m src.storage.packs import-blobs
+
+Each pack holds many images back to back. Every record is a header (magic,
+sha256, length) followed by the image bytes, so a pack can be re-indexed
+from its own contents. The pack_entries table maps sha256 to (pack, offset,
+length). Packs are named by day ({PACK_DIR}/20240131-000.pack) and roll over
+at PACK_MAX_BYTES.
+"""
+
+import argparse
+import fcntl
+import hashlib
+import os
+import re
+import struct
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import structlog
+from sqlalchemy.exc import IntegrityError
+
+from ..config import Config
+from ..database.database import db
+from ..database.models import PackEntry, Photo
+
+logger = structlog.get_logger()
+
+PATH_PREFIX = 'pack:'
+MAGIC = b'ESPK'
+HEADER = struct.Struct('>4s32sQ')
+PACK_NAME = re.compile(r'^(\d{8})-(\d{3})\.pack$')
+
+class PackStore:
+    """Writes images into the current day's pack and reads them back by sha256"""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or Config.PACK_DIR
+
+    @staticmethod
+    def local_path(digest: str) -> str:
+        """Photo.local_path value for a packed image"""
+        return PATH_PREFIX + digest
+
+    @staticmethod
+    def digest_from_path(local_path: str) -> Optional[str]:
+        return local_path[len(PATH_PREFIX):] if local_path and local_path.startswith(PATH_PREFIX) else None
+
+    def pack_path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def put(self, data: bytes) -> Tuple[str, str]:
+        """Append an image unless already packed; returns (sha256, local_path)
+
+        The caller commits the Photo row that references the image after this
+        returns, so until then compaction sees the entry as dead. An image
+        found in a closed pack is first moved into today's pack, which
+        compaction leaves alone.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        location = self.locate(digest)
+        while location and self._closed(os.path.basename(location[0])):
+            location = self._reopen(digest, data, location)
+        if location:
+            return digest, self.local_path(digest)
+
+        name, offset = self._append(digest, data)
+
+        session = db.get_session()
+        try:
+            session.add(PackEntry(sha256=digest, pack=name, offset=offset, length=len(data)))
+            session.commit()
+        except IntegrityError:
+            # Another writer packed the same image first; our copy is reclaimed by compaction
+            session.rollback()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+        return digest, self.local_path(digest)
+
+    def _reopen(self, digest: str, data: bytes, location: Tuple[str, int, int]) -> Optional[Tuple[str, int, int]]:
+        """Copy an image out of a closed pack and point its entry at the copy.
+
+        Holds a shared lock on the closed pack, which compact() locks
+        exclusively, so the entry can't be dropped in between. Returns the
+        entry's location afterwards (None if compaction already removed it).
+        """
+        try:
+            f = open(location[0], 'rb')
+        except FileNotFoundError:
+            return self.locate(digest)  # compacted since we looked
+        with f:
+            fcntl.flock(f, fcntl.LOCK_SH)
+            current = self.locate(digest)
+            if current != location:
+                return current
+
+            name, offset = self._append(digest, data)
+            session = db.get_session()
+            try:
+                session.query(PackEntry).filter_by(sha256=digest).update({'pack': name, 'offset': offset})
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                session.close()
+            return self.pack_path(name), offset, len(data)
+
+    def locate(self, digest: str) -> Optional[Tuple[str, int, int]]:
+        """(pack file path, offset, length) for a packed image, or None"""
+        session = db.get_session()
+        try:
+            entry = session.query(PackEntry).filter_by(sha256=digest).first()
+            if entry is None:
+                return None
+            return self.pack_path(entry.pack), entry.offset, entry.length
+        finally:
+            session.close()
+
+    def read(self, digest: str) -> Optional[bytes]:
+        location = self.locate(digest)
+        if location is None:
+            return None
+        path, offset, length = location
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            return os.pread(fd, length, offset)
+        finally:
+            os.close(fd)
+
+    def _append(self, digest: str, data: bytes) -> Tuple[str, int]:
+        """Append one record under an exclusive lock; returns (pack name, data offset)"""
+        os.makedirs(self.root, exist_ok=True)
+        day = datetime.utcnow().strftime('%Y%m%d')
+
+        while True:
+            name = self._current_pack(day)
+            with open(self.pack_path(name), 'ab') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    start = f.seek(0, os.SEEK_END)
+                    if start >= Config.PACK_MAX_BYTES:
+                        continue  # another writer filled it; roll over
+                    f.write(HEADER.pack(MAGIC, bytes.fromhex(digest), len(data)))
+                    f.write(data)
+                    f.flush()
+                    return name, start + HEADER.size
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _current_pack(self, day: str) -> str:
+        sequences = [int(match.group(2)) for match in map(PACK_NAME.match, os.listdir(self.root))
+                     if match and match.group(1) == day]
+        sequence = max(sequences, default=0)
+        name = f"{day}-{sequence:03d}.pack"
+        path = self.pack_path(name)
+        if os.path.exists(path) and os.path.getsize(path) >= Config.PACK_MAX_BYTES:
+            name = f"{day}-{sequence + 1:03d}.pack"
+        return name
+
+    @staticmethod
+    def _closed(name: str) -> bool:
+        """Packs from before today are no longer appended to and may be compacted"""
+        return name[:8] < datetime.utcnow().strftime('%Y%m%d')
+
+    def compact(self, min_dead_ratio: float = 0.25) -> Dict[str, int]:
+        """Rewrite closed packs whose unreferenced bytes exceed min_dead_ratio.
+
+        An entry is dead once no Photo references it. Today's packs are still
+        being appended to and are left alone. Live records are copied into
+        the next free pack name for that day, their offsets are updated in one
+        transaction, and then the old pack is deleted, all under an exclusive
+        lock on the old pack so put() can't reuse an entry being dropped.
+        """
+        stats = defaultdict(int)
+        if not os.path.isdir(self.root):
+            return dict(stats)
+
+        for name in sorted(os.listdir(self.root)):
+            match = PACK_NAME.match(name)
+            if not match or not self._closed(name):
+                continue
+
+            path = self.pack_path(name)
+            with open(path, 'rb') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                self._compact_pack(name, match.group(1), min_dead_ratio, stats)
+
+        return dict(stats)
+
+    def _compact_pack(self, name: str, day: str, min_dead_ratio: float, stats: Dict[str, int]):
+        path = self.pack_path(name)
+        size = os.path.getsize(path)
+        session = db.get_session()
+        try:
+            entries = session.query(PackEntry).filter_by(pack=name).order_by(PackEntry.offset).all()
+            digests = [entry.sha256 for entry in entries]
+            referenced = {digest for (digest,) in session.query(Photo.sha256).filter(
+                Photo.sha256.in_(digests), Photo.local_path.like(PATH_PREFIX + '%')).distinct()} if digests else set()
+            live = [entry for entry in entries if entry.sha256 in referenced]
+            dead = [entry for entry in entries if entry.sha256 not in referenced]
+
+            live_bytes = sum(HEADER.size + entry.length for entry in live)
+            if size == 0 or (size - live_bytes) / size < min_dead_ratio:
+                return
+
+            new_name = None
+            if live:
+                new_name = self._next_free_name(day)
+                new_offsets = self._copy_live(path, self.pack_path(new_name), live)
+                for entry in live:
+                    entry.pack = new_name
+                    entry.offset = new_offsets[entry.sha256]
+            for entry in dead:
+                session.delete(entry)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+        os.remove(path)
+        stats['packs_compacted'] += 1
+        stats['entries_removed'] += len(dead)
+        stats['bytes_reclaimed'] += size - live_bytes
+        logger.info(f"Compacted {name} -> {new_name or '(deleted)'}: "
+                    f"{len(dead)} dead entries, {(size - live_bytes) / 1024 / 1024:.1f} MB reclaimed")
+
+    def _next_free_name(self, day: str) -> str:
+        sequences = [int(match.group(2)) for match in map(PACK_NAME.match, os.listdir(self.root))
+                     if match and match.group(1) == day]
+        return f"{day}-{max(sequences, default=-1) + 1:03d}.pack"
+
+    def _copy_live(self, source: str, target: str, live) -> Dict[str, int]:
+        offsets = {}
+        tmp_path = target + '.tmp'
+        with open(source, 'rb') as src, open(tmp_path, 'wb') as dst:
+            for entry in live:
+                src.seek(entry.offset - HEADER.size)
+                record = src.read(HEADER.size + entry.length)
+                offsets[entry.sha256] = dst.tell() + HEADER.size
+                dst.write(record)
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(tmp_path, target)
+        return offsets
+
+    def import_blobs(self) -> Dict[str, int]:
+        """Move existing small blob-store photos into packs"""
+        from .blob_store import BlobStore
+
+        stats = defaultdict(int)
+        store_root = BlobStore().root
+        last_id = 0
+        while True:
+            session = db.get_session()
+            try:
+                rows = session.query(Photo.id, Photo.local_path).filter(
+                    Photo.id > last_id,
+                    Photo.sha256 != None,
+                    Photo.local_path.like(os.path.join(store_root, '') + '%')
+                ).order_by(Photo.id).limit(Config.PDF_BATCH_SIZE).all()
+            finally:
+                session.close()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            for photo_id, local_path in rows:
+                if not os.path.exists(local_path) or os.path.getsize(local_path) > Config.PACK_MAX_IMAGE_BYTES:
+                    stats['skipped'] += 1
+                    continue
+                with open(local_path, 'rb') as f:
+                    digest, packed_path = self.put(f.read())
+
+                session = db.get_session()
+                try:
+                    session.query(Photo).filter(Photo.local_path == local_path).update(
+                        {'local_path': packed_path}, synchronize_session=False)
+                    session.commit()
+                except Exception:
+                    session.rollback()
+                    raise
+                finally:
+                    session.close()
+
+                os.remove(local_path)
+                stats['imported'] += 1
+
+        return dict(stats)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    compact_parser = subparsers.add_parser('compact', help='Reclaim space held by deleted images')
+    compact_parser.add_argument('--min-dead-ratio', type=float, default=0.25,
+                                help='Only rewrite packs with at least this fraction of dead bytes')
+    subparsers.add_parser('import-blobs', help='Move small blob-store images into packs')
+    args = parser.parse_args()
+
+    db.create_tables()
+    start = time.time()
+    store = PackStore()
+    if args.command == 'compact':
+        stats = store.compact(args.min_dead_ratio)
+    else:
+        stats = store.import_blobs()
+    print(f"{args.command}: {stats} in {time.time() - start:.1f}s")
@@ -0,0 +1,237 @@
+"""Deep Zoom (DZI) tile pyramids for large photos, built on first access.
+
+    python -m src.storage.tiles reclaim [--budget-mb 1024]
+
+A photo's pyramid is built the first time its descriptor or one of its tiles
+is requested. The image is decoded once, halved level by level down to 1x1,
+and cut into TILE_SIZE tiles with a one-pixel overlap. The viewer then only
+fetches the tiles in view at the current zoom.
+
+Pyramids are keyed by the photo's SHA-256, so duplicate photos share one:
+
+    TILE_CACHE_DIR/ab/<sha256>/pyramid.json        size, tile layout, bytes used
+    TILE_CACHE_DIR/ab/<sha256>/<level>/<col>_<row>.jpg
+
+pyramid.json is written last and marks the pyramid complete. Its mtime
+tracks the last access. Each process keeps a running total of the bytes
+cached. Once a build takes it past TILE_CACHE_MB, the cache is scanned and the
+least recently used pyramids are deleted. Deleted pyramids are simply rebuilt
+when they are next viewed.
+"""
+
+import argparse
+import json
+import math
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+import cv2
+import numpy as np
+import structlog
+
+from ..config import Config
+
+logger = structlog.get_logger()
+
+OVERLAP = 1
+MANIFEST = 'pyramid.json'
+# pyramid.json mtimes are refreshed at most this often (seconds) to keep tile requests cheap
+TOUCH_INTERVAL = 60
+
+def decode(data: bytes) -> Optional[np.ndarray]:
+    """BGR image from encoded bytes, or None"""
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR) if data else None
+
+def max_level(width: int, height: int) -> int:
+    return int(math.ceil(math.log2(max(width, height, 1))))
+
+def descriptor(pyramid: Dict) -> str:
+    """DZI XML for a pyramid manifest"""
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" TileSize="{pyramid["tile_size"]}" '
+        f'Overlap="{pyramid["overlap"]}" Format="jpg">'
+        f'<Size Width="{pyramid["width"]}" Height="{pyramid["height"]}"/></Image>'
+    )
+
+class TileCache:
+    def __init__(self, root: Optional[str] = None, budget_mb: Optional[float] = None):
+        self.root = root or Config.TILE_CACHE_DIR
+        self.budget_bytes = (Config.TILE_CACHE_MB if budget_mb is None else budget_mb) * 1024 * 1024
+        self.tile_size = Config.TILE_SIZE
+        self.quality = Config.TILE_JPEG_QUALITY
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        # Running total of cached bytes; None until the first scan. Pyramids built by other
+        # processes aren't counted until the next scan, which resets it to what is on disk.
+        self._usage = None
+
+    def _dir(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def _lock(self, key: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _release_lock(self, key: str, lock: threading.Lock):
+        # Threads still waiting on it find the finished pyramid; later ones get a fresh lock
+        with self._locks_lock:
+            if self._locks.get(key) is lock:
+                del self._locks[key]
+
+    def pyramid(self, key: str) -> Optional[Dict]:
+        """Manifest of a complete pyramid, or None"""
+        path = os.path.join(self._dir(key), MANIFEST)
+        try:
+            with open(path) as f:
+                pyramid = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - os.path.getmtime(path) > TOUCH_INTERVAL:
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        return pyramid
+
+    def ensure(self, key: str, load: Callable[[], Optional[np.ndarray]]) -> Optional[Dict]:
+        """Manifest of the pyramid for key, building it from load() if needed"""
+        pyramid = self.pyramid(key)
+        if pyramid:
+            return pyramid
+        lock = self._lock(key)
+        try:
+            with lock:
+                pyramid = self.pyramid(key)
+                if pyramid:
+                    return pyramid
+                image = load()
+                if image is None:
+                    return None
+                pyramid = self._build(key, image)
+        finally:
+            self._release_lock(key, lock)
+
+        with self._locks_lock:
+            if self._usage is not None:
+                self._usage += pyramid['bytes']
+            over_budget = self.budget_bytes > 0 and (self._usage is None or self._usage > self.budget_bytes)
+        # Only scans the cache when the running total says it may be over budget
+        if over_budget:
+            self.reclaim(keep=key)
+        return pyramid
+
+    def tile_path(self, key: str, level: int, col: int, row: int) -> str:
+        return os.path.join(self._dir(key), str(level), f"{col}_{row}.jpg")
+
+    def _build(self, key: str, image: np.ndarray) -> Dict:
+        start = time.time()
+        height, width = image.shape[:2]
+        top = max_level(width, height)
+        os.makedirs(os.path.dirname(self._dir(key)), exist_ok=True)
+        # Built next to its final location and renamed into place, so other processes never see half a pyramid
+        build_dir = tempfile.mkdtemp(prefix=f".{key}-", dir=os.path.dirname(self._dir(key)))
+        total = 0
+        tiles = 0
+        try:
+            level_image = image
+            for level in range(top, -1, -1):
+                if level < top:
+                    level_height, level_width = level_image.shape[:2]
+                    level_image = cv2.resize(
+                        level_image, (max(1, (level_width + 1) // 2), max(1, (level_height + 1) // 2)),
+                        interpolation=cv2.INTER_AREA
+                    )
+                total += self._cut(level_image, os.path.join(build_dir, str(level)))
+                tiles += len(os.listdir(os.path.join(build_dir, str(level))))
+
+            pyramid = {'width': width, 'height': height, 'tile_size': self.tile_size,
+                       'overlap': OVERLAP, 'levels': top + 1, 'tiles': tiles, 'bytes': total}
+            with open(os.path.join(build_dir, MANIFEST), 'w') as f:
+                json.dump(pyramid, f)
+            try:
+                os.rename(build_dir, self._dir(key))
+            except OSError:
+                # Another process finished the same pyramid first
+                shutil.rmtree(build_dir, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(build_dir, ignore_errors=True)
+            raise
+
+        logger.info(f"Built {width}x{height} tile pyramid for {key[:12]}: {tiles} tiles, "
+                    f"{total / 1024 / 1024:.1f} MB in {time.time() - start:.2f}s")
+        return pyramid
+
+    def _cut(self, image: np.ndarray, level_dir: str) -> int:
+        os.makedirs(level_dir)
+        height, width = image.shape[:2]
+        size = self.tile_size
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        written = 0
+        for row in range(int(math.ceil(height / size))):
+            top = max(0, row * size - OVERLAP)
+            bottom = min(height, (row + 1) * size + OVERLAP)
+            for col in range(int(math.ceil(width / size))):
+                left = max(0, col * size - OVERLAP)
+                right = min(width, (col + 1) * size + OVERLAP)
+                ok, encoded = cv2.imencode('.jpg', image[top:bottom, left:right], params)
+                if not ok:
+                    raise ValueError(f"Could not encode tile {col}_{row}")
+                with open(os.path.join(level_dir, f"{col}_{row}.jpg"), 'wb') as f:
+                    f.write(encoded)
+                written += len(encoded)
+        return written
+
+    def reclaim(self, budget_bytes: Optional[float] = None, keep: Optional[str] = None) -> Dict[str, int]:
+        """Delete least recently viewed pyramids until usage fits the budget (0 = unlimited)"""
+        budget_bytes = self.budget_bytes if budget_bytes is None else budget_bytes
+        stats = {'usage': 0, 'evicted': 0, 'freed': 0}
+        if budget_bytes <= 0 or not os.path.isdir(self.root):
+            return stats
+
+        pyramids = []
+        for shard in os.scandir(self.root):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.startswith('.'):
+                    continue
+                manifest = os.path.join(entry.path, MANIFEST)
+                try:
+                    with open(manifest) as f:
+                        size = json.load(f)['bytes']
+                    pyramids.append((os.path.getmtime(manifest), size, entry.name, entry.path))
+                except (OSError, ValueError, KeyError):
+                    continue
+        stats['usage'] = sum(size for _, size, _, _ in pyramids)
+
+        for _, size, key, path in sorted(pyramids):
+            if stats['usage'] - stats['freed'] <= budget_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            stats['freed'] += size
+            stats['evicted'] += 1
+
+        with self._locks_lock:
+            self._usage = stats['usage'] - stats['freed']
+
+        if stats['evicted']:
+            logger.info(f"Evicted {stats['evicted']} tile pyramids ({stats['freed'] / 1024 / 1024:.1f} MB, "
+                        f"usage was {stats['usage'] / 1024 / 1024:.1f} MB)")
+        return stats
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    reclaim_parser = subparsers.add_parser('reclaim', help='Evict least recently viewed pyramids down to a budget')
+    reclaim_parser.add_argument('--budget-mb', type=float, help='Default: TILE_CACHE_MB')
+    args = parser.parse_args()
+
+    cache = TileCache(budget_mb=args.budget_mb)
+    print(cache.reclaim())
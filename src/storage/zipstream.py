@@ -0,0 +1,177 @@
+"""ZIP archives streamed straight from the image store, with byte-range access.
+
+Entries are stored (method 0): the photos are already compressed PNG/JPEG.
+Every header is derived from the entry list alone, so the archive's size is
+known before any byte is sent and any byte range can be generated on its
+own, without a temp file or an in-memory copy. That is what lets a client
+resume an interrupted multi-GB download with Range.
+
+Each local header carries the entry's CRC-32, so readers that stream through
+local headers (Java's ZipInputStream, `unzip -` pipes) work too. The CRC is
+computed by reading the entry once just before its header is sent, and is
+cached by content hash because the store is content addressed. ZIP64 records
+are added only when offsets pass 4 GiB.
+"""
+
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+from .images import RangeFile
+
+CHUNK_SIZE = 1024 * 1024
+CRC_CACHE_SIZE = 100000
+
+LOCAL_HEADER = struct.Struct('<IHHHHHIIIHH')
+CENTRAL_HEADER = struct.Struct('<IHHHHHHIIIHHHHHII')
+END_RECORD = struct.Struct('<IHHHHIIH')
+ZIP64_END_RECORD = struct.Struct('<IQHHIIQQQQ')
+ZIP64_END_LOCATOR = struct.Struct('<IIQI')
+ZIP64_OFFSET_EXTRA = struct.Struct('<HHQ')
+
+UTF8_NAMES = 0x800
+MAX_32 = 0xFFFFFFFF
+MAX_16 = 0xFFFF
+
+class ZipEntry(NamedTuple):
+    name: str
+    path: str  # file holding the data, at offset (a blob, or a pack)
+    offset: int
+    length: int
+    modified: datetime
+    key: str  # content hash, for the CRC cache
+
+_crc_cache = OrderedDict()
+_crc_lock = threading.Lock()
+
+def _cached_crc(key: str) -> Optional[int]:
+    with _crc_lock:
+        crc = _crc_cache.get(key)
+        if crc is not None:
+            _crc_cache.move_to_end(key)
+        return crc
+
+def _cache_crc(key: str, crc: int):
+    with _crc_lock:
+        _crc_cache[key] = crc
+        if len(_crc_cache) > CRC_CACHE_SIZE:
+            _crc_cache.popitem(last=False)
+
+def crc32(entry: ZipEntry) -> int:
+    crc = _cached_crc(entry.key)
+    if crc is None:
+        crc = 0
+        f = RangeFile(entry.path, entry.offset, entry.length)
+        try:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                crc = zlib.crc32(chunk, crc)
+        finally:
+            f.close()
+        _cache_crc(entry.key, crc)
+    return crc
+
+def _dos_time(moment: datetime) -> Tuple[int, int]:
+    moment = max(moment, datetime(1980, 1, 1))
+    return (moment.hour << 11) | (moment.minute << 5) | (moment.second // 2), \
+        ((moment.year - 1980) << 9) | (moment.month << 5) | moment.day
+
+class ZipStream:
+    """A stored ZIP of entries whose bytes are generated on demand"""
+
+    def __init__(self, entries: List[ZipEntry]):
+        self.entries = entries
+        self._names = [entry.name.encode('utf-8') for entry in entries]
+
+        # (kind, entry index, length) in archive order; offsets are cumulative
+        self.segments = []
+        self.local_offsets = []
+        position = 0
+        for index, entry in enumerate(entries):
+            self.local_offsets.append(position)
+            header_length = LOCAL_HEADER.size + len(self._names[index])
+            self.segments.append(('local', index, header_length))
+            self.segments.append(('data', index, entry.length))
+            position += header_length + entry.length
+
+        self.central_offset = position
+        for index in range(len(entries)):
+            length = CENTRAL_HEADER.size + len(self._names[index])
+            if self.local_offsets[index] >= MAX_32:
+                length += ZIP64_OFFSET_EXTRA.size
+            self.segments.append(('central', index, length))
+            position += length
+        self.central_size = position - self.central_offset
+
+        self.zip64 = self.central_offset >= MAX_32 or self.central_size >= MAX_32 or len(entries) >= MAX_16
+        end_length = END_RECORD.size + (ZIP64_END_RECORD.size + ZIP64_END_LOCATOR.size if self.zip64 else 0)
+        self.segments.append(('end', None, end_length))
+        self.size = position + end_length
+
+    def _local_header(self, index: int) -> bytes:
+        entry = self.entries[index]
+        mod_time, mod_date = _dos_time(entry.modified)
+        return LOCAL_HEADER.pack(
+            0x04034b50, 20, UTF8_NAMES, 0, mod_time, mod_date,
+            crc32(entry), entry.length, entry.length, len(self._names[index]), 0
+        ) + self._names[index]
+
+    def _central_header(self, index: int) -> bytes:
+        entry = self.entries[index]
+        mod_time, mod_date = _dos_time(entry.modified)
+        offset = self.local_offsets[index]
+        extra = ZIP64_OFFSET_EXTRA.pack(0x0001, 8, offset) if offset >= MAX_32 else b''
+        version = 45 if extra else 20
+        return CENTRAL_HEADER.pack(
+            0x02014b50, version, version, UTF8_NAMES, 0, mod_time, mod_date,
+            crc32(entry), entry.length, entry.length, len(self._names[index]), len(extra), 0,
+            0, 0, 0, min(offset, MAX_32)
+        ) + self._names[index] + extra
+
+    def _end_records(self) -> bytes:
+        count = len(self.entries)
+        records = b''
+        if self.zip64:
+            zip64_end_offset = self.central_offset + self.central_size
+            records += ZIP64_END_RECORD.pack(
+                0x06064b50, ZIP64_END_RECORD.size - 12, 45, 45, 0, 0,
+                count, count, self.central_size, self.central_offset
+            )
+            records += ZIP64_END_LOCATOR.pack(0x07064b50, 0, zip64_end_offset, 1)
+        return records + END_RECORD.pack(
+            0x06054b50, 0, 0, min(count, MAX_16), min(count, MAX_16),
+            min(self.central_size, MAX_32), min(self.central_offset, MAX_32), 0
+        )
+
+    def iter_range(self, start: int = 0, stop: Optional[int] = None) -> Iterator[bytes]:
+        """Archive bytes [start, stop) in chunks of at most CHUNK_SIZE"""
+        stop = self.size if stop is None else min(stop, self.size)
+        position = 0
+        for kind, index, length in self.segments:
+            segment_start, position = position, position + length
+            if position <= start:
+                continue
+            if segment_start >= stop:
+                return
+            skip = max(0, start - segment_start)
+            take = min(length, stop - segment_start) - skip
+
+            if kind == 'data':
+                entry = self.entries[index]
+                f = RangeFile(entry.path, entry.offset + skip, take)
+                try:
+                    for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                        yield chunk
+                finally:
+                    f.close()
+                continue
+
+            if kind == 'local':
+                data = self._local_header(index)
+            elif kind == 'central':
+                data = self._central_header(index)
+            else:
+                data = self._end_records()
+            yield data[skip:skip + take]
@@ -1,15 +1,31 @@
-from flask import Flask, render_template, send_file, request, jsonify, Response
+from flask import Flask, render_template, send_file, request, jsonify, Response, stream_with_context
+import hashlib
+import io
 import os
 import subprocess
 import json
+import time
 from datetime import datetime
+from urllib.parse import urlencode
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from sqlalchemy.orm import joinedload
+from werkzeug.wsgi import wrap_file
+from .. import export, logs, metrics, similarity
 from ..database.database import db
-from ..database.models import Product, PDF, Photo
+from ..database.models import Product, PDF, Photo, FilingAttempt
 from ..config import Config
+from ..storage import tiles
+from ..storage.images import ImageStorage, RangeFile
+from ..storage.zipstream import ZipEntry, ZipStream
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-key-change-in-production')
 
+metrics.track_queue_depth()
+image_storage = ImageStorage()
+hash_index = similarity.HashIndex()
+tile_cache = tiles.TileCache()
+
 @app.route('/')
 def index():
     session = db.get_session()
@@ -56,6 +72,66 @@ def product_detail(fcc_id):
     finally:
         session.close()
 
+@app.route('/product/<fcc_id>/photos.zip')
+def product_photos_zip(fcc_id):
+    """All of a product's photos as a stored ZIP, streamed from the image store.
+    
+    Supports Range (single ranges) and If-Range, so interrupted downloads resume
+    without regenerating the bytes before the range.
+    """
+    session = db.get_session()
+    try:
+        product = session.query(Product).filter_by(fcc_id=fcc_id).first()
+        if not product:
+            return "Product not found", 404
+        photos = session.query(Photo).filter_by(product_id=product.id).order_by(
+            Photo.pdf_id, Photo.page_number, Photo.id
+        ).all()
+    finally:
+        session.close()
+    
+    entries = []
+    for photo in photos:
+        location = image_storage.locate(photo.local_path)
+        if location is None:
+            continue
+        path, offset, length = location
+        entries.append(ZipEntry(
+            name=f"{fcc_id}/{photo.id}_{photo.filename}",
+            path=path, offset=offset, length=length,
+            modified=photo.created_at or datetime(1980, 1, 1),
+            key=photo.sha256 or f"{path}:{offset}:{length}"
+        ))
+    if not entries:
+        return "No photos found", 404
+    
+    archive = ZipStream(entries)
+    # Changes whenever the set of photos (or their bytes) changes, so If-Range rejects stale resumes
+    etag = hashlib.sha256('\n'.join(f"{entry.name}:{entry.key}:{entry.length}" for entry in entries).encode()).hexdigest()
+    
+    start, stop = 0, archive.size
+    byte_range = request.range
+    if_range = request.if_range
+    if byte_range and len(byte_range.ranges) == 1 and (
+        (if_range.etag is None and if_range.date is None) or if_range.etag == etag
+    ):
+        span = byte_range.range_for_length(archive.size)
+        if span is None:
+            response = Response("Requested range not satisfiable", status=416)
+            response.headers['Content-Range'] = f"bytes */{archive.size}"
+            return response
+        start, stop = span
+    
+    response = Response(archive.iter_range(start, stop), mimetype='application/zip', direct_passthrough=True)
+    response.content_length = stop - start
+    response.accept_ranges = 'bytes'
+    response.set_etag(etag)
+    response.headers['Content-Disposition'] = f'attachment; filename="{fcc_id}-photos.zip"'
+    if (start, stop) != (0, archive.size):
+        response.status_code = 206
+        response.headers['Content-Range'] = f"bytes {start}-{stop - 1}/{archive.size}"
+    return response.make_conditional(request)
+
 @app.route('/photos')
 def photos():
     session = db.get_session()
@@ -63,27 +139,72 @@ def photos():
         page = request.args.get('page', 1, type=int)
         per_page = 24
         
-        photos_query = session.query(Photo).order_by(Photo.created_at.desc())
+        pcb_only = request.args.get('pcb') == '1'
+        sort = request.args.get('sort', 'newest')
+        min_quality = request.args.get('min_quality', type=float)
+        
+        photos_query = session.query(Photo)
+        if pcb_only:
+            photos_query = photos_query.filter(Photo.is_pcb_photo == True)
+        if min_quality is not None:
+            photos_query = photos_query.filter(Photo.quality_score >= min_quality)
+        if sort == 'quality':
+            # Unscored photos (extracted before scoring) sort last
+            photos_query = photos_query.order_by(Photo.quality_score == None, Photo.quality_score.desc(), Photo.id.desc())
+        elif sort == 'sharpness':
+            photos_query = photos_query.order_by(Photo.sharpness == None, Photo.sharpness.desc(), Photo.id.desc())
+        else:
+            sort = 'newest'
+            photos_query = photos_query.order_by(Photo.created_at.desc())
         photos = photos_query.offset((page - 1) * per_page).limit(per_page).all()
-        total = photos_query.count()
+        total = photos_query.order_by(None).count()
+        
+        # Carried over into pagination and the sort/filter links
+        filters = {'pcb': '1' if pcb_only else None, 'sort': sort if sort != 'newest' else None,
+                   'min_quality': min_quality}
+        filter_query = urlencode({key: value for key, value in filters.items() if value is not None})
         
         return render_template('photos.html', 
                              photos=photos,
                              page=page,
                              per_page=per_page,
-                             total=total)
+                             total=total,
+                             pcb_only=pcb_only,
+                             sort=sort,
+                             min_quality=min_quality,
+                             filter_query=filter_query)
     finally:
         session.close()
 
+def _image_response(photo: Photo) -> Response:
+    """Serve a photo from its blob file, or its byte range inside a pack"""
+    location = image_storage.locate(photo.local_path)
+    if location is None:
+        return Response("Image not found", status=404)
+    
+    path, offset, length = location
+    if offset == 0 and length == os.path.getsize(path):
+        return send_file(path, mimetype='image/png')
+    
+    response = Response(wrap_file(request.environ, RangeFile(path, offset, length)),
+                        mimetype='image/png', direct_passthrough=True)
+    response.content_length = length
+    if photo.sha256:
+        # Content-addressed, so the bytes behind this ETag never change
+        response.set_etag(photo.sha256)
+        response.cache_control.max_age = 86400
+        response.make_conditional(request)
+    return response
+
 @app.route('/image/<int:photo_id>')
 def serve_image(photo_id):
     session = db.get_session()
     try:
         photo = session.query(Photo).get(photo_id)
-        if not photo or not os.path.exists(photo.local_path):
+        if not photo:
             return "Image not found", 404
             
-        return send_file(photo.local_path, mimetype='image/png')
+        return _image_response(photo)
     finally:
         session.close()
 
@@ -92,17 +213,22 @@ def serve_thumbnail(photo_id):
     session = db.get_session()
     try:
         photo = session.query(Photo).get(photo_id)
-        if not photo or not os.path.exists(photo.local_path):
+        if not photo or not image_storage.exists(photo.local_path):
             return "Image not found", 404
         
         from PIL import Image
         
-        thumb_dir = os.path.join(os.path.dirname(photo.local_path), 'thumbnails')
+        if photo.sha256:
+            # Keyed by content, so duplicate photos share one thumbnail
+            thumb_dir = os.path.join(Config.THUMBNAILS_DIR, photo.sha256[:2])
+            thumb_path = os.path.join(thumb_dir, f"{photo.sha256}.png")
+        else:
+            thumb_dir = os.path.join(os.path.dirname(photo.local_path), 'thumbnails')
+            thumb_path = os.path.join(thumb_dir, f"thumb_{os.path.basename(photo.local_path)}")
         os.makedirs(thumb_dir, exist_ok=True)
-        thumb_path = os.path.join(thumb_dir, f"thumb_{os.path.basename(photo.local_path)}")
         
         if not os.path.exists(thumb_path):
-            with Image.open(photo.local_path) as img:
+            with Image.open(io.BytesIO(image_storage.read(photo.local_path))) as img:
                 img.thumbnail((300, 300), Image.Resampling.LANCZOS)
                 img.save(thumb_path, "PNG")
         
@@ -110,6 +236,101 @@ def serve_thumbnail(photo_id):
     finally:
         session.close()
 
+def _tile_pyramid(photo_id: int):
+    """(cache key, pyramid manifest) for a photo's deep-zoom tiles, building them if needed"""
+    session = db.get_session()
+    try:
+        photo = session.get(Photo, photo_id)
+        if not photo:
+            return None, None
+        key = photo.sha256 or f"photo-{photo.id}"
+        local_path = photo.local_path
+    finally:
+        session.close()
+
+    return key, tile_cache.ensure(key, lambda: tiles.decode(image_storage.read(local_path)))
+
+@app.route('/photo/<int:photo_id>/tiles.dzi')
+def photo_tiles_descriptor(photo_id):
+    key, pyramid = _tile_pyramid(photo_id)
+    if not pyramid:
+        return "Image not found", 404
+
+    response = Response(tiles.descriptor(pyramid), mimetype='application/xml')
+    response.set_etag(key)
+    response.cache_control.max_age = 86400
+    return response.make_conditional(request)
+
+@app.route('/photo/<int:photo_id>/tiles_files/<int:level>/<int:col>_<int:row>.jpg')
+def photo_tile(photo_id, level, col, row):
+    key, pyramid = _tile_pyramid(photo_id)
+    if not pyramid:
+        return "Image not found", 404
+
+    path = tile_cache.tile_path(key, level, col, row)
+    if not os.path.exists(path):
+        return "Tile not found", 404
+    return send_file(path, mimetype='image/jpeg', max_age=86400)
+
+@app.route('/photo/<int:photo_id>/similar')
+def similar_photos(photo_id):
+    """Near duplicates of a photo by perceptual hash, across all FCC IDs"""
+    max_distance = min(max(request.args.get('distance', Config.SIMILAR_MAX_DISTANCE, type=int), 0), 24)
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+    
+    session = db.get_session()
+    try:
+        photo = session.get(Photo, photo_id)
+        if not photo:
+            return jsonify({'error': 'Photo not found'}), 404
+        
+        if photo.phash is None:
+            # Extracted before hashing was added; hash it now instead of waiting for the backfill
+            data = image_storage.read(photo.local_path)
+            gray = similarity.gray_from_bytes(data) if data else None
+            if gray is None:
+                return jsonify({'error': 'Image not found'}), 404
+            photo.phash, photo.dhash = similarity.hash_gray(gray)
+            photo.hashed_at = datetime.utcnow()
+            session.commit()
+            hash_index.add(photo.id, photo.phash)
+        
+        start = time.perf_counter()
+        matches = hash_index.search(similarity.to_unsigned(photo.phash), max_distance, exclude=photo.id)[:limit]
+        search_ms = (time.perf_counter() - start) * 1000
+        
+        # Rows deleted since the index was loaded simply drop out here
+        found = {p.id: p for p in session.query(Photo).options(joinedload(Photo.product)).filter(
+            Photo.id.in_([match_id for match_id, _ in matches]))} if matches else {}
+        results = []
+        for match_id, distance in matches:
+            match = found.get(match_id)
+            if match is None:
+                continue
+            results.append({
+                'id': match.id,
+                'fcc_id': match.product.fcc_id,
+                'applicant': match.product.applicant,
+                'product_name': match.product.product_name,
+                'same_product': match.product_id == photo.product_id,
+                'phash_distance': distance,
+                'dhash_distance': bin((match.dhash ^ photo.dhash) & 0xFFFFFFFFFFFFFFFF).count('1')
+                                  if match.dhash is not None and photo.dhash is not None else None,
+                'image_url': f"/image/{match.id}",
+                'thumbnail_url': f"/thumbnail/{match.id}"
+            })
+        
+        return jsonify({
+            'photo_id': photo.id,
+            'fcc_id': photo.product.fcc_id,
+            'max_distance': max_distance,
+            'indexed_photos': len(hash_index),
+            'search_ms': round(search_ms, 2),
+            'matches': results
+        })
+    finally:
+        session.close()
+
 @app.route('/search')
 def search():
     query = request.args.get('q', '').strip()
@@ -141,60 +362,66 @@ def search():
 def logs_page():
     return render_template('logs.html')
 
+# Log component for the old ?container= parameter
+CONTAINER_COMPONENTS = {'espfinder': 'scraper', 'espfinder-web': 'web'}
+
+def _log_component():
+    component = request.args.get('component') or CONTAINER_COMPONENTS.get(request.args.get('container'), 'scraper')
+    if component not in logs.COMPONENTS:
+        raise ValueError(f"Unknown log component: {component}")
+    return component
+
+def _log_filter():
+    return logs.LogFilter(level=request.args.get('level'), fcc_id=request.args.get('fcc_id'))
+
 @app.route('/api/logs')
 def api_logs():
-    lines = request.args.get('lines', 100, type=int)
-    container = request.args.get('container', 'espfinder')
+    """Log entries from the component's log file.
+    
+    Without `offset` returns the last `lines` matching entries; with `offset`
+    (and the `file_id` from a previous response) returns what was written since.
+    """
+    lines = min(request.args.get('lines', 100, type=int), 5000)
     
     try:
-        cmd = ['docker', 'logs', '--tail', str(lines), container]
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-        
-        if result.returncode == 0:
-            logs = result.stdout + result.stderr
-            return jsonify({
-                'success': True,
-                'logs': logs,
-                'container': container
-            })
-        else:
-            return jsonify({
-                'success': False,
-                'error': f'Docker logs failed: {result.stderr}',
-                'container': container
-            })
-    except subprocess.TimeoutExpired:
+        component = _log_component()
+        entries, file_id, offset = logs.read_logs(
+            component,
+            offset=request.args.get('offset', type=int),
+            file_id=request.args.get('file_id', type=int),
+            lines=lines,
+            log_filter=_log_filter()
+        )
         return jsonify({
-            'success': False,
-            'error': 'Timeout getting logs',
-            'container': container
+            'success': True,
+            'component': component,
+            'entries': entries,
+            'logs': '\n'.join(logs.format_entry(entry) for entry in entries),
+            'file_id': file_id,
+            'offset': offset
         })
     except Exception as e:
         return jsonify({
             'success': False,
-            'error': str(e),
-            'container': container
+            'error': str(e)
         })
 
 @app.route('/debug/logs')
 def debug_logs():
     """Plain text logs endpoint for remote debugging"""
-    lines = request.args.get('lines', 200, type=int)
-    container = request.args.get('container', 'espfinder')
+    lines = min(request.args.get('lines', 200, type=int), 5000)
     
     try:
-        cmd = ['docker', 'logs', '--tail', str(lines), container]
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=15)
+        component = _log_component()
+        log_filter = _log_filter()
+        entries, _, _ = logs.read_logs(component, lines=lines, log_filter=log_filter)
         
-        response_text = f"=== LOGS FOR CONTAINER: {container} ===\n"
+        response_text = f"=== LOGS FOR: {component} ===\n"
         response_text += f"=== LAST {lines} LINES ===\n"
-        response_text += f"=== COMMAND: {' '.join(cmd)} ===\n\n"
-        
-        if result.returncode == 0:
-            logs = result.stdout + result.stderr
-            response_text += logs if logs.strip() else "No logs available"
-        else:
-            response_text += f"ERROR: {result.stderr}"
+        if log_filter.active:
+            response_text += f"=== FILTER: level>={request.args.get('level') or 'any'} fcc_id={request.args.get('fcc_id') or 'any'} ===\n"
+        response_text += "\n"
+        response_text += '\n'.join(logs.format_entry(entry) for entry in entries) if entries else "No logs available"
             
         return Response(response_text, mimetype='text/plain')
         
@@ -203,21 +430,35 @@ def debug_logs():
 
 @app.route('/api/logs/stream')
 def stream_logs():
-    container = request.args.get('container', 'espfinder')
+    """Server-sent events for new log entries; resumes from Last-Event-ID after a reconnect"""
+    try:
+        component = _log_component()
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    log_filter = _log_filter()
     
-    def generate():
+    file_id = request.args.get('file_id', type=int)
+    offset = request.args.get('offset', type=int)
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    if '-' in last_event_id:
         try:
-            cmd = ['docker', 'logs', '-f', '--tail', '50', container]
-            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
-            
-            for line in iter(process.stdout.readline, ''):
-                if line:
-                    yield f"data: {json.dumps({'log': line.rstrip(), 'container': container})}\n\n"
-                    
-        except Exception as e:
-            yield f"data: {json.dumps({'error': str(e)})}\n\n"
+            file_id, offset = (int(part) for part in last_event_id.split('-', 1))
+        except ValueError:
+            # Not an id we sent; resume from the query args instead
+            pass
     
-    return Response(generate(), mimetype='text/plain')
+    def generate():
+        yield "retry: 3000\n\n"
+        for entries, current_file, current_offset in logs.follow_logs(component, offset, file_id, log_filter):
+            if not entries:
+                yield ": keepalive\n\n"
+                continue
+            for entry in entries[:-1]:
+                yield f"data: {json.dumps(entry)}\n\n"
+            yield f"id: {current_file}-{current_offset}\ndata: {json.dumps(entries[-1])}\n\n"
+    
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/api/containers')
 def api_containers():
@@ -445,13 +686,17 @@ def debug_status():
             total_pdfs = session.query(PDF).count()
             processed_pdfs = session.query(PDF).filter_by(processed=True).count()
             downloaded_pdfs = session.query(PDF).filter_by(downloaded=True).count()
+            dead_letter_pdfs = session.query(PDF).filter_by(dead_letter=True).count()
+            dead_letter_filings = session.query(FilingAttempt).filter_by(dead_letter=True).count()
             
             response_text += "=== DATABASE STATS ===\n"
             response_text += f"Products: {total_products}\n"
             response_text += f"Photos: {total_photos}\n"
             response_text += f"PDFs Total: {total_pdfs}\n"
             response_text += f"PDFs Downloaded: {downloaded_pdfs}\n"
-            response_text += f"PDFs Processed: {processed_pdfs}\n\n"
+            response_text += f"PDFs Processed: {processed_pdfs}\n"
+            response_text += f"PDFs Dead-lettered: {dead_letter_pdfs}\n"
+            response_text += f"FCC IDs Dead-lettered: {dead_letter_filings}\n\n"
             
             # Recent products
             recent_products = session.query(Product).order_by(Product.created_at.desc()).limit(5).all()
@@ -464,18 +709,20 @@ def debug_status():
         finally:
             session.close()
         
-        # Container status
+        # Log files
         try:
-            cmd = ['docker', 'ps', '--format', 'table {{.Names}}\t{{.Status}}\t{{.Image}}']
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
+            response_text += "=== LOG FILES ===\n"
+            for log_file in logs.log_files():
+                modified = datetime.fromtimestamp(log_file['modified']).strftime('%Y-%m-%d %H:%M:%S')
+                response_text += f"{log_file['name']}: {log_file['size'] // 1024} KB, last write {modified}\n"
             
-            if result.returncode == 0:
-                response_text += "=== CONTAINER STATUS ===\n"
-                response_text += result.stdout + "\n"
-            else:
-                response_text += f"=== CONTAINER STATUS ERROR ===\n{result.stderr}\n\n"
+            errors, _, _ = logs.read_logs('scraper', lines=5, log_filter=logs.LogFilter(level='error'))
+            if errors:
+                response_text += "\nRecent scraper errors:\n"
+                response_text += '\n'.join(logs.format_entry(entry) for entry in errors) + "\n"
+            response_text += "\n"
         except Exception as e:
-            response_text += f"=== CONTAINER STATUS ERROR ===\n{str(e)}\n\n"
+            response_text += f"=== LOG FILES ERROR ===\n{str(e)}\n\n"
             
         # File system check
         try:
@@ -529,18 +776,53 @@ def api_stats():
         
         processed_pdfs = session.query(PDF).filter_by(processed=True).count()
         downloaded_pdfs = session.query(PDF).filter_by(downloaded=True).count()
+        dead_letter_pdfs = session.query(PDF).filter_by(dead_letter=True).count()
         
         return jsonify({
             'total_products': total_products,
             'total_photos': total_photos,
             'total_pdfs': total_pdfs,
             'processed_pdfs': processed_pdfs,
-            'downloaded_pdfs': downloaded_pdfs
+            'downloaded_pdfs': downloaded_pdfs,
+            'dead_letter_pdfs': dead_letter_pdfs
         })
     finally:
         session.close()
 
-if __name__ == '__main__':
+@app.route('/api/export')
+def api_export():
+    """Stream the products x PDFs x photos catalog as JSONL or Parquet (see src/export.py).
+    
+    Query parameters: format (jsonl or parquet), since (ISO date/time, only rows
+    created since then) and include (comma-separated: hashes, quality).
+    """
+    fmt = request.args.get('format', 'jsonl')
+    include = [group for group in request.args.get('include', '').split(',') if group]
+    try:
+        since = datetime.fromisoformat(request.args['since']) if request.args.get('since') else None
+        chunks = export.export(fmt, since, include)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({'success': False, 'error': str(e)}), 501
+    
+    filename = f"espfinder-catalog-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.{fmt}"
+    return Response(stream_with_context(chunks), mimetype=export.MIMETYPES[fmt],
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(generate_latest(), content_type=CONTENT_TYPE_LATEST)
+
+@app.route('/metrics/scraper')
+def scraper_metrics():
+    """The last scraper run's final metrics, written by the (short-lived) scraper process"""
+    if not Config.METRICS_TEXTFILE or not os.path.exists(Config.METRICS_TEXTFILE):
+        return Response("No scraper run has published metrics yet", status=404, mimetype='text/plain')
+    return send_file(Config.METRICS_TEXTFILE, mimetype=CONTENT_TYPE_LATEST, max_age=0)
+
+def prepare():
+    """One-time setup before serving: data directories, sample PDFs and tables"""
     Config.ensure_dirs()
     
     # Create sample PDFs if they don't exist
@@ -556,4 +838,9 @@ if __name__ == '__main__':
             print(f"⚠️  Could not create sample PDFs: {e}")
     
     db.create_tables()
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+
+if __name__ == '__main__':
+    # Development server; the Docker image runs gunicorn (src/web/gunicorn_conf.py)
+    prepare()
+    logs.configure_logging('web')
+    app.run(host='0.0.0.0', port=5000, debug=True, threaded=True)
\ No newline at end of file
@@ -0,0 +1,21 @@
+"""gunicorn settings for the web image (Dockerfile.web)
+
+gunicorn's wsgi.file_wrapper sends RangeFile bodies (packed images) with
+sendfile. One process, since the tile cache's usage tracking, the hash
+index and the rotating log file all live in it; threads keep long ZIP
+downloads and log streams from blocking other requests.
+"""
+
+bind = '0.0.0.0:5000'
+workers = 1
+worker_class = 'gthread'
+threads = 8
+timeout = 120
+
+def on_starting(server):
+    from src.web.app import prepare
+    prepare()
+
+def post_fork(server, worker):
+    from src import logs
+    logs.configure_logging('web')
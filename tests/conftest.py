@@ -0,0 +1,66 @@
+"""Shared fixtures.
+
+Config and the database engine are created when src is first imported, so
+every path and the database URL are pointed at a throwaway directory here,
+before any test module imports src.
+"""
+
+import os
+import shutil
+import tempfile
+
+DATA_DIR = tempfile.mkdtemp(prefix='espfinder-tests-')
+os.environ.update({
+    'DATA_DIR': DATA_DIR,
+    'DATABASE_URL': f"sqlite:///{os.path.join(DATA_DIR, 'test.db')}",
+    'IMAGE_STORE_DIR': os.path.join(DATA_DIR, 'store'),
+    'PACK_DIR': os.path.join(DATA_DIR, 'packs'),
+    'HTTP_CACHE_DIR': os.path.join(DATA_DIR, 'http_cache'),
+    'HTTP_CACHE_MODE': 'on',
+    'TILE_CACHE_DIR': os.path.join(DATA_DIR, 'tiles'),
+    'IMAGE_STORAGE': 'blobs',
+    'METRICS_PORT': '0',
+    'METRICS_PUSHGATEWAY': '',
+    'PROBE_DOWNLOADS': 'off'
+})
+
+import pytest
+
+from src.database.database import db
+from src.database.models import Base, Product
+
+def pytest_sessionfinish(session, exitstatus):
+    db.close()
+    shutil.rmtree(DATA_DIR, ignore_errors=True)
+
+@pytest.fixture
+def database():
+    """Empty tables for one test"""
+    Base.metadata.drop_all(bind=db.engine)
+    db.create_tables()
+    yield db
+
+@pytest.fixture
+def product(database):
+    session = database.get_session()
+    try:
+        product = Product(fcc_id='2AC7Z-ESP32C6', applicant='Espressif Systems', product_name='Wi-Fi Module')
+        session.add(product)
+        session.commit()
+        session.refresh(product)
+        session.expunge(product)
+        return product
+    finally:
+        session.close()
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Fresh store, pack, cache and tile directories for one test"""
+    from src.config import Config
+
+    for name, attr in (('store', 'IMAGE_STORE_DIR'), ('packs', 'PACK_DIR'),
+                       ('http_cache', 'HTTP_CACHE_DIR'), ('tiles', 'TILE_CACHE_DIR'), ('images', 'IMAGES_DIR')):
+        path = tmp_path / name
+        path.mkdir()
+        monkeypatch.setattr(Config, attr, str(path))
+    return tmp_path
@@ -0,0 +1,199 @@
+import os
+from contextlib import nullcontext
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+from src.config import Config
+from src.scraper import cache as cache_module, selenium_scraper as selenium_module
+from src.scraper.cache import CacheMissError, CachingSession, ResponseCache
+from src.scraper.fcc_scraper import FCCScraper
+from src.scraper.throttle import HostThrottle
+
+SEARCH_URL = f"{Config.FCC_BASE_URL}/GenericSearch.cfm"
+EXHIBITS_URL = f"{Config.FCC_BASE_URL}/ViewExhibitReport.cfm?mode=Exhibits&application_id=2AC7Z-ESP32C6"
+FIXTURES = os.path.join(os.path.dirname(__file__), '..', 'benchmarks', 'fixtures')
+EXHIBITS_PAGE = (
+    '<html><body><table>'
+    '<tr><td><a href="/eas/GetApplicationAttachment.html?id=1&amp;file=Internal_Photos.pdf">Internal Photos</a></td></tr>'
+    '<tr><td><a href="/eas/GetApplicationAttachment.html?id=2&amp;file=Test_Report.pdf">Test Report</a></td></tr>'
+    '</table></body></html>'
+)
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+        return f.read()
+
+@pytest.fixture(autouse=True)
+def no_throttle(monkeypatch):
+    monkeypatch.setattr(HostThrottle, 'acquire', lambda self: None)
+    monkeypatch.setattr(selenium_module, 'throttled', lambda url: nullcontext())
+
+@pytest.fixture
+def cache(data_dir):
+    return ResponseCache(mode='on')
+
+def test_store_and_lookup_round_trip(cache):
+    form = {'grant_date_from': '01/02/2026'}
+    cache.store('post', SEARCH_URL, form, b'<html>results</html>', headers={'ETag': '"v1"', 'Server': 'x'})
+
+    entry = cache.lookup('POST', SEARCH_URL, form)
+    assert entry['page_type'] == 'search'
+    assert entry['headers'] == {'ETag': '"v1"'}
+    assert cache.read_body(entry) == b'<html>results</html>'
+    assert cache.lookup('POST', SEARCH_URL, {'grant_date_from': '01/03/2026'}) is None
+
+def test_identical_bodies_share_a_blob(cache):
+    cache.store('GET', SEARCH_URL, {'page': 1}, b'same')
+    cache.store('GET', SEARCH_URL, {'page': 2}, b'same')
+    blobs = [name for _, _, names in os.walk(os.path.join(cache.root, 'blobs')) for name in names]
+    assert len(blobs) == 1
+    assert len(list(cache.iter_entries('search'))) == 2
+
+def test_freshness_follows_page_type_ttl(cache, monkeypatch):
+    entry = cache.store('GET', EXHIBITS_URL, None, b'x')
+    assert cache.is_fresh(entry)
+    monkeypatch.setitem(Config.HTTP_CACHE_TTLS, 'exhibits', 0)
+    assert not cache.is_fresh(entry)
+
+def test_pdfs_are_not_cacheable(cache):
+    assert not cache.cacheable('https://apps.fcc.gov/eas/GetApplicationAttachment.html?id=1&file=a.pdf')
+    assert not ResponseCache(mode='off').cacheable(SEARCH_URL)
+
+def test_offline_miss_raises(data_dir):
+    offline = ResponseCache(mode='offline')
+    with pytest.raises(CacheMissError):
+        offline.lookup('GET', SEARCH_URL)
+
+def test_offline_serves_stale_entries(cache, monkeypatch):
+    cache.store('GET', EXHIBITS_URL, None, b'old')
+    monkeypatch.setitem(Config.HTTP_CACHE_TTLS, 'exhibits', 0)
+    assert cache.get_page(EXHIBITS_URL) is None
+    assert ResponseCache(mode='offline').get_page(EXHIBITS_URL) == 'old'
+
+class FakeAdapter(BaseAdapter):
+    """Answers every request with the next queued (status, body, headers)"""
+
+    def __init__(self, *responses):
+        super().__init__()
+        self.responses = list(responses)
+        self.requests = []
+
+    def send(self, request, **kwargs):
+        self.requests.append(request)
+        status, body, headers = self.responses.pop(0)
+        response = requests.Response()
+        response.status_code = status
+        response._content = body
+        response.headers.update(headers)
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+def _session(cache, *responses):
+    session = CachingSession(cache)
+    adapter = FakeAdapter(*responses)
+    session.mount('https://', adapter)
+    return session, adapter
+
+def test_fresh_hit_skips_the_network(cache):
+    session, adapter = _session(cache, (200, EXHIBITS_PAGE.encode(), {'ETag': '"v1"'}))
+    first = session.get(EXHIBITS_URL)
+    second = session.get(EXHIBITS_URL)
+
+    assert len(adapter.requests) == 1
+    assert not getattr(first, 'from_cache', False)
+    assert second.from_cache and second.text == EXHIBITS_PAGE
+
+def test_stale_entry_is_revalidated(cache, monkeypatch):
+    session, adapter = _session(cache, (200, EXHIBITS_PAGE.encode(), {'ETag': '"v1"', 'Last-Modified': 'Mon, 05 Jan 2026 00:00:00 GMT'}),
+                                (304, b'', {}))
+    session.get(EXHIBITS_URL)
+    monkeypatch.setitem(Config.HTTP_CACHE_TTLS, 'exhibits', 0)
+    response = session.get(EXHIBITS_URL)
+
+    revalidation = adapter.requests[1]
+    assert revalidation.headers['If-None-Match'] == '"v1"'
+    assert revalidation.headers['If-Modified-Since'] == 'Mon, 05 Jan 2026 00:00:00 GMT'
+    assert response.status_code == 200 and response.content == EXHIBITS_PAGE.encode() and response.from_cache
+
+def test_errors_are_not_cached(cache):
+    session, adapter = _session(cache, (503, b'busy', {}), (200, b'ok', {}))
+    assert session.get(EXHIBITS_URL).status_code == 503
+    assert session.get(EXHIBITS_URL).content == b'ok'
+    assert len(adapter.requests) == 2
+
+def test_pages_that_do_not_parse_are_not_cached(cache):
+    maintenance = b'<html><body><h1>Scheduled maintenance</h1></body></html>'
+    session, adapter = _session(cache, (200, maintenance, {}), (200, EXHIBITS_PAGE.encode(), {}),
+                                (200, b'<html><body>No records found.</body></html>', {}))
+    assert session.get(EXHIBITS_URL).content == maintenance
+    assert session.get(EXHIBITS_URL).content == EXHIBITS_PAGE.encode()
+    assert session.get(EXHIBITS_URL).from_cache
+    # An empty search result is not cached either
+    session.post(SEARCH_URL, data={'grant_date_from': '01/02/2026'})
+    assert cache.lookup('POST', SEARCH_URL, {'grant_date_from': '01/02/2026'}) is None
+    assert len(adapter.requests) == 3
+
+def test_caller_validator(cache):
+    session, adapter = _session(cache, (200, EXHIBITS_PAGE.encode(), {}), (200, EXHIBITS_PAGE.encode(), {}))
+    session.get(EXHIBITS_URL, validate=lambda body: b'Schematics' in body)
+    assert cache.lookup('GET', EXHIBITS_URL) is None
+    session.get(EXHIBITS_URL, validate=lambda body: True)
+    assert cache.lookup('GET', EXHIBITS_URL)
+
+def test_search_results_are_cached(cache):
+    body = fixture('search_results.html').encode()
+    session, adapter = _session(cache, (200, body, {}))
+    session.post(SEARCH_URL, data={'grant_date_from': '01/02/2026'})
+    assert session.post(SEARCH_URL, data={'grant_date_from': '01/02/2026'}).from_cache
+    assert len(adapter.requests) == 1
+
+class FakeDriver:
+    def __init__(self, page_source):
+        self.page_source = page_source
+        self.visited = []
+
+    def get(self, url):
+        self.visited.append(url)
+
+    def find_element(self, by, value):
+        return object()
+
+    def quit(self):
+        pass
+
+def _selenium_scraper(monkeypatch, page_source):
+    monkeypatch.setattr(selenium_module.SeleniumFCCScraper, '_setup_driver', lambda self: None)
+    scraper = selenium_module.SeleniumFCCScraper()
+    scraper.driver = FakeDriver(page_source)
+    return scraper
+
+def test_exhibit_page_is_cached(data_dir, monkeypatch):
+    scraper = _selenium_scraper(monkeypatch, EXHIBITS_PAGE)
+    assert len(scraper.get_filing_details('2AC7Z-ESP32C6')['pdfs']) == 1
+    assert len(scraper.get_filing_details('2AC7Z-ESP32C6')['pdfs']) == 1
+    assert len(scraper.driver.visited) == 1
+
+def test_error_page_is_not_cached(data_dir, monkeypatch):
+    scraper = _selenium_scraper(monkeypatch, '<html><body><h1>Service Unavailable</h1></body></html>')
+    assert scraper.get_filing_details('2AC7Z-ESP32C6') is None
+    scraper.driver.page_source = EXHIBITS_PAGE
+    assert len(scraper.get_filing_details('2AC7Z-ESP32C6')['pdfs']) == 1
+    assert len(scraper.driver.visited) == 2
+
+def test_offline_search_miss_returns_no_filings(data_dir, monkeypatch):
+    monkeypatch.setattr(Config, 'HTTP_CACHE_MODE', 'offline')
+    assert FCCScraper().search_recent_filings() == []
+
+def test_replay_parses_cached_pages(data_dir):
+    cache = ResponseCache(mode='on')
+    cache.store('POST', SEARCH_URL, {'grant_date_from': '01/02/2026'}, fixture('search_results.html').encode())
+    cache.store('GET', EXHIBITS_URL, None, fixture('exhibits.html').encode())
+
+    assert cache_module.replay() == {'pages': 2, 'filings': 12, 'pdfs': 2}
+    assert cache_module.replay('exhibits') == {'pages': 1, 'filings': 0, 'pdfs': 2}
@@ -0,0 +1,70 @@
+import cv2
+import numpy as np
+import pytest
+
+from src.database.models import Photo
+from src.pdf_processor import classifier
+from src.pdf_processor.classifier import PCBClassifier
+from src.storage.blob_store import BlobStore
+
+def _board(seed=0, size=512):
+    """Green solder mask with traces and light pads"""
+    rng = np.random.default_rng(seed)
+    img = np.zeros((size, size, 3), np.uint8)
+    img[:] = (40, 120, 30)
+    for _ in range(60):
+        x, y = (int(v) for v in rng.integers(0, size, 2))
+        cv2.line(img, (x, y), (x + int(rng.integers(-80, 80)), y), (60, 170, 50), 2)
+    for _ in range(120):
+        x, y = (int(v) for v in rng.integers(10, size - 20, 2))
+        cv2.rectangle(img, (x, y), (x + 8, y + 6), (200, 200, 200), -1)
+    return img
+
+def _paper(size=512):
+    img = np.full((size, size, 3), 245, np.uint8)
+    cv2.putText(img, 'FCC ID 2AC7Z', (40, 250), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (20, 20, 20), 3)
+    return img
+
+def _batch(*images):
+    return np.stack([cv2.resize(img, (classifier.SIZE, classifier.SIZE), interpolation=cv2.INTER_AREA) for img in images])
+
+def test_board_scores_above_paper():
+    board, paper = classifier.score(classifier.features(_batch(_board(), _paper())))
+    assert board > 0.5 > paper
+
+def test_batched_features_match_single_images():
+    images = [_board(seed) for seed in range(3)] + [_paper()]
+    batched = classifier.features(_batch(*images))
+    for row, img in zip(batched, images):
+        assert classifier.features(_batch(img))[0] == pytest.approx(row, abs=1e-6)
+
+def test_classify_photos_scores_unscored_photos(database, product, data_dir):
+    store = BlobStore()
+    paths = [store.put(cv2.imencode('.png', img)[1].tobytes())[1] for img in (_board(), _paper())]
+    _, unreadable = store.put(b'not an image')
+    session = database.get_session()
+    try:
+        photos = [Photo(product_id=product.id, filename=f"{i}.png", local_path=path)
+                  for i, path in enumerate(paths + [unreadable, '/nowhere/missing.png'])]
+        photos.append(Photo(product_id=product.id, filename='scored.png', local_path=paths[0], pcb_score=0.1))
+        session.add_all(photos)
+        session.commit()
+        ids = [photo.id for photo in photos]
+    finally:
+        session.close()
+
+    pcb = PCBClassifier(threshold=0.5, workers=2)
+    try:
+        assert pcb.classify_photos(batch_size=2) == {'photos': 2, 'pcb': 1, 'unreadable': 2}
+        assert pcb.classify_photos(reclassify=True)['photos'] == 3
+    finally:
+        pcb.close()
+
+    session = database.get_session()
+    try:
+        rows = {photo.id: (photo.is_pcb_photo, photo.pcb_score) for photo in session.query(Photo)}
+    finally:
+        session.close()
+    assert rows[ids[0]][0] and not rows[ids[1]][0]
+    assert rows[ids[2]][1] is None and rows[ids[3]][1] is None
+    assert rows[ids[4]][1] > 0.5
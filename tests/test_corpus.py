@@ -0,0 +1,58 @@
+import argparse
+import hashlib
+import os
+
+import fitz
+import pytest
+
+from benchmarks.corpus import CorpusSpec, generate_corpus, parse_encodings, parse_range
+
+def _documents(manifest):
+    # File sizes can differ by a byte or two with the trailer /ID
+    return [{key: value for key, value in doc.items() if key != 'bytes'} for doc in manifest['documents']]
+
+def _image_digests(out_dir, manifest):
+    """Digests of every image stream; whole files differ in the random trailer /ID"""
+    digests = []
+    for document in manifest['documents']:
+        doc = fitz.open(os.path.join(out_dir, document['filename']))
+        digests.append([hashlib.sha256(doc.xref_stream_raw(img[0])).hexdigest()
+                        for page in doc for img in page.get_images()])
+    return digests
+
+def test_every_encoding_extracts(tmp_path):
+    spec = CorpusSpec(pdfs=1, pages=(4, 4), image_sizes=[(320, 240)], seed=3,
+                      encodings={'dct': 1, 'flate': 1, 'jbig2': 1, 'cmyk': 1})
+    manifest = generate_corpus(str(tmp_path), spec)
+
+    assert manifest['images'] == 4 and sum(manifest['encodings'].values()) == 4
+    doc = fitz.open(tmp_path / manifest['documents'][0]['filename'])
+    for page in doc:
+        xref = page.get_images()[0][0]
+        pix = fitz.Pixmap(doc, xref)
+        assert (pix.width, pix.height) == (320, 240)
+
+def test_text_pages_decorations_and_shared_xrefs(tmp_path):
+    spec = CorpusSpec(pdfs=2, pages=(6, 6), image_sizes=[(200, 150)], decorations=2,
+                      text_page_rate=0.5, shared_xref_rate=0.5, seed=5)
+    manifest = generate_corpus(str(tmp_path), spec)
+
+    assert manifest['pages'] == 12 and manifest['decorations'] == 24
+    assert 0 < manifest['text_pages'] < 12 and manifest['shared_refs'] > 0
+    assert manifest['images'] + manifest['shared_refs'] == 12 - manifest['text_pages']
+    doc = fitz.open(tmp_path / manifest['documents'][0]['filename'])
+    # The logo is one xref shared by every page
+    assert set.intersection(*({img[0] for img in page.get_images()} for page in doc))
+
+def test_output_does_not_depend_on_workers(tmp_path):
+    spec = CorpusSpec(pdfs=3, pages=(1, 3), image_sizes=[(200, 150)], duplicate_rate=0.5, seed=7)
+    serial = generate_corpus(str(tmp_path / 'serial'), spec)
+    parallel = generate_corpus(str(tmp_path / 'parallel'), spec, workers=2)
+    assert _documents(serial) == _documents(parallel)
+    assert _image_digests(tmp_path / 'serial', serial) == _image_digests(tmp_path / 'parallel', parallel)
+
+def test_argument_parsers():
+    assert parse_encodings('dct:6,raw,JPEG:2') == {'dct': 2.0, 'flate': 1.0}
+    assert parse_range('40-80') == (40, 80) and parse_range('12') == (12, 12)
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_encodings('webp')
@@ -0,0 +1,88 @@
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from src import export
+from src.database.models import PDF, Photo, Product
+
+NOW = datetime(2026, 5, 1, 12, 0)
+
+@pytest.fixture
+def catalog(database):
+    """Product 1: a PDF with two photos and a PDF without. Product 2: no PDFs. Product 3: new photo only."""
+    old = NOW - timedelta(days=30)
+    session = database.get_session()
+    try:
+        products = [Product(fcc_id=f"2AC7Z-{index}", created_at=old) for index in range(3)]
+        session.add_all(products)
+        session.flush()
+        pdfs = [PDF(product_id=products[0].id, filename='photos.pdf', url='https://example.com/1', created_at=old),
+                PDF(product_id=products[0].id, filename='report.pdf', url='https://example.com/2', created_at=old),
+                PDF(product_id=products[2].id, filename='photos.pdf', url='https://example.com/3', created_at=old)]
+        session.add_all(pdfs)
+        session.flush()
+        session.add_all([
+            Photo(product_id=products[0].id, pdf_id=pdfs[0].id, filename='a.png', local_path='/nowhere/a.png',
+                  phash=-5, quality_score=0.5, created_at=old),
+            Photo(product_id=products[0].id, pdf_id=pdfs[0].id, filename='b.png', local_path='/nowhere/b.png', created_at=old),
+            Photo(product_id=products[2].id, pdf_id=pdfs[2].id, filename='c.png', local_path='/nowhere/c.png', created_at=NOW)
+        ])
+        session.commit()
+    finally:
+        session.close()
+
+def _rows(fmt='jsonl', **kwargs):
+    return [json.loads(line) for line in b''.join(export.export(fmt, **kwargs)).decode().splitlines()]
+
+def test_one_row_per_photo_pdf_and_product(catalog):
+    rows = _rows()
+    assert [(row['fcc_id'], row['pdf_filename'], row['photo_filename']) for row in rows] == [
+        ('2AC7Z-0', 'photos.pdf', 'a.png'),
+        ('2AC7Z-0', 'photos.pdf', 'b.png'),
+        ('2AC7Z-0', 'report.pdf', None),
+        ('2AC7Z-1', None, None),
+        ('2AC7Z-2', 'photos.pdf', 'c.png')
+    ]
+    assert rows[0]['product_created_at'] == (NOW - timedelta(days=30)).isoformat()
+    assert 'phash' not in rows[0] and 'quality_score' not in rows[0]
+
+def test_batches_hold_whole_products(catalog):
+    batches = list(export.iter_batches(export.columns_for(), batch_size=1))
+    assert [{row['fcc_id'] for row in batch} for batch in batches] == [{'2AC7Z-0'}, {'2AC7Z-1'}, {'2AC7Z-2'}]
+    assert len(list(export.export(batch_size=2))) == 2
+
+def test_optional_columns(catalog):
+    row = _rows(include=['hashes', 'quality'])[0]
+    assert row['phash'] == -5 and row['quality_score'] == 0.5
+    with pytest.raises(ValueError):
+        export.columns_for(['thumbnails'])
+    with pytest.raises(ValueError):
+        export.export('csv')
+
+def test_since_keeps_rows_created_after(catalog):
+    rows = _rows(since=NOW - timedelta(days=1))
+    assert [(row['fcc_id'], row['photo_filename']) for row in rows] == [('2AC7Z-2', 'c.png')]
+    assert _rows(since=NOW + timedelta(days=1)) == []
+
+def test_since_pages_only_through_changed_products(catalog, database):
+    statements = []
+    record = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(database.engine, 'before_cursor_execute', record)
+    try:
+        batches = list(export.iter_batches(export.columns_for(), NOW - timedelta(days=1), batch_size=1))
+    finally:
+        event.remove(database.engine, 'before_cursor_execute', record)
+
+    assert [[row['fcc_id'] for row in batch] for batch in batches] == [['2AC7Z-2']]
+    # One page of ids and its rows, then the empty page that ends the export
+    assert len(statements) == 3
+
+def test_parquet_round_trip(catalog):
+    pq = pytest.importorskip('pyarrow.parquet')
+    table = pq.read_table(io.BytesIO(b''.join(export.export('parquet', include=['hashes'], batch_size=2))))
+    assert table.num_rows == 5
+    assert table.column('photo_filename').to_pylist() == ['a.png', 'b.png', None, None, 'c.png']
+    assert str(table.schema.field('phash').type) == 'int64'
@@ -0,0 +1,139 @@
+import hashlib
+import io
+import json
+import os
+import tempfile
+
+import cv2
+import fitz
+import numpy as np
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+from src.config import Config
+from src.database.models import PDF, Photo
+from src.pdf_processor import page_filter
+from src.pdf_processor.pdf_processor import PDFProcessor
+from src.scraper.throttle import HostThrottle
+
+TEXT = ' '.join(['Radiated spurious emissions were measured from 30 MHz to 26 GHz.'] * 20)
+
+def _png(width, height, seed=0):
+    rng = np.random.default_rng(seed)
+    img = np.full((height, width, 3), 40, np.uint8)
+    for _ in range(150):
+        x, y = (int(v) for v in rng.integers(0, max(width, height), 2))
+        cv2.rectangle(img, (x, y), (x + int(rng.integers(4, 30)), y + int(rng.integers(4, 30))),
+                      tuple(int(c) for c in rng.integers(60, 230, 3)), -1)
+    return cv2.imencode('.png', img)[1].tobytes()
+
+def _exhibit() -> bytes:
+    """Photo page, report page with a logo, blank page, page with only an icon"""
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_image(fitz.Rect(36, 36, 576, 396), stream=_png(600, 400))
+    page = doc.new_page()
+    page.insert_image(fitz.Rect(36, 36, 86, 86), stream=_png(150, 150, seed=1))
+    page.insert_textbox(fitz.Rect(36, 100, 576, 756), TEXT, fontsize=10)
+    doc.new_page()
+    page = doc.new_page()
+    page.insert_image(fitz.Rect(36, 36, 86, 86), stream=_png(40, 40, seed=2))
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+@pytest.fixture
+def exhibit(database, product, data_dir, monkeypatch):
+    monkeypatch.setattr(Config, 'QUALITY_THRESHOLD', 0)
+    path = data_dir / 'images' / 'exhibit.pdf'
+    path.write_bytes(_exhibit())
+    session = database.get_session()
+    try:
+        pdf = PDF(product_id=product.id, filename='exhibit.pdf', url='https://example.com/exhibit.pdf',
+                  local_path=str(path), downloaded=True)
+        session.add(pdf)
+        session.commit()
+        pdf.product  # loaded before the row is detached
+        session.expunge(pdf)
+        return pdf
+    finally:
+        session.close()
+
+def _processed(database, pdf_id):
+    session = database.get_session()
+    try:
+        pdf = session.get(PDF, pdf_id)
+        photos = [(photo.page_number, photo.width, photo.height) for photo in session.query(Photo).order_by(Photo.id)]
+        return pdf.processed, pdf.page_count, json.loads(pdf.skipped_pages), photos
+    finally:
+        session.close()
+
+def test_select_images_skip_reasons():
+    doc = fitz.open(stream=_exhibit(), filetype='pdf')
+    processor = PDFProcessor()
+    reasons = [page_filter.select_images(page, page.get_images(), processor._is_valid_size)[1] for page in doc]
+    assert reasons == [None, 'text_page', 'no_images', 'small_images']
+    assert page_filter.image_coverage(doc[0], processor._is_valid_size) > 0.3
+
+def test_extraction_skips_filtered_pages(database, exhibit):
+    assert len(PDFProcessor().extract_images_from_pdf(exhibit)) == 1
+
+    processed, page_count, skipped, photos = _processed(database, exhibit.id)
+    assert processed and page_count == 4 and photos == [(1, 600, 400)]
+    assert skipped == [{'page': 2, 'reason': 'text_page'}, {'page': 3, 'reason': 'no_images'},
+                       {'page': 4, 'reason': 'small_images'}]
+
+def test_text_pages_are_kept_with_page_filter_off(database, exhibit, monkeypatch):
+    monkeypatch.setattr(Config, 'PAGE_FILTER', False)
+    assert len(PDFProcessor().extract_images_from_pdf(exhibit)) == 2
+    _, _, skipped, photos = _processed(database, exhibit.id)
+    assert [page for page, _, _ in photos] == [1, 2]
+    assert [page['reason'] for page in skipped] == ['no_images', 'small_images']
+
+class ExhibitAdapter(BaseAdapter):
+    def __init__(self, body):
+        super().__init__()
+        self.body = body
+
+    def send(self, request, stream=False, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response.raw = io.BytesIO(self.body)
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+@pytest.mark.parametrize('max_mb', [64, 0.001])
+def test_streamed_pdf_is_never_written(database, product, data_dir, monkeypatch, max_mb):
+    monkeypatch.setattr(Config, 'QUALITY_THRESHOLD', 0)
+    monkeypatch.setattr(Config, 'PDF_STREAM', 'on')
+    monkeypatch.setattr(Config, 'PDF_STREAM_MAX_MB', max_mb)
+    monkeypatch.setattr(HostThrottle, 'acquire', lambda self: None)
+    monkeypatch.setattr(tempfile, 'tempdir', str(data_dir))
+    body = _exhibit()
+    session = database.get_session()
+    try:
+        session.add(PDF(product_id=product.id, filename='exhibit.pdf', url='https://example.com/exhibit.pdf'))
+        session.commit()
+    finally:
+        session.close()
+
+    processor = PDFProcessor()
+    processor.session.mount('https://', ExhibitAdapter(body))
+    assert processor.process_unprocessed_pdfs() == 1
+
+    session = database.get_session()
+    try:
+        pdf = session.query(PDF).one()
+        assert pdf.processed and not pdf.downloaded and pdf.local_path is None
+        assert pdf.file_size == len(body) and pdf.sha256 == hashlib.sha256(body).hexdigest()
+        assert session.query(Photo).count() == 1
+    finally:
+        session.close()
+    # Neither the source nor a spilled copy is left behind
+    assert not os.listdir(data_dir / 'images')
+    assert not [name for name in os.listdir(data_dir) if name.endswith('.pdf')]
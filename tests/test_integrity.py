@@ -0,0 +1,109 @@
+import json
+import os
+
+import pytest
+
+from src.config import Config
+from src.database.models import PDF, Photo
+from src.storage.blob_store import BlobStore
+from src.storage.integrity import IntegrityChecker
+from src.storage.packs import PackStore
+
+@pytest.fixture
+def layout(database, product, data_dir, monkeypatch):
+    """A photo and a PDF that check out, plus one of each kind of issue"""
+    monkeypatch.setattr(Config, 'THUMBNAILS_DIR', str(data_dir / 'thumbnails'))
+    store = BlobStore()
+    good_digest, good_path = store.put(b'good image')
+    resized_digest, resized_path = store.put(b'resized image')
+    _, orphan_path = store.put(b'orphan image')
+    packed_digest, packed_path = PackStore().put(b'packed image')
+
+    pdf_dir = data_dir / 'images' / product.fcc_id
+    pdf_dir.mkdir()
+    (pdf_dir / 'good.pdf').write_bytes(b'%PDF good')
+    (pdf_dir / 'truncated.pdf').write_bytes(b'%PDF')
+
+    session = database.get_session()
+    try:
+        photos = {
+            'good': Photo(product_id=product.id, filename='good.png', local_path=good_path, sha256=good_digest, file_size=10),
+            'resized': Photo(product_id=product.id, filename='resized.png', local_path=resized_path,
+                             sha256=resized_digest, file_size=1),
+            'packed': Photo(product_id=product.id, filename='packed.png', local_path=packed_path,
+                            sha256=packed_digest, file_size=12),
+            'missing': Photo(product_id=product.id, filename='missing.png',
+                             local_path=store.path_for('0' * 64), sha256='0' * 64, file_size=10)
+        }
+        pdfs = {
+            name: PDF(product_id=product.id, filename=f"{name}.pdf", url=f"https://example.com/{name}.pdf",
+                      local_path=str(pdf_dir / f"{name}.pdf"), downloaded=True, processed=True, file_size=9)
+            for name in ('good', 'truncated', 'missing')
+        }
+        # Failed extraction of a truncated download until it was dead-lettered
+        pdfs['truncated'].processed = False
+        pdfs['truncated'].attempts = 5
+        pdfs['truncated'].dead_letter = True
+        session.add_all(list(photos.values()) + list(pdfs.values()))
+        session.commit()
+        ids = {'photos': {name: photo.id for name, photo in photos.items()},
+               'pdfs': {name: pdf.id for name, pdf in pdfs.items()}}
+    finally:
+        session.close()
+
+    ids['orphan'] = orphan_path
+    return ids
+
+def _rows(database):
+    session = database.get_session()
+    try:
+        return ({photo.id: photo.file_size for photo in session.query(Photo)},
+                {pdf.id: pdf for pdf in session.query(PDF)})
+    finally:
+        session.close()
+
+def test_report_only(database, layout, tmp_path):
+    output = tmp_path / 'issues.jsonl'
+    stats = IntegrityChecker(workers=4, grace=0, output=str(output)).run()
+
+    assert stats['photo_rows'] == 4 and stats['pdf_rows'] == 3
+    assert stats['orphan_file'] == 1
+    assert stats['missing_file'] == 2  # one photo, one PDF
+    assert stats['size_mismatch'] == 2  # one photo, one PDF
+    assert not stats.get('repaired')
+
+    issues = [json.loads(line) for line in output.read_text().splitlines()]
+    assert {(issue['type'], issue['table'], issue['id']) for issue in issues} == {
+        ('orphan_file', None, None),
+        ('missing_file', 'photos', layout['photos']['missing']),
+        ('missing_file', 'pdfs', layout['pdfs']['missing']),
+        ('size_mismatch', 'photos', layout['photos']['resized']),
+        ('size_mismatch', 'pdfs', layout['pdfs']['truncated'])
+    }
+    assert os.path.exists(layout['orphan'])
+    assert len(_rows(database)[0]) == 4
+
+def test_repair(database, layout):
+    stats = IntegrityChecker(repair=True, workers=4, grace=0).run()
+
+    assert stats['repaired'] == 5
+    assert not os.path.exists(layout['orphan'])
+    photos, pdfs = _rows(database)
+    assert set(photos) == {layout['photos'][name] for name in ('good', 'resized', 'packed')}
+    assert photos[layout['photos']['resized']] == len(b'resized image')
+    assert pdfs[layout['pdfs']['good']].downloaded
+    for name in ('truncated', 'missing'):
+        pdf = pdfs[layout['pdfs'][name]]
+        assert pdf.local_path is None and not pdf.downloaded
+    # Already extracted, so only evicted; the unprocessed one is queued again
+    missing = pdfs[layout['pdfs']['missing']]
+    assert missing.processed and missing.evicted_at
+    truncated = pdfs[layout['pdfs']['truncated']]
+    assert not truncated.processed and not truncated.dead_letter and truncated.attempts == 0
+
+    assert IntegrityChecker(workers=4, grace=0).run().keys() & {'orphan_file', 'missing_file', 'size_mismatch'} == set()
+
+def test_recent_files_are_not_orphans(database, layout):
+    stats = IntegrityChecker(repair=True, workers=4, grace=3600).run()
+    assert stats['skipped_recent'] == 1 and 'orphan_file' not in stats
+    assert os.path.exists(layout['orphan'])
@@ -0,0 +1,94 @@
+import json
+import os
+
+import pytest
+
+from src import logs
+from src.config import Config
+
+@pytest.fixture
+def log_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'LOG_DIR', str(tmp_path))
+    return tmp_path
+
+def _write(path, *entries, mode='a'):
+    with open(path, mode, encoding='utf-8') as f:
+        for entry in entries:
+            f.write((json.dumps(entry) if isinstance(entry, dict) else entry) + '\n')
+
+def _events(entries):
+    return [entry['event'] for entry in entries]
+
+def test_tail_returns_last_lines_and_resume_offset(log_dir):
+    path = log_dir / 'scraper.log'
+    _write(path, *({'event': f"line {i}", 'level': 'info'} for i in range(10)))
+
+    entries, file_id, offset = logs.read_logs('scraper', lines=3)
+
+    assert _events(entries) == ['line 7', 'line 8', 'line 9']
+    assert file_id == os.stat(path).st_ino and offset == os.path.getsize(path)
+
+def test_tail_spans_blocks(log_dir):
+    path = log_dir / 'scraper.log'
+    _write(path, *({'event': f"line {i}", 'level': 'info'} for i in range(5000)))
+    with open(path, 'rb') as f:
+        entries, _ = logs._tail(f, os.path.getsize(path), 2000, logs.LogFilter(), block_size=4096)
+    assert _events(entries) == [f"line {i}" for i in range(3000, 5000)]
+
+def test_forward_read_stops_at_last_complete_line(log_dir):
+    path = log_dir / 'web.log'
+    _write(path, {'event': 'first'})
+    _, file_id, offset = logs.read_logs('web', lines=10)
+
+    _write(path, {'event': 'second'})
+    with open(path, 'a') as f:
+        f.write('{"event": "thi')
+    entries, file_id, offset = logs.read_logs('web', offset, file_id)
+    assert _events(entries) == ['second']
+
+    with open(path, 'a') as f:
+        f.write('rd"}\n')
+    entries, _, end = logs.read_logs('web', offset, file_id)
+    assert _events(entries) == ['third'] and end == os.path.getsize(path)
+
+def test_overlong_line_is_handed_out_in_pieces(log_dir, monkeypatch):
+    monkeypatch.setattr(logs, 'MAX_READ_BYTES', 16)
+    path = log_dir / 'web.log'
+    _write(path, 'x' * 20, {'event': 'n'})
+
+    entries, file_id, offset = logs.read_logs('web', 0)
+    assert _events(entries) == ['x' * 16] and offset == 16
+    entries, file_id, offset = logs.read_logs('web', offset, file_id)
+    assert _events(entries) == ['xxxx'] and offset == 21
+    entries, _, offset = logs.read_logs('web', offset, file_id)
+    assert _events(entries) == ['n'] and offset == os.path.getsize(path)
+
+def test_rotation_restarts_at_beginning(log_dir):
+    path = log_dir / 'web.log'
+    _write(path, {'event': 'old'}, {'event': 'old'})
+    _, file_id, offset = logs.read_logs('web')
+
+    os.rename(path, log_dir / 'web.log.1')
+    _write(path, {'event': 'new'}, mode='w')
+
+    entries, new_file_id, _ = logs.read_logs('web', offset, file_id)
+    assert _events(entries) == ['new'] and new_file_id != file_id
+
+def test_filter_by_level_and_fcc_id(log_dir):
+    _write(log_dir / 'scraper.log',
+           {'event': 'Found 2AC7Z-ESP32C6', 'level': 'info'},
+           {'event': 'Timeout', 'level': 'error', 'fcc_id': '2ac7z-esp32c6'},
+           {'event': 'Timeout', 'level': 'error', 'fcc_id': 'OTHER'},
+           'plain text line')
+
+    entries, _, _ = logs.read_logs('scraper', log_filter=logs.LogFilter(fcc_id='2ac7z-esp32c6'))
+    assert len(entries) == 2
+    entries, _, _ = logs.read_logs('scraper', log_filter=logs.LogFilter(level='warning'))
+    assert [entry['fcc_id'] for entry in entries] == ['2ac7z-esp32c6', 'OTHER']
+    entries, _, _ = logs.read_logs('scraper', lines=1)
+    assert entries == [{'event': 'plain text line', 'level': 'info'}]
+
+def test_missing_file_and_unknown_component(log_dir):
+    assert logs.read_logs('web') == ([], 0, 0)
+    with pytest.raises(ValueError):
+        logs.read_logs('nginx')
@@ -0,0 +1,64 @@
+import pytest
+import requests
+from prometheus_client import REGISTRY
+from requests.adapters import BaseAdapter
+
+from src import metrics
+from src.database.models import PDF
+from src.scraper.throttle import HostThrottle, ThrottledSession
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+@pytest.mark.parametrize('url, expected', [
+    ('https://apps.fcc.gov/oetcf/eas/reports/GenericSearch.cfm', 'search'),
+    ('https://apps.fcc.gov/oetcf/eas/reports/ViewExhibitReport.cfm?mode=Exhibits&application_id=1', 'exhibits'),
+    ('https://apps.fcc.gov/eas/GetApplicationAttachment.html?id=1', 'pdf'),
+    ('https://example.com/files/Internal%20Photos.PDF', 'pdf'),
+    ('https://apps.fcc.gov/oetcf/eas/reports/GenericSearchResult.cfm', 'other')
+])
+def test_page_type(url, expected):
+    assert metrics.page_type(url) == expected
+
+def test_commits_are_timed(database, product):
+    before = _sample('espfinder_db_commit_seconds_count')
+    session = database.get_session()
+    try:
+        session.add(PDF(product_id=product.id, filename='a.pdf', url='https://example.com/a.pdf'))
+        session.commit()
+    finally:
+        session.close()
+    assert _sample('espfinder_db_commit_seconds_count') == before + 1
+
+def test_queue_depth_counts_pdfs_waiting_to_be_processed(database, product):
+    session = database.get_session()
+    try:
+        for index, values in enumerate([{}, {}, {'processed': True}, {'dead_letter': True}, {'deferred': True}]):
+            session.add(PDF(product_id=product.id, filename=f"{index}.pdf", url=f"https://example.com/{index}.pdf", **values))
+        session.commit()
+    finally:
+        session.close()
+    metrics.track_queue_depth()
+    assert _sample('espfinder_unprocessed_pdfs') == 2
+
+class FakeAdapter(BaseAdapter):
+    def send(self, request, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b'<html>results</html>'
+        response.url = request.url
+        response.request = request
+        return response
+
+def test_requests_are_timed_and_counted_by_page_type(monkeypatch):
+    monkeypatch.setattr(HostThrottle, 'acquire', lambda self: None)
+    session = ThrottledSession()
+    session.mount('https://', FakeAdapter())
+    url = 'https://metrics.example.com/oetcf/eas/reports/GenericSearch.cfm'
+    count = _sample('espfinder_http_request_seconds_count', page_type='search', status='200')
+    received = _sample('espfinder_http_response_bytes_total', page_type='search')
+
+    session.post(url, data={'q': 1})
+
+    assert _sample('espfinder_http_request_seconds_count', page_type='search', status='200') == count + 1
+    assert _sample('espfinder_http_response_bytes_total', page_type='search') == received + 20
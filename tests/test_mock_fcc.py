@@ -0,0 +1,53 @@
+import pytest
+
+import mock_fcc_server
+from src.config import Config
+from src.scraper import parsers
+from src.scraper.fcc_scraper import FCCScraper
+from src.scraper.throttle import HostThrottle
+
+@pytest.fixture
+def mock_fcc(data_dir, monkeypatch):
+    args = mock_fcc_server.build_parser().parse_args([
+        '--port', '0', '--grants', '5', '--latency', '0', '--error-rate', '0', '--rate-limit-rate', '0',
+        '--internal-photo-rate', '1'
+    ])
+    server = mock_fcc_server.start_mock_server(args)
+    monkeypatch.setattr(Config, 'FCC_BASE_URL', f"http://localhost:{server.server_address[1]}{mock_fcc_server.REPORTS_PATH}")
+    monkeypatch.setattr(HostThrottle, 'acquire', lambda self: None)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def test_search_results_parse_and_repeat(mock_fcc):
+    scraper = FCCScraper()
+    form = {'grant_date_from': '09/01/2026', 'grant_date_to': '09/01/2026'}
+    response = scraper.session.post(f"{Config.FCC_BASE_URL}/GenericSearch.cfm", data=form, timeout=10)
+
+    filings = scraper._parse_generic_search_results(response.content)
+    assert len(filings) == 5
+    assert all(filing['detail_url'].startswith(Config.FCC_BASE_URL) for filing in filings)
+
+    again = scraper._parse_generic_search_results(
+        scraper.session.post(f"{Config.FCC_BASE_URL}/GenericSearch.cfm", data=form, timeout=10).content)
+    assert [filing['fcc_id'] for filing in again] == [filing['fcc_id'] for filing in filings]
+
+def test_exhibit_links_point_at_the_stand_in(mock_fcc):
+    scraper = FCCScraper()
+    response = scraper.session.get(scraper._build_detail_url('2AC7Z-ESP32C6'), timeout=10)
+
+    links = list(parsers.iter_pdf_links(response.content))
+    assert 'Internal Photos' in [text for _, text in links]
+    host = Config.FCC_BASE_URL[:-len(mock_fcc_server.REPORTS_PATH)]
+    assert all(scraper._build_full_url(href).startswith(host + mock_fcc_server.ATTACHMENT_PATH) for href, _ in links)
+
+    pdfs = scraper._extract_pdf_links(response.content, '2AC7Z-ESP32C6')
+    assert [pdf['filename'] for pdf in pdfs] == ['Internal Photos']
+    assert pdfs[0]['url'].endswith('_Internal_Photos.pdf') and pdfs[0]['exhibit_type'] == 'Internal Photos'
+
+def test_build_full_url(monkeypatch):
+    monkeypatch.setattr(Config, 'FCC_BASE_URL', 'http://localhost:8080/oetcf/eas/reports')
+    scraper = FCCScraper()
+    assert scraper._build_full_url('https://apps.fcc.gov/a.pdf') == 'https://apps.fcc.gov/a.pdf'
+    assert scraper._build_full_url('/eas/a.pdf') == 'http://localhost:8080/eas/a.pdf'
+    assert scraper._build_full_url('a.pdf') == 'http://localhost:8080/oetcf/eas/reports/a.pdf'
@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+from src.scraper import exhibits, parsers
+from src.scraper.fcc_scraper import FCCScraper
+from src.scraper.selenium_scraper import SeleniumFCCScraper
+
+FIXTURES = os.path.join(os.path.dirname(__file__), '..', 'benchmarks', 'fixtures')
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name), 'rb') as f:
+        return f.read()
+
+@pytest.fixture
+def selenium_scraper():
+    scraper = SeleniumFCCScraper(start_driver=False)
+    yield scraper
+    scraper.close()
+
+def test_search_results_rows(selenium_scraper):
+    filings = selenium_scraper._parse_search_results(fixture('search_results.html'))
+    assert len(filings) == 12
+    assert filings[0]['fcc_id'] == '2AC7Z-ESP32C6'
+    assert filings[0]['applicant'] == 'Espressif Systems (Shanghai) Co., Ltd.'
+    assert filings[0]['detail_url'].endswith('application_id=2AC7Z-ESP32C6')
+
+def test_both_scrapers_parse_the_same_rows(selenium_scraper):
+    markup = fixture('search_results.html')
+    ids = [filing['fcc_id'] for filing in selenium_scraper._parse_search_results(markup)]
+    assert [filing['fcc_id'] for filing in FCCScraper()._parse_search_results(markup)] == ids
+
+def test_pdf_links():
+    links = list(parsers.iter_pdf_links(fixture('exhibits.html')))
+    assert len(links) == 14
+    assert links[1] == ('/eas/GetApplicationAttachment.html?id=7001231&file=Internal_Photos.pdf', 'Internal Photos')
+
+def test_exhibit_list_internal_photo_links(selenium_scraper):
+    pdfs = selenium_scraper._parse_exhibit_links(fixture('exhibits.html'), '2AC7Z-ESP32C6')
+    assert [pdf['filename'] for pdf in pdfs] == ['Internal Photos', 'Internal Photos - Module']
+    assert {pdf['exhibit_type'] for pdf in pdfs} == {'Internal Photos'}
+    assert pdfs[0]['url'] == 'https://apps.fcc.gov/eas/GetApplicationAttachment.html?id=7001231&file=Internal_Photos.pdf'
+
+def test_exhibit_type_comes_from_its_column():
+    links = list(parsers.iter_exhibit_links(fixture('exhibits.html')))
+    types = {text: exhibit_type for _, text, exhibit_type in links}
+    assert types['External Photos'] == 'External Photos'
+    assert types['Test Report'] == 'Test Report'
+
+def test_script_text_is_ignored():
+    tree = parsers.parse_html(b'<html><body><script>var x = "Internal Photos";</script><p>Hi</p></body></html>')
+    assert parsers.text(tree) == 'Hi'
+
+def test_no_results_table():
+    assert list(parsers.iter_result_rows(b'<html><body><table><tr><td>Maintenance</td></tr></table></body></html>')) == []
+
+@pytest.mark.parametrize('markup,expected', [
+    (fixture('exhibits.html'), True),
+    (b'<table><tr><th>Exhibit Type</th><th>Description</th></tr><tr><td></td><td></td></tr></table>', True),
+    (b'<html><body><a href="/eas/file.pdf">Report</a></body></html>', True),
+    (b'<html><body><h1>Service Unavailable</h1><p>Try again later.</p></body></html>', False),
+    (fixture('search_results.html'), False)
+])
+def test_is_exhibit_list(markup, expected):
+    assert parsers.is_exhibit_list(markup) is expected
+
+@pytest.mark.parametrize('description,href,expected', [
+    ('Internal Photos', '', True),
+    ('Exhibit 5', '/eas/GetApplicationAttachment.html?id=1&file=Internal_Photographs.pdf', True),
+    ('External Photos', '', False),
+    ('Test Setup Photos', '', False),
+    ('User Manual', '/files/manual.pdf', False)
+])
+def test_internal_photos_text_fallback(description, href, expected):
+    assert exhibits.is_internal_photos(description, href) is expected
+
+def test_exhibit_type_overrides_text():
+    assert exhibits.is_internal_photos('Internal Photos', exhibit_type='Test Report') is False
+    assert exhibits.is_internal_photos('Photos', exhibit_type='Internal Photos') is True
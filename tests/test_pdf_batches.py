@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta
+
+from src.database.models import PDF
+from src.pdf_processor.pdf_processor import PDFProcessor
+
+def _add_pdfs(database, product, specs):
+    session = database.get_session()
+    try:
+        for index, values in enumerate(specs):
+            session.add(PDF(product_id=product.id, filename=f"{index}.pdf", url=f"https://example.com/{index}.pdf", **values))
+        session.commit()
+    finally:
+        session.close()
+
+def test_batches_are_paged_by_id_and_skip_ineligible_pdfs(database, product, data_dir):
+    now = datetime.utcnow()
+    _add_pdfs(database, product, [
+        {},
+        {'processed': True},
+        {'dead_letter': True},
+        {'deferred': True},
+        {'next_attempt_at': now + timedelta(hours=1)},
+        {'next_attempt_at': now - timedelta(hours=1)},
+        {},
+        {}
+    ])
+
+    batches = list(PDFProcessor()._iter_unprocessed_batches(batch_size=2))
+
+    assert [[pdf.filename for pdf in batch] for batch in batches] == [['0.pdf', '5.pdf'], ['6.pdf', '7.pdf']]
+    # Rows are detached; the product was loaded with them
+    assert batches[0][0].product.fcc_id == product.fcc_id
+
+def test_no_batches_when_nothing_is_due(database, product, data_dir):
+    _add_pdfs(database, product, [{'processed': True}])
+    assert list(PDFProcessor()._iter_unprocessed_batches(batch_size=2)) == []
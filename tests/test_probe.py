@@ -0,0 +1,53 @@
+import io
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+from src.config import Config
+from src.pdf_processor import probe
+
+HEAD = b'%PDF-1.7\n1 0 obj << /Linearized 1 /L 90000 /N 12 >> endobj\n'
+TAIL = b'trailer << /Size 340 /Root 1 0 R /Encrypt 9 0 R >>\n%%EOF\n'
+
+class RangeAdapter(BaseAdapter):
+    """Answers a Range GET for the head or the tail of a 90000-byte PDF"""
+
+    def __init__(self, status=206):
+        super().__init__()
+        self.status = status
+        self.bodies = []
+
+    def send(self, request, **kwargs):
+        response = requests.Response()
+        response.status_code = self.status
+        response.raw = io.BytesIO(TAIL if request.headers['Range'].startswith('bytes=-') else HEAD)
+        response.headers['Content-Range'] = 'bytes 0-1023/90000'
+        response.url = request.url
+        response.request = request
+        self.bodies.append(response.raw)
+        return response
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def http(monkeypatch):
+    monkeypatch.setattr(Config, 'PROBE_BYTES', 1024)
+    return requests.Session()
+
+def test_probe_reads_head_and_trailer(http):
+    adapter = RangeAdapter()
+    http.mount('https://', adapter)
+    result = probe.probe(http, 'https://example.com/exhibit.pdf')
+
+    assert result['is_pdf'] and result['ranges'] and result['content_length'] == 90000
+    assert result['page_count'] == 12 and result['object_count'] == 340 and result['encrypted']
+    assert len(adapter.bodies) == 2
+
+def test_error_status_closes_the_response(http):
+    adapter = RangeAdapter(status=404)
+    http.mount('https://', adapter)
+    with pytest.raises(requests.HTTPError):
+        probe.probe(http, 'https://example.com/missing.pdf')
+    assert adapter.bodies[0].closed
@@ -0,0 +1,78 @@
+import json
+import os
+
+from src.database.models import PDF, ExtractionProfile
+from src.pdf_processor import profiling
+from src.pdf_processor.profiling import ExtractionProfiler
+
+def _add_pdfs(database, product, count):
+    session = database.get_session()
+    try:
+        pdfs = [PDF(product_id=product.id, filename=f"{index}.pdf", url=f"https://example.com/{index}.pdf")
+                for index in range(count)]
+        session.add_all(pdfs)
+        session.commit()
+        for pdf in pdfs:
+            pdf.product  # loaded before the rows are detached
+            session.expunge(pdf)
+        return pdfs
+    finally:
+        session.close()
+
+def _profiles(database):
+    session = database.get_session()
+    try:
+        return {row.pdf_id: row for row in session.query(ExtractionProfile)}
+    finally:
+        session.close()
+
+def test_document_records_phases_and_images(database, product, tmp_path):
+    pdf, = _add_pdfs(database, product, 1)
+    profiler = ExtractionProfiler(top_n=0, output_dir=str(tmp_path))
+
+    with profiler.document(pdf):
+        profiler.lap('open')
+        for page in range(2):
+            profiler.lap('page_scan')
+            profiler.start_image(page, 0, 10 + page)
+            profiler.lap('pixmap')
+            if page == 0:
+                profiler.lap('db_commit')
+            profiler.end_image()
+
+    row = _profiles(database)[pdf.id]
+    assert row.fcc_id == product.fcc_id
+    assert (row.pages, row.images, row.photos) == (2, 2, 1)
+    assert row.total_seconds >= row.open_seconds + row.page_scan_seconds + row.pixmap_seconds
+    images = json.loads(row.image_timings)
+    assert sorted(image['xref'] for image in images) == [10, 11]
+    assert set(images[0]['phases']) >= {'pixmap'}
+    assert row.profile_path is None and not os.listdir(tmp_path)
+
+def test_only_the_slowest_profiles_are_kept(database, product, tmp_path, monkeypatch):
+    pdfs = _add_pdfs(database, product, 3)
+    profiler = ExtractionProfiler(top_n=2, output_dir=str(tmp_path), backend='cprofile')
+    # perf_counter grows quadratically, so each document takes longer than the last
+    clock = iter(range(0, 1000))
+    monkeypatch.setattr(profiling.time, 'perf_counter', lambda: next(clock) ** 2)
+
+    for pdf in pdfs:
+        with profiler.document(pdf):
+            pass
+
+    rows = _profiles(database)
+    assert rows[pdfs[0].id].profile_path is None
+    kept = [rows[pdf.id].profile_path for pdf in pdfs[1:]]
+    assert all(path and os.path.exists(path) for path in kept)
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(path) for path in kept)
+
+def test_slowest_profiles_lists_each_pdf_once(database, product, tmp_path):
+    pdf, = _add_pdfs(database, product, 1)
+    profiler = ExtractionProfiler(top_n=0, output_dir=str(tmp_path))
+    for _ in range(2):
+        with profiler.document(pdf):
+            profiler.lap('pixmap')
+
+    rows = profiling.slowest_profiles()
+    assert [row['pdf_id'] for row in rows] == [pdf.id]
+    assert 'pixmap' in rows[0] and 'png_encode' in rows[0]
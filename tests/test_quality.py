@@ -0,0 +1,40 @@
+import cv2
+import numpy as np
+
+from src.pdf_processor.quality import is_acceptable, score
+
+def _board(size=512):
+    rng = np.random.default_rng(0)
+    gray = np.full((size, size), 40, np.uint8)
+    for _ in range(200):
+        x, y = rng.integers(0, size - 20, 2)
+        w, h = rng.integers(4, 20, 2)
+        cv2.rectangle(gray, (int(x), int(y)), (int(x + w), int(y + h)), int(rng.integers(60, 230)), -1)
+    return gray
+
+def test_scores_have_every_column():
+    assert set(score(_board())) == {'sharpness', 'entropy', 'blank_fraction', 'clipped_fraction', 'quality_score'}
+
+def test_sharp_detailed_image_beats_blurred_copy():
+    sharp = score(_board())
+    blurred = score(cv2.GaussianBlur(_board(), (31, 31), 0))
+    assert sharp['sharpness'] > blurred['sharpness']
+    assert sharp['quality_score'] > blurred['quality_score']
+    assert is_acceptable(sharp)
+
+def test_blank_page_is_rejected():
+    blank = np.full((800, 600), 255, np.uint8)
+    scores = score(blank)
+    assert scores['blank_fraction'] == 1.0 and scores['clipped_fraction'] == 1.0
+    assert scores['entropy'] == 0.0
+    assert not is_acceptable(scores)
+
+def test_mostly_blank_page_with_a_logo_is_rejected():
+    page = np.full((800, 600), 250, np.uint8)
+    page[20:60, 20:120] = _board(512)[:40, :100]
+    assert score(page)['quality_score'] < score(_board())['quality_score']
+    assert not is_acceptable(score(page))
+
+def test_threshold_override():
+    scores = score(_board())
+    assert not is_acceptable(scores, threshold=scores['quality_score'] + 0.01)
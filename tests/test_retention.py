@@ -0,0 +1,78 @@
+import gzip
+import os
+from datetime import datetime, timedelta
+
+from src.config import Config
+from src.database.models import PDF
+from src.pdf_processor import retention
+
+def _add_pdf(database, product, path, size, processed=True, age_hours=0):
+    if path:
+        with open(path, 'wb') as f:
+            f.write(b'%PDF' + b'\0' * (size - 4))
+    session = database.get_session()
+    try:
+        pdf = PDF(product_id=product.id, filename=os.path.basename(str(path)), url='https://example.com/a.pdf',
+                  local_path=str(path) if path else None, downloaded=True, processed=processed, file_size=size,
+                  last_accessed_at=datetime.utcnow() - timedelta(hours=age_hours))
+        session.add(pdf)
+        session.commit()
+        return pdf.id
+    finally:
+        session.close()
+
+def _local_paths(database):
+    session = database.get_session()
+    try:
+        return {pdf.id: pdf.local_path for pdf in session.query(PDF)}
+    finally:
+        session.close()
+
+def test_reclaim_evicts_least_recently_used_processed_pdfs(database, product, tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'PDF_BATCH_SIZE', 1)
+    oldest = _add_pdf(database, product, tmp_path / 'oldest.pdf', 1000, age_hours=3)
+    unprocessed = _add_pdf(database, product, tmp_path / 'unprocessed.pdf', 1000, processed=False, age_hours=5)
+    older = _add_pdf(database, product, tmp_path / 'older.pdf', 1000, age_hours=2)
+    recent = _add_pdf(database, product, tmp_path / 'recent.pdf', 1000, age_hours=0)
+
+    stats = retention.reclaim(budget_bytes=2000)
+
+    assert stats == {'usage': 4000, 'evicted': 2, 'freed': 2000}
+    paths = _local_paths(database)
+    assert paths[oldest] is None and paths[older] is None
+    assert paths[unprocessed] and paths[recent]
+    assert not os.path.exists(tmp_path / 'oldest.pdf')
+
+def test_reclaim_dry_run_keeps_files(database, product, tmp_path):
+    pdf_id = _add_pdf(database, product, tmp_path / 'a.pdf', 1000)
+    stats = retention.reclaim(budget_bytes=500, dry_run=True)
+    assert stats['evicted'] == 1
+    assert _local_paths(database)[pdf_id] and os.path.exists(tmp_path / 'a.pdf')
+
+def test_reclaim_clears_rows_whose_file_is_gone(database, product, tmp_path):
+    missing = _add_pdf(database, product, tmp_path / 'missing.pdf', 1000, age_hours=1)
+    kept = _add_pdf(database, product, tmp_path / 'kept.pdf', 1000)
+    os.remove(tmp_path / 'missing.pdf')
+
+    stats = retention.reclaim(budget_bytes=1500)
+
+    assert stats['evicted'] == 0 and stats['usage'] == 1000
+    paths = _local_paths(database)
+    assert paths[missing] is None and paths[kept]
+
+def test_compress_replaces_source_with_gzip(database, product, tmp_path):
+    pdf_id = _add_pdf(database, product, tmp_path / 'a.pdf', 100000)
+    session = database.get_session()
+    try:
+        pdf = session.get(PDF, pdf_id)
+        session.expunge(pdf)
+    finally:
+        session.close()
+
+    retention.apply_retention(pdf, 'compress')
+
+    assert pdf.local_path.endswith('.gz') and not os.path.exists(tmp_path / 'a.pdf')
+    with gzip.open(pdf.local_path) as f:
+        assert f.read() == b'%PDF' + b'\0' * 99996
+    assert pdf.stored_size == os.path.getsize(pdf.local_path) < pdf.file_size
+    assert retention.reclaim(budget_bytes=pdf.stored_size)['evicted'] == 0
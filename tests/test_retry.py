@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from src import retry
+from src.config import Config
+from src.database.models import FilingAttempt
+from src.scraper.fcc_scraper import FCCScraper
+from src.scraper.selenium_scraper import SeleniumFCCScraper
+
+def test_backoff_doubles_with_jitter_and_caps(monkeypatch):
+    monkeypatch.setattr(Config, 'RETRY_BASE_DELAY', 100.0)
+    monkeypatch.setattr(Config, 'RETRY_MAX_DELAY', 1000.0)
+    for attempts, full in ((1, 100), (2, 200), (3, 400), (4, 800), (5, 1000), (20, 1000)):
+        for _ in range(20):
+            assert full / 2 <= retry.backoff_delay(attempts) <= full
+
+def test_next_attempt_is_in_the_future():
+    now = datetime(2024, 1, 1)
+    assert now < retry.next_attempt_at(1, now) <= now + timedelta(seconds=Config.RETRY_BASE_DELAY)
+
+def test_exhausted_after_max_attempts(monkeypatch):
+    monkeypatch.setattr(Config, 'MAX_ITEM_ATTEMPTS', 3)
+    assert not retry.is_exhausted(2)
+    assert retry.is_exhausted(3)
+
+def _attempt(database, fcc_id):
+    session = database.get_session()
+    try:
+        return session.query(FilingAttempt).filter_by(fcc_id=fcc_id).first()
+    finally:
+        session.close()
+
+def test_filing_failures_back_off_then_dead_letter(database, monkeypatch):
+    monkeypatch.setattr(Config, 'MAX_ITEM_ATTEMPTS', 2)
+    scraper = FCCScraper()
+    filing = {'fcc_id': 'ABC-123', 'applicant': 'Acme', 'product_name': 'Widget'}
+
+    scraper._record_filing_failure('ABC-123', RuntimeError('timeout'), filing)
+    attempt = _attempt(database, 'ABC-123')
+    assert attempt.attempts == 1 and not attempt.dead_letter
+    assert attempt.next_attempt_at > datetime.utcnow()
+    assert 'ABC-123' in scraper.get_backed_off_fcc_ids()
+    assert scraper.get_due_filing_retries() == []
+
+    scraper._record_filing_failure('ABC-123', RuntimeError('timeout again'))
+    attempt = _attempt(database, 'ABC-123')
+    assert attempt.dead_letter and attempt.next_attempt_at is None
+    assert attempt.applicant == 'Acme'
+
+def test_missing_driver_counts_as_a_failed_attempt(database, data_dir, monkeypatch):
+    monkeypatch.setattr(SeleniumFCCScraper, '_setup_driver', lambda self: None)
+    scraper = FCCScraper()
+
+    assert scraper.get_filing_details('ABC-123', {'fcc_id': 'ABC-123'}) is None
+    attempt = _attempt(database, 'ABC-123')
+    assert attempt is not None and attempt.attempts == 1
+    assert 'driver' in attempt.last_error
+
+@pytest.mark.parametrize('details', [None, {'fcc_id': 'ABC-123', 'pdfs': [{'url': 'x'}]}])
+def test_loaded_page_clears_retry_state(database, monkeypatch, details):
+    scraper = FCCScraper()
+    scraper._record_filing_failure('ABC-123', RuntimeError('timeout'))
+    monkeypatch.setattr(SeleniumFCCScraper, '_setup_driver', lambda self: None)
+    monkeypatch.setattr(SeleniumFCCScraper, 'get_filing_details', lambda self, fcc_id: details)
+
+    assert scraper.get_filing_details('ABC-123') == details
+    assert _attempt(database, 'ABC-123') is None
@@ -0,0 +1,97 @@
+import cv2
+import numpy as np
+import pytest
+
+from src.database.models import Photo
+from src.similarity import HashIndex, backfill, hamming, hash_gray, phash, to_signed, to_unsigned
+
+def _board(seed=0, size=256):
+    rng = np.random.default_rng(seed)
+    gray = cv2.resize(rng.integers(0, 256, (16, 16), dtype=np.uint8), (size, size), interpolation=cv2.INTER_NEAREST)
+    return cv2.GaussianBlur(gray, (5, 5), 0)
+
+def _distance(a, b):
+    return int(hamming(np.array([a], dtype=np.uint64), b)[0])
+
+def test_noisy_copy_hashes_close_and_other_image_far():
+    gray = _board()
+    noisy = np.clip(gray + np.random.default_rng(1).normal(0, 4, gray.shape), 0, 255).astype(np.uint8)
+    assert _distance(phash(gray), phash(noisy)) <= 6
+    assert _distance(phash(gray), phash(_board(seed=2))) > 16
+
+@pytest.mark.parametrize('value', [0, 1, (1 << 63) - 1, 1 << 63, (1 << 64) - 1])
+def test_signed_round_trip(value):
+    assert -(1 << 63) <= to_signed(value) < (1 << 63)
+    assert to_unsigned(to_signed(value)) == value
+
+def _add_photos(database, product, hashes, **values):
+    session = database.get_session()
+    try:
+        photos = [Photo(product_id=product.id, filename=f"{i}.png", local_path=f"/nowhere/{i}.png",
+                        phash=None if value is None else to_signed(value), **values)
+                  for i, value in enumerate(hashes)]
+        session.add_all(photos)
+        session.commit()
+        return [photo.id for photo in photos]
+    finally:
+        session.close()
+
+def test_search_matches_brute_force(database, product):
+    rng = np.random.default_rng(3)
+    base = int(rng.integers(0, 1 << 63, dtype=np.uint64)) | (1 << 63)
+    hashes = [base ^ sum(1 << int(bit) for bit in rng.choice(64, flips, replace=False))
+              for flips in (0, 1, 3, 6, 9, 12, 20, 30)]
+    ids = _add_photos(database, product, hashes)
+    index = HashIndex(refresh_interval=3600)
+
+    for max_distance in (0, 4, 8, 12):
+        expected = sorted((_distance(value, base), photo_id) for photo_id, value in zip(ids, hashes)
+                          if _distance(value, base) <= max_distance)
+        assert [(d, i) for i, d in index.search(base, max_distance)] == expected
+    assert ids[0] not in [photo_id for photo_id, _ in index.search(base, 12, exclude=ids[0])]
+
+def test_refresh_adds_new_photos(database, product):
+    index = HashIndex(refresh_interval=3600)
+    first, = _add_photos(database, product, [1 << 63])
+    index.refresh(force=True)
+    assert len(index) == 1
+
+    index.refresh()
+    second, = _add_photos(database, product, [(1 << 63) | 1])
+    assert index.search(1 << 63, 1) == [(first, 0)]
+    index.refresh(force=True)
+    assert index.search(1 << 63, 1) == [(first, 0), (second, 1)]
+
+def test_refresh_picks_up_backfilled_and_added_photos(database, product, data_dir):
+    gray = _board()
+    ok, png = cv2.imencode('.png', gray)
+    path = data_dir / 'board.png'
+    path.write_bytes(png.tobytes())
+
+    session = database.get_session()
+    try:
+        old = Photo(product_id=product.id, filename='board.png', local_path=str(path))
+        session.add(old)
+        session.commit()
+        old_id = old.id
+    finally:
+        session.close()
+    newer_id, = _add_photos(database, product, [12345])
+
+    index = HashIndex(refresh_interval=3600)
+    index.refresh(force=True)
+    assert len(index) == 1
+
+    # Backfill hashes the older photo, whose id is below the index's last id
+    assert backfill(workers=1) == 1
+    index.refresh(force=True)
+    value = to_unsigned(hash_gray(gray)[0])
+    assert index.search(value, 0) == [(old_id, 0)]
+    assert len(index) == 2
+
+    index.refresh(force=True)
+    index.add(newer_id, to_signed(12345))
+    assert len(index) == 2
+
+    index.add(10 ** 6, to_signed(1 << 63))
+    assert index.search(1 << 63, 0) == [(10 ** 6, 0)]
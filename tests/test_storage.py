@@ -0,0 +1,182 @@
+import os
+import stat
+
+import pytest
+
+from src.config import Config
+from src.database.models import PackEntry, Photo
+from src.storage.blob_store import BlobStore
+from src.storage.images import ImageStorage
+from src.storage.migrate import migrate
+from src.storage.packs import PackStore
+
+def _add_photos(database, product, paths, **values):
+    session = database.get_session()
+    try:
+        photos = [Photo(product_id=product.id, filename=os.path.basename(path), local_path=path, **values)
+                  for path in paths]
+        session.add_all(photos)
+        session.commit()
+        return [photo.id for photo in photos]
+    finally:
+        session.close()
+
+def _photos(database):
+    session = database.get_session()
+    try:
+        return {photo.id: (photo.local_path, photo.sha256) for photo in session.query(Photo)}
+    finally:
+        session.close()
+
+def test_blob_store_layout_and_dedupe(data_dir):
+    store = BlobStore()
+    digest, path = store.put(b'image bytes')
+
+    assert path == os.path.join(Config.IMAGE_STORE_DIR, digest[:2], digest[2:4], digest + '.png')
+    assert open(path, 'rb').read() == b'image bytes'
+    assert not os.stat(path).st_mode & stat.S_IWUSR
+    assert store.put(b'image bytes') == (digest, path)
+    assert [name for name in os.listdir(os.path.dirname(path))] == [digest + '.png']
+
+def test_blob_store_put_file_matches_put(data_dir, tmp_path):
+    source = tmp_path / 'photo.png'
+    source.write_bytes(b'file bytes')
+    store = BlobStore()
+    assert store.put_file(str(source)) == store.put(b'file bytes')
+
+def test_pack_store_round_trip(database, data_dir):
+    store = PackStore()
+    first, first_path = store.put(b'first image')
+    second, _ = store.put(b'second image')
+
+    assert first_path == 'pack:' + first
+    assert PackStore.digest_from_path(first_path) == first
+    assert store.read(first) == b'first image'
+    assert store.read(second) == b'second image'
+    assert store.put(b'first image') == (first, first_path)
+    assert len(os.listdir(Config.PACK_DIR)) == 1
+    assert store.read('0' * 64) is None
+
+def _age_packs(database, store):
+    """Rename today's packs to an old day so compaction will consider them"""
+    session = database.get_session()
+    try:
+        for name in os.listdir(store.root):
+            old_name = '20000101' + name[8:]
+            os.rename(store.pack_path(name), store.pack_path(old_name))
+            session.query(PackEntry).filter_by(pack=name).update({'pack': old_name})
+        session.commit()
+    finally:
+        session.close()
+
+def test_compact_rewrites_packs_with_dead_entries(database, product, data_dir):
+    store = PackStore()
+    keep, keep_path = store.put(b'k' * 1000)
+    drop, _ = store.put(b'd' * 3000)
+    _add_photos(database, product, [keep_path], sha256=keep)
+    _age_packs(database, store)
+
+    assert store.compact(min_dead_ratio=0.9) == {}
+    stats = store.compact(min_dead_ratio=0.25)
+
+    assert stats['packs_compacted'] == 1 and stats['entries_removed'] == 1
+    assert store.read(keep) == b'k' * 1000
+    assert store.locate(drop) is None
+    assert os.listdir(store.root) == ['20000101-001.pack']
+
+def test_compact_leaves_todays_pack_alone(database, data_dir):
+    store = PackStore()
+    digest, _ = store.put(b'unreferenced')
+    assert store.compact(min_dead_ratio=0) == {}
+    assert store.read(digest) == b'unreferenced'
+
+def test_put_moves_images_out_of_closed_packs(database, product, data_dir):
+    store = PackStore()
+    digest, path = store.put(b'r' * 1000)
+    _age_packs(database, store)
+
+    # Deduped before its Photo row is committed; compaction must not drop it
+    assert store.put(b'r' * 1000) == (digest, path)
+    assert not store.locate(digest)[0].endswith('20000101-000.pack')
+    store.compact(min_dead_ratio=0)
+    _add_photos(database, product, [path], sha256=digest)
+    assert store.read(digest) == b'r' * 1000
+
+def test_import_blobs_moves_small_blobs_into_packs(database, product, data_dir):
+    digest, blob_path = BlobStore().put(b'small image')
+    photo_ids = _add_photos(database, product, [blob_path, blob_path], sha256=digest)
+
+    assert PackStore().import_blobs()['imported'] == 1
+    assert not os.path.exists(blob_path)
+    for photo_id in photo_ids:
+        assert _photos(database)[photo_id][0] == 'pack:' + digest
+    assert ImageStorage().read('pack:' + digest) == b'small image'
+
+@pytest.mark.parametrize('backend', ['blobs', 'packs'])
+def test_image_storage_locates_both_layouts(database, data_dir, backend):
+    storage = ImageStorage(backend)
+    digest, local_path = storage.put(b'abc')
+
+    path, offset, length = storage.locate(local_path)
+    assert length == 3
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        assert f.read(length) == b'abc'
+    assert storage.read(local_path) == b'abc'
+    assert not storage.exists(os.path.join(str(data_dir), 'missing.png'))
+
+def test_migrate_moves_files_into_the_store(database, product, data_dir):
+    legacy = data_dir / 'images' / product.fcc_id
+    legacy.mkdir(parents=True)
+    (legacy / 'page1_img1.png').write_bytes(b'one')
+    (legacy / 'page2_img1.png').write_bytes(b'two')
+    (legacy / 'page3_img1.png').write_bytes(b'two')
+    photo_ids = _add_photos(database, product, [str(legacy / name) for name in sorted(os.listdir(legacy))])
+    missing_id, = _add_photos(database, product, [str(legacy / 'gone.png')])
+
+    stats = migrate(workers=1)
+
+    assert stats['photos'] == 3 and stats['files'] == 3 and stats['missing'] == 1
+    assert stats['blobs'] == 2 and stats['duplicates'] == 1
+    photos = _photos(database)
+    for photo_id in photo_ids:
+        local_path, digest = photos[photo_id]
+        assert digest and local_path.startswith(Config.IMAGE_STORE_DIR) and os.path.exists(local_path)
+    assert photos[photo_ids[1]] == photos[photo_ids[2]]
+    assert photos[missing_id][1] is None
+    assert not os.listdir(legacy)
+
+def test_migrate_moves_files_shared_across_batches(database, product, data_dir):
+    legacy = data_dir / 'images' / product.fcc_id
+    legacy.mkdir(parents=True)
+    shared = legacy / 'page1_img1.png'
+    shared.write_bytes(b'shared')
+    other = legacy / 'page2_img1.png'
+    other.write_bytes(b'other')
+    duplicate = legacy / 'page3_img1.png'
+    duplicate.write_bytes(b'other')
+    # Two PDFs of the product wrote the same path; batch_size=1 puts their rows in different batches
+    photo_ids = _add_photos(database, product, [str(shared), str(other), str(shared), str(duplicate)])
+
+    stats = migrate(workers=1, batch_size=1)
+
+    assert stats['photos'] == 4 and stats['files'] == 3
+    assert stats['blobs'] == 2 and stats['duplicates'] == 1
+    photos = _photos(database)
+    for photo_id in photo_ids:
+        local_path, digest = photos[photo_id]
+        assert digest and local_path.startswith(Config.IMAGE_STORE_DIR) and os.path.exists(local_path)
+    assert photos[photo_ids[0]] == photos[photo_ids[2]]
+    assert photos[photo_ids[1]] == photos[photo_ids[3]]
+    assert not os.listdir(legacy)
+
+def test_migrate_dry_run_changes_nothing(database, product, data_dir):
+    path = data_dir / 'a.png'
+    path.write_bytes(b'a')
+    photo_id, = _add_photos(database, product, [str(path)])
+
+    stats = migrate(workers=1, dry_run=True)
+
+    assert stats['photos'] == 1
+    assert _photos(database)[photo_id] == (str(path), None)
+    assert path.exists()
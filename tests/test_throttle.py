@@ -0,0 +1,99 @@
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+from requests.adapters import BaseAdapter
+
+from src.config import Config
+from src.scraper import throttle as throttle_module
+from src.scraper.throttle import CircuitOpenError, HostThrottle, ThrottledSession, _parse_retry_after
+
+@pytest.fixture
+def throttle(monkeypatch):
+    monkeypatch.setattr(Config, 'DOWNLOAD_DELAY', 1.0)
+    monkeypatch.setattr(Config, 'CIRCUIT_FAILURE_THRESHOLD', 3)
+    monkeypatch.setattr(Config, 'CIRCUIT_RESET_TIMEOUT', 60.0)
+    return HostThrottle('example.com')
+
+def test_retry_after_seconds_and_http_date():
+    assert _parse_retry_after('120') == 120.0
+    assert _parse_retry_after('-5') == 0.0
+    assert _parse_retry_after(None) is None
+    assert _parse_retry_after('soon') is None
+    when = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=90), usegmt=True)
+    assert 80 < _parse_retry_after(when) <= 90
+
+def test_429_halves_rate_and_blocks_host(throttle):
+    rate = throttle.rate
+    throttle.record(0.1, status=429, retry_after='30')
+    assert throttle.rate == pytest.approx(rate * Config.RATE_LIMIT_DECREASE)
+    assert throttle.blocked_until - time.monotonic() == pytest.approx(30, abs=1)
+    assert throttle.state == HostThrottle.CLOSED
+
+def test_fast_responses_raise_rate_up_to_max(throttle):
+    for _ in range(200):
+        throttle.record(0.1, status=200)
+    assert throttle.rate == Config.RATE_LIMIT_MAX
+
+def test_slow_responses_lower_rate(throttle):
+    rate = throttle.rate
+    throttle.record(Config.RATE_LIMIT_TARGET_LATENCY + 1, status=200)
+    assert throttle.rate < rate
+
+def test_consecutive_failures_open_circuit(throttle):
+    throttle.record(1.0, status=500)
+    throttle.record(1.0, error=True)
+    assert throttle.state == HostThrottle.CLOSED
+    throttle.record(1.0, status=502)
+    assert throttle.state == HostThrottle.OPEN
+    with pytest.raises(CircuitOpenError) as excinfo:
+        throttle.acquire()
+    assert excinfo.value.host == 'example.com'
+    assert 0 < excinfo.value.retry_in <= 60
+
+def test_success_resets_failure_count(throttle):
+    throttle.record(1.0, status=500)
+    throttle.record(1.0, status=500)
+    throttle.record(1.0, status=200)
+    throttle.record(1.0, status=500)
+    assert throttle.state == HostThrottle.CLOSED
+
+def _open(throttle):
+    for _ in range(Config.CIRCUIT_FAILURE_THRESHOLD):
+        throttle.record(1.0, error=True)
+    throttle.opened_at -= Config.CIRCUIT_RESET_TIMEOUT + 1
+
+def test_half_open_allows_a_single_probe(throttle):
+    _open(throttle)
+    throttle.acquire()
+    assert throttle.state == HostThrottle.HALF_OPEN and throttle.probe_in_flight
+    with pytest.raises(CircuitOpenError):
+        throttle.acquire()
+
+    throttle.record(0.5, status=200)
+    assert throttle.state == HostThrottle.CLOSED
+    throttle.acquire()
+
+def test_failed_probe_reopens_circuit(throttle):
+    _open(throttle)
+    throttle.acquire()
+    throttle.record(0.5, error=True)
+    assert throttle.state == HostThrottle.OPEN
+    with pytest.raises(CircuitOpenError):
+        throttle.acquire()
+
+class InterruptedAdapter(BaseAdapter):
+    def send(self, request, **kwargs):
+        raise KeyboardInterrupt
+
+def test_interrupted_probe_does_not_hold_the_circuit(throttle, monkeypatch):
+    monkeypatch.setitem(throttle_module._throttles, 'example.com', throttle)
+    _open(throttle)
+    session = ThrottledSession()
+    session.mount('https://', InterruptedAdapter())
+    with pytest.raises(KeyboardInterrupt):
+        session.get('https://example.com/probe')
+
+    assert throttle.state == HostThrottle.HALF_OPEN and not throttle.probe_in_flight
+    throttle.acquire()
@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+import xml.etree.ElementTree as ElementTree
+
+import numpy as np
+import pytest
+
+from src.config import Config
+from src.storage.tiles import MANIFEST, OVERLAP, TileCache, decode, descriptor, max_level
+
+def _image(width, height):
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+@pytest.fixture
+def cache(data_dir):
+    return TileCache(budget_mb=0)
+
+def test_max_level():
+    assert max_level(1, 1) == 0
+    assert max_level(256, 100) == 8
+    assert max_level(257, 100) == 9
+    assert max_level(1000, 600) == 10
+
+def test_pyramid_layout(cache):
+    size = Config.TILE_SIZE
+    pyramid = cache.ensure('a' * 64, lambda: _image(1000, 600))
+
+    assert pyramid['levels'] == 11 and pyramid['overlap'] == OVERLAP
+    assert pyramid['width'] == 1000 and pyramid['height'] == 600
+    tiles = 0
+    for level in range(pyramid['levels']):
+        scale = 2 ** (pyramid['levels'] - 1 - level)
+        width, height = -(-1000 // scale), -(-600 // scale)
+        columns, rows = -(-width // size), -(-height // size)
+        level_dir = os.path.dirname(cache.tile_path('a' * 64, level, 0, 0))
+        assert sorted(os.listdir(level_dir)) == sorted(f"{c}_{r}.jpg" for c in range(columns) for r in range(rows))
+        tiles += columns * rows
+    assert pyramid['tiles'] == tiles
+
+def test_tiles_overlap_their_neighbours(cache):
+    size = Config.TILE_SIZE
+    cache.ensure('b' * 64, lambda: _image(1000, 600))
+    top = max_level(1000, 600)
+
+    def tile_shape(col, row):
+        with open(cache.tile_path('b' * 64, top, col, row), 'rb') as f:
+            return decode(f.read()).shape[:2]
+
+    assert tile_shape(0, 0) == (size + OVERLAP, size + OVERLAP)
+    assert tile_shape(1, 1) == (size + 2 * OVERLAP, size + 2 * OVERLAP)
+    assert tile_shape(3, 2) == (600 - 2 * size + OVERLAP, 1000 - 3 * size + OVERLAP)
+
+def test_descriptor_is_dzi_xml(cache):
+    pyramid = cache.ensure('c' * 64, lambda: _image(300, 200))
+    root = ElementTree.fromstring(descriptor(pyramid))
+    assert root.tag == '{http://schemas.microsoft.com/deepzoom/2008}Image'
+    assert root.get('TileSize') == str(Config.TILE_SIZE) and root.get('Overlap') == '1' and root.get('Format') == 'jpg'
+    size = root.find('{http://schemas.microsoft.com/deepzoom/2008}Size')
+    assert (size.get('Width'), size.get('Height')) == ('300', '200')
+
+def test_missing_image_builds_nothing(cache):
+    assert cache.ensure('d' * 64, lambda: None) is None
+    assert cache.pyramid('d' * 64) is None
+    assert cache._locks == {}
+
+def test_concurrent_requests_build_once(cache):
+    loads = []
+
+    def load():
+        loads.append(1)
+        time.sleep(0.05)
+        return _image(600, 400)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.ensure('e' * 64, load))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(loads) == 1
+    assert len(results) == 8 and all(result == results[0] for result in results)
+    assert cache._locks == {}
+
+def _age(cache, key, seconds):
+    path = os.path.join(cache._dir(key), MANIFEST)
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+def test_least_recently_viewed_pyramids_are_evicted(data_dir):
+    keys = ['1' * 64, '2' * 64, '3' * 64]
+    builder = TileCache(budget_mb=0)
+    sizes = [builder.ensure(key, lambda: _image(400, 300))['bytes'] for key in keys]
+    _age(builder, keys[0], 3000)
+    _age(builder, keys[1], 1000)
+    _age(builder, keys[2], 2000)
+
+    cache = TileCache(budget_mb=(sizes[0] + sizes[1] + 1) / 1024 / 1024)
+    stats = cache.reclaim()
+
+    assert stats['evicted'] == 1 and stats['usage'] == sum(sizes)
+    assert cache.pyramid(keys[0]) is None
+    assert cache.pyramid(keys[1]) and cache.pyramid(keys[2])
+    assert cache._usage == sizes[1] + sizes[2]
+
+def test_builds_only_scan_when_over_budget(data_dir, monkeypatch):
+    cache = TileCache(budget_mb=100)
+    scans = []
+    reclaim = cache.reclaim
+    monkeypatch.setattr(cache, 'reclaim', lambda **kwargs: scans.append(kwargs) or reclaim(**kwargs))
+
+    first = cache.ensure('4' * 64, lambda: _image(400, 300))
+    cache.ensure('5' * 64, lambda: _image(400, 300))
+    assert len(scans) == 1
+
+    cache.budget_bytes = first['bytes'] + 1
+    cache.ensure('6' * 64, lambda: _image(400, 300))
+    assert scans[-1] == {'keep': '6' * 64}
+    assert cache.pyramid('6' * 64) is not None
+    assert cache._usage <= cache.budget_bytes
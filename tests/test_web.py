@@ -0,0 +1,106 @@
+import io
+import zipfile
+
+import cv2
+import numpy as np
+import pytest
+
+from src import metrics
+from src.config import Config
+from src.database.models import Photo
+from src.storage import tiles
+from src.storage.images import ImageStorage
+from src.web import app as web
+
+@pytest.fixture
+def client(database, data_dir, monkeypatch):
+    monkeypatch.setattr(web, 'image_storage', ImageStorage('blobs'))
+    monkeypatch.setattr(web, 'tile_cache', tiles.TileCache(budget_mb=0))
+    web.app.config['TESTING'] = True
+    return web.app.test_client()
+
+@pytest.fixture
+def photos(database, product, client):
+    rng = np.random.default_rng(0)
+    ids = []
+    session = database.get_session()
+    try:
+        for index in range(3):
+            ok, png = cv2.imencode('.png', rng.integers(0, 256, (300, 400, 3), dtype=np.uint8))
+            digest, local_path = web.image_storage.put(png.tobytes())
+            photo = Photo(product_id=product.id, filename=f"page1_img{index}.png", local_path=local_path, sha256=digest)
+            session.add(photo)
+            session.flush()
+            ids.append(photo.id)
+        session.commit()
+    finally:
+        session.close()
+    return ids
+
+def _follow_calls(monkeypatch):
+    calls = []
+
+    def follow_logs(component, offset=None, file_id=None, log_filter=None):
+        calls.append((file_id, offset))
+        return iter(())
+
+    monkeypatch.setattr(web.logs, 'follow_logs', follow_logs)
+    return calls
+
+@pytest.mark.parametrize('header,expected', [
+    ('3-1200', (3, 1200)),
+    ('a-b', (7, 50)),
+    ('3-', (7, 50)),
+    ('garbage', (7, 50))
+])
+def test_log_stream_resumes_from_last_event_id(client, monkeypatch, header, expected):
+    calls = _follow_calls(monkeypatch)
+    response = client.get('/api/logs/stream?component=scraper&file_id=7&offset=50', headers={'Last-Event-ID': header})
+    assert response.status_code == 200
+    assert response.get_data(as_text=True) == 'retry: 3000\n\n'
+    assert calls == [expected]
+
+def test_photos_zip_full_and_ranges(client, photos, product):
+    url = f"/product/{product.fcc_id}/photos.zip"
+    full = client.get(url)
+    assert full.status_code == 200 and full.accept_ranges == 'bytes'
+    with zipfile.ZipFile(io.BytesIO(full.data)) as archive:
+        assert archive.testzip() is None and len(archive.namelist()) == 3
+
+    size = len(full.data)
+    part = client.get(url, headers={'Range': 'bytes=100-'})
+    assert part.status_code == 206
+    assert part.headers['Content-Range'] == f"bytes 100-{size - 1}/{size}"
+    assert part.data == full.data[100:]
+
+    resumed = client.get(url, headers={'Range': 'bytes=10-19', 'If-Range': full.headers['ETag']})
+    assert resumed.status_code == 206 and resumed.data == full.data[10:20]
+
+    stale = client.get(url, headers={'Range': 'bytes=10-19', 'If-Range': '"stale"'})
+    assert stale.status_code == 200 and stale.data == full.data
+
+    beyond = client.get(url, headers={'Range': f"bytes={size}-"})
+    assert beyond.status_code == 416 and beyond.headers['Content-Range'] == f"bytes */{size}"
+
+def test_tiles_routes(client, photos):
+    descriptor = client.get(f"/photo/{photos[0]}/tiles.dzi")
+    assert descriptor.status_code == 200 and descriptor.mimetype == 'application/xml'
+    assert b'Width="400" Height="300"' in descriptor.data
+
+    top = tiles.max_level(400, 300)
+    tile = client.get(f"/photo/{photos[0]}/tiles_files/{top}/1_1.jpg")
+    assert tile.status_code == 200 and tile.mimetype == 'image/jpeg'
+    assert tiles.decode(tile.data).shape[:2] == (300 - Config.TILE_SIZE + 1, 400 - Config.TILE_SIZE + 1)
+
+    assert client.get(f"/photo/{photos[0]}/tiles_files/{top}/5_5.jpg").status_code == 404
+    assert client.get('/photo/999999/tiles.dzi').status_code == 404
+
+def test_scraper_metrics_textfile(client, tmp_path, monkeypatch):
+    textfile = tmp_path / 'metrics' / 'scraper.prom'
+    monkeypatch.setattr(Config, 'METRICS_TEXTFILE', str(textfile))
+    assert client.get('/metrics/scraper').status_code == 404
+
+    metrics.publish_run(True, str(textfile))
+    response = client.get('/metrics/scraper')
+    assert response.status_code == 200
+    assert b'espfinder_scraper_last_run_timestamp_seconds{result="success"}' in response.data
@@ -0,0 +1,109 @@
+import io
+import zipfile
+from datetime import datetime
+
+import pytest
+
+from src.storage.zipstream import MAX_32, ZipEntry, ZipStream, _cache_crc
+
+class RangeReader(io.RawIOBase):
+    """Seekable file over ZipStream.iter_range, so zipfile only pulls the bytes it needs"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.position = 0
+        self.reads = []
+
+    def seekable(self):
+        return True
+
+    def readable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        self.position = {io.SEEK_SET: 0, io.SEEK_CUR: self.position, io.SEEK_END: self.stream.size}[whence] + offset
+        return self.position
+
+    def tell(self):
+        return self.position
+
+    def read(self, size=-1):
+        stop = self.stream.size if size is None or size < 0 else self.position + size
+        data = b''.join(self.stream.iter_range(self.position, stop))
+        self.reads.append((self.position, len(data)))
+        self.position += len(data)
+        return data
+
+def _entries(tmp_path):
+    pack = tmp_path / 'images.pack'
+    pack.write_bytes(b'HEADER' + b'a' * 5000 + b'b' * 3 + bytes(range(256)) * 40)
+    when = datetime(2024, 5, 6, 7, 8, 10)
+    return [
+        ZipEntry('ESP32/board.png', str(pack), 6, 5000, when, 'zip-test-a'),
+        ZipEntry('ESP32/empty.png', str(pack), 0, 0, when, 'zip-test-empty'),
+        ZipEntry('ESP32/tiny.png', str(pack), 5006, 3, when, 'zip-test-b'),
+        ZipEntry('Módulo/ñ.png', str(pack), 5009, 10240, datetime(1970, 1, 1), 'zip-test-c'),
+    ]
+
+def test_archive_is_a_valid_zip(tmp_path):
+    stream = ZipStream(_entries(tmp_path))
+    data = b''.join(stream.iter_range())
+
+    assert len(data) == stream.size and not stream.zip64
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.testzip() is None
+        assert archive.namelist() == ['ESP32/board.png', 'ESP32/empty.png', 'ESP32/tiny.png', 'Módulo/ñ.png']
+        assert archive.read('ESP32/board.png') == b'a' * 5000
+        assert archive.read('Módulo/ñ.png') == bytes(range(256)) * 40
+        info = archive.getinfo('ESP32/tiny.png')
+        assert info.compress_type == zipfile.ZIP_STORED and info.date_time == (2024, 5, 6, 7, 8, 10)
+        assert archive.getinfo('Módulo/ñ.png').date_time == (1980, 1, 1, 0, 0, 0)
+
+def test_local_headers_stream_without_central_directory(tmp_path):
+    stream = ZipStream(_entries(tmp_path))
+    data = b''.join(stream.iter_range(0, stream.central_offset))
+    # A streaming reader only sees local headers; each must carry the real CRC and sizes
+    with zipfile.ZipFile(io.BytesIO(b''.join(stream.iter_range()))) as archive:
+        for info in archive.infolist():
+            header = data[info.header_offset:info.header_offset + 30]
+            assert header[:4] == b'PK\x03\x04'
+            assert int.from_bytes(header[14:18], 'little') == info.CRC
+            assert int.from_bytes(header[18:22], 'little') == info.file_size
+
+@pytest.mark.parametrize('chunk', [1, 7, 29, 1000, 4096])
+def test_ranges_concatenate_to_the_archive(tmp_path, chunk):
+    stream = ZipStream(_entries(tmp_path))
+    whole = b''.join(stream.iter_range())
+    pieces = [b''.join(stream.iter_range(start, start + chunk)) for start in range(0, stream.size, chunk)]
+    assert b''.join(pieces) == whole
+
+def test_range_past_the_end_is_clipped(tmp_path):
+    stream = ZipStream(_entries(tmp_path))
+    assert b''.join(stream.iter_range(stream.size - 5, stream.size + 100)) == b''.join(stream.iter_range())[-5:]
+    assert b''.join(stream.iter_range(stream.size, stream.size + 10)) == b''
+
+def test_zip64_offsets_past_4_gib(tmp_path):
+    big = tmp_path / 'big.bin'
+    with open(big, 'wb') as f:
+        f.truncate(5 * 1024 ** 3)  # sparse, so no real disk is used
+    small = tmp_path / 'small.png'
+    small.write_bytes(b'after 4 GiB')
+    when = datetime(2024, 1, 1)
+    entries = [
+        ZipEntry('big-1.bin', str(big), 0, 5 * 1024 ** 3 // 2, when, 'zip64-test-big'),
+        ZipEntry('big-2.bin', str(big), 0, 5 * 1024 ** 3 // 2, when, 'zip64-test-big'),
+        ZipEntry('small.png', str(small), 0, small.stat().st_size, when, 'zip64-test-small'),
+    ]
+    # Don't read 5 GiB of zeros to checksum them
+    _cache_crc('zip64-test-big', 0)
+
+    stream = ZipStream(entries)
+    assert stream.zip64 and stream.central_offset > MAX_32
+
+    reader = RangeReader(stream)
+    with zipfile.ZipFile(reader) as archive:
+        infos = archive.infolist()
+        assert [info.filename for info in infos] == ['big-1.bin', 'big-2.bin', 'small.png']
+        assert infos[2].header_offset > MAX_32
+        assert archive.read('small.png') == b'after 4 GiB'
+    assert sum(length for _, length in reader.reads) < 1024 * 1024